@@ -0,0 +1,437 @@
+# Async Camera Client
+# core/async_camera_client.py - asyncio tabanlı kamera istemcisi
+# =============================================================================
+
+import asyncio
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .camera_client import (
+    DECODE_SCALE_FLAGS,
+    FrameMailbox,
+    create_camera_stats,
+    record_arrival_stats,
+    record_frame_stats,
+    record_latency_stats,
+    reset_sequence_stats,
+)
+from .depth_decoder import MEASURE_MESSAGE_TYPES
+from .video_decoder import PYAV_AVAILABLE, create_h264_decoder
+
+logger = logging.getLogger(__name__)
+
+class AsyncEventLoopThread:
+    """Tüm AsyncCameraClient'ların paylaştığı tek asyncio event loop thread'i
+    
+    Her server bağlantısı bu loop üzerinde bir coroutine olarak çalışır;
+    decode işleri ortak bir ThreadPoolExecutor'a verilir. Böylece drone
+    sayısı arttıkça thread ve lock sayısı artmaz.
+    """
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, decode_workers=3):
+        self.loop = asyncio.new_event_loop()
+        self.decode_executor = ThreadPoolExecutor(
+            max_workers=decode_workers,
+            thread_name_prefix="async-frame-decode"
+        )
+        self.thread = threading.Thread(target=self._run, name="camera-event-loop")
+        self.thread.daemon = True
+        self.thread.start()
+    
+    @classmethod
+    def get(cls):
+        """Paylaşılan loop thread'ini döndür (yoksa başlat)"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def submit(self, coro):
+        """Coroutine'i başka bir thread'den loop'a gönder"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+class AsyncCameraClient(QObject):
+    """CameraClient ile aynı sinyal sözleşmesine sahip asyncio transport
+    
+    Framing StreamReader.readexactly ile yapılır (!I uzunluk + JSON header
+    + opsiyonel !I uzunluk + JPEG veya H.264). Qt köprüsü polling kullanmaz:
+    sinyaller loop thread'inden emit edilir ve Qt bunları queued connection
+    ile GUI thread'ine teslim eder.
+    """
+    
+    # PyQt sinyalleri
+    frame_received = pyqtSignal(int, np.ndarray)  # camera_id, frame
+    connection_status = pyqtSignal(bool, str)     # connected, message
+    error_occurred = pyqtSignal(str)              # error_message
+    camera_list_updated = pyqtSignal(list)        # camera_ids
+    stats_updated = pyqtSignal(dict)              # camera_stats
+    
+    def __init__(self, server_host="localhost", server_port=9995, pipeline_depth=1,
+                 stream_mode='auto', frame_slots=1, loop_thread=None):
+        super().__init__()
+        self.server_host = server_host
+        self.server_port = server_port
+        self.pipeline_depth = max(1, int(pipeline_depth))
+        self.stream_mode = stream_mode
+        self.frame_slots = frame_slots
+        self.loop_thread = loop_thread
+        
+        self.cameras = []
+        self.server_info = {}
+        self.camera_stats = {}
+        self.frame_queues = {}
+        self.decode_scales = {}
+        self.connected = False
+        self.push_active = False
+        
+        self._reader = None
+        self._writer = None
+        # run() coroutine'inin asyncio görevi (disconnect iptal edip bekler)
+        self._task = None
+        self._credits = {}
+        self._pending = []
+        self._decoding = set()
+        self._decode_waiting = {}
+        # H.264 frame'leri birbirine bağlıdır: kamera başına durumlu decoder
+        # ve sırayla işlenen kuyruk
+        self._video_decoders = {}
+        self._video_queues = {}
+        self.video_queue_limit = 30
+    
+    def connect(self, host=None, port=None):
+        """Bağlantıyı paylaşılan event loop'ta başlat (bloklamaz)"""
+        if host:
+            self.server_host = host
+        if port:
+            self.server_port = port
+        
+        if self.loop_thread is None:
+            self.loop_thread = AsyncEventLoopThread.get()
+        
+        # Görev run() içinde kaydedilir; sonra gönderilen disconnect onu görür
+        self.loop_thread.submit(self.run())
+        return True
+    
+    def disconnect(self):
+        """Bağlantıyı kes"""
+        if self.loop_thread is not None:
+            self.loop_thread.submit(self._disconnect())
+    
+    async def _disconnect(self):
+        """Okuma döngüsünü iptal et, bitmesini bekle ve sonra socket'i kapat
+        
+        Writer döngü okurken kapatılırsa readexactly yarım kalır ve normal
+        kapanış bağlantı kopması gibi loglanır.
+        """
+        task = self._task
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.close()
+    
+    def get_camera_stats(self):
+        """Kamera istatistiklerini döndür"""
+        return self.camera_stats
+    
+    def get_available_cameras(self):
+        """Mevcut kameraları döndür"""
+        return self.cameras
+    
+    def get_mailbox(self, camera_id):
+        """Kameranın frame mailbox'ını döndür (yoksa oluştur)"""
+        mailbox = self.frame_queues.get(camera_id)
+        if mailbox is None:
+            mailbox = self.frame_queues.setdefault(camera_id, FrameMailbox(self.frame_slots))
+        return mailbox
+    
+    def get_latest_frame(self, camera_id, after_seq=0):
+        """Kameranın en yeni frame'ini (seq, frame) olarak döndür"""
+        return self.get_mailbox(camera_id).get_latest(after_seq)
+    
+    async def run(self):
+        """Bağlan, handshake yap ve akış bitene kadar frame al"""
+        self._task = asyncio.current_task()
+        try:
+            await self._open()
+        except Exception as e:
+            error_msg = f"❌ Bağlantı hatası: {e}"
+            self.connection_status.emit(False, error_msg)
+            logger.error(error_msg)
+            await self.close()
+            return False
+        
+        try:
+            use_push = self.stream_mode == 'push' or (
+                self.stream_mode == 'auto' and self.server_info.get('push_supported', False)
+            ) or not self.server_info.get('pull_supported', True)
+            if use_push:
+                await self._send({
+                    'type': 'subscribe',
+                    'camera_ids': list(self.cameras),
+                    'fps': self.server_info.get('fps', 30)
+                })
+                self.push_active = True
+                await self._read_loop()
+            else:
+                requester = asyncio.ensure_future(self._request_loop())
+                try:
+                    await self._read_loop()
+                finally:
+                    requester.cancel()
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error_msg = f"❌ Response alınamadı - bağlantı koptu: {e}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.close()
+        return True
+    
+    async def close(self):
+        """Socket'i kapat"""
+        if not self.connected and self._writer is None:
+            return
+        
+        if self.push_active and self._writer is not None:
+            try:
+                await self._send({'type': 'unsubscribe'})
+            except Exception:
+                pass
+        
+        self.connected = False
+        self.push_active = False
+        
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+            self._reader = None
+        
+        self.connection_status.emit(False, "Bağlantı kesildi")
+        logger.info("🔌 Bağlantı kesildi")
+    
+    async def _open(self):
+        """Bağlantıyı kur ve camera_list handshake'ini al"""
+        logger.info(f"🔗 Server'a bağlanılıyor: {self.server_host}:{self.server_port}")
+        
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server_host, self.server_port),
+            timeout=10.0
+        )
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+        
+        self.connected = True
+        self.connection_status.emit(True, "✅ Server'a bağlandı")
+        
+        header, _ = await self._read_message()
+        if header.get('type') != 'camera_list':
+            raise Exception("Geçersiz server response")
+        
+        if header['server_info'].get('codec') == 'h264' and not PYAV_AVAILABLE:
+            raise Exception("Server H.264 yayınlıyor, PyAV (av) kurulu değil")
+        
+        self.cameras = header['cameras']
+        self.server_info = header['server_info']
+        self._pending = []
+        # Yeni akış anahtar frame ile başlar, eski decoder durumu geçersiz
+        self._video_decoders.clear()
+        self._video_queues.clear()
+        # Yeni oturumda server seq'leri baştan başlar
+        for stats in self.camera_stats.values():
+            reset_sequence_stats(stats)
+        self._credits = {
+            camera_id: asyncio.Semaphore(self.pipeline_depth) for camera_id in self.cameras
+        }
+        
+        logger.info(f"📋 Server bilgileri alındı: {self.server_info}")
+        self.camera_list_updated.emit(self.cameras)
+    
+    async def _read_message(self):
+        """Bir mesajı (header ve varsa frame verisi) readexactly ile oku"""
+        header_size = struct.unpack("!I", await self._reader.readexactly(4))[0]
+        header = json.loads((await self._reader.readexactly(header_size)).decode('utf-8'))
+        
+        frame_data = None
+        if header['type'] == 'frame' or header['type'] in MEASURE_MESSAGE_TYPES:
+            frame_size = struct.unpack("!I", await self._reader.readexactly(4))[0]
+            frame_data = await self._reader.readexactly(frame_size)
+        
+        return header, frame_data
+    
+    async def _send(self, request):
+        """Uzunluk prefix'li JSON isteği gönder"""
+        request_json = json.dumps(request).encode('utf-8')
+        self._writer.write(struct.pack("!I", len(request_json)) + request_json)
+        await self._writer.drain()
+    
+    async def _request_loop(self):
+        """Pull modunda kamera başına kredi penceresiyle get_frame gönder"""
+        target_fps = self.server_info.get('fps', 30)
+        if self.pipeline_depth > 1:
+            frame_interval = 1.0 / target_fps
+        else:
+            frame_interval = 1.0 / (target_fps * 3)
+        
+        async def request_camera(camera_id):
+            credits = self._credits[camera_id]
+            while self.connected:
+                await credits.acquire()
+                self._pending.append(camera_id)
+                await self._send({'type': 'get_frame', 'camera_id': camera_id})
+                await asyncio.sleep(frame_interval)
+        
+        await asyncio.gather(*(request_camera(camera_id) for camera_id in self.cameras))
+    
+    async def _read_loop(self):
+        """Gelen mesajları kameralara dağıt"""
+        while self.connected:
+            header, frame_data = await self._read_message()
+            
+            camera_id = header.get('camera_id')
+            if header['type'] in MEASURE_MESSAGE_TYPES:
+                # Derinlik verisi bu istemcide gösterilmez, çerçevelemesi atlanır
+                continue
+            if not self.push_active:
+                # Krediyi geri ver; camera_id yoksa gönderim sırasına göre eşleştir
+                if camera_id is None and self._pending:
+                    camera_id = self._pending[0]
+                if camera_id in self._pending:
+                    self._pending.remove(camera_id)
+                    self._credits[camera_id].release()
+            
+            if header['type'] == 'frame' and frame_data:
+                record_arrival_stats(self._stats(camera_id), header, time.time_ns())
+                if header.get('codec') == 'h264':
+                    self._schedule_video_decode(camera_id, header, frame_data)
+                else:
+                    self._schedule_decode(camera_id, header, frame_data)
+            elif header['type'] == 'error':
+                error_msg = f"❌ Server hatası: {header.get('message')}"
+                self.error_occurred.emit(error_msg)
+                logger.error(error_msg)
+                if camera_id in self.camera_stats:
+                    self.camera_stats[camera_id]['errors'] += 1
+    
+    def _schedule_decode(self, camera_id, header, frame_data):
+        """Kamera başına tek decode; arada gelen frame'lerden en yenisi bekler"""
+        if camera_id in self._decoding:
+            if camera_id in self._decode_waiting:
+                self._stats(camera_id)['decode_drops'] += 1
+            self._decode_waiting[camera_id] = (header, frame_data)
+            return
+        
+        self._decoding.add(camera_id)
+        asyncio.ensure_future(self._decode(camera_id, header, frame_data))
+    
+    async def _decode(self, camera_id, header, frame_data):
+        """Decode'u ortak executor'da çalıştır, sonra yayınla"""
+        loop = asyncio.get_running_loop()
+        try:
+            while frame_data is not None:
+                scale = self.decode_scales.get(camera_id, 1)
+                frame = await loop.run_in_executor(
+                    self.loop_thread.decode_executor,
+                    _decode_jpeg, frame_data, DECODE_SCALE_FLAGS[scale]
+                )
+                if frame is not None:
+                    self._publish_frame(camera_id, frame, header)
+                header, frame_data = self._decode_waiting.pop(camera_id, (None, None))
+        except Exception as e:
+            error_msg = f"❌ Frame decode hatası: {e}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+        finally:
+            self._decoding.discard(camera_id)
+    
+    def _schedule_video_decode(self, camera_id, header, frame_data):
+        """H.264 frame'ini kameranın sıralı kuyruğuna ekle
+        
+        Inter-frame akışta frame atlanamaz; decode yetişemeyip kuyruk
+        dolarsa bekleyen frame'lerin hepsi atılır ve decoder bir sonraki
+        anahtar frame'e kadar bekler.
+        """
+        video_queue = self._video_queues.setdefault(camera_id, deque())
+        if len(video_queue) >= self.video_queue_limit:
+            self._stats(camera_id)['decode_drops'] += len(video_queue)
+            video_queue.clear()
+            decoder = self._video_decoders.get(camera_id)
+            if decoder is not None:
+                decoder.resync()
+        video_queue.append((header, frame_data))
+        
+        if camera_id not in self._decoding:
+            self._decoding.add(camera_id)
+            asyncio.ensure_future(self._video_decode(camera_id))
+    
+    async def _video_decode(self, camera_id):
+        """Kameranın H.264 kuyruğunu ortak executor'da sırayla decode et"""
+        loop = asyncio.get_running_loop()
+        if camera_id not in self._video_decoders:
+            self._video_decoders[camera_id] = create_h264_decoder()
+        decoder = self._video_decoders[camera_id]
+        try:
+            video_queue = self._video_queues[camera_id]
+            while video_queue:
+                header, frame_data = video_queue.popleft()
+                frame = await loop.run_in_executor(
+                    self.loop_thread.decode_executor,
+                    decoder.decode, frame_data, header.get('keyframe', False)
+                )
+                if frame is not None:
+                    self._publish_frame(camera_id, frame, header)
+        except Exception as e:
+            error_msg = f"❌ Frame decode hatası: {e}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+        finally:
+            self._decoding.discard(camera_id)
+    
+    def _stats(self, camera_id):
+        if camera_id not in self.camera_stats:
+            self.camera_stats[camera_id] = create_camera_stats()
+        return self.camera_stats[camera_id]
+    
+    def _publish_frame(self, camera_id, frame, header):
+        """Frame'i mailbox'a yaz ve sinyallerle GUI'ye teslim et"""
+        mailbox = self.get_mailbox(camera_id)
+        mailbox.mark_read(mailbox.put(frame))
+        
+        stats = self._stats(camera_id)
+        record_frame_stats(stats, time.time())
+        record_latency_stats(stats, header, time.time_ns())
+        stats['queue_depth'] = mailbox.depth()
+        stats['dropped_frames'] = mailbox.frames_dropped
+        
+        self.frame_received.emit(camera_id, frame)
+        self.stats_updated.emit(self.camera_stats)
+
+def _decode_jpeg(frame_data, flags):
+    """Executor thread'inde JPEG decode"""
+    return cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), flags)
@@ -10,11 +10,256 @@ import signal
 import sys
 from concurrent.futures import ThreadPoolExecutor
 import queue
+import select
+from collections import deque
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
 
+try:
+    from .stream_controller import AdaptiveStreamController
+    from .video_decoder import create_h264_decoder
+    from .depth_decoder import MEASURE_MESSAGE_TYPES, decode_measure
+    from .udp_receiver import UdpFrameReceiver
+except ImportError:
+    # Standalone çalıştırma için (python core/camera_client.py)
+    from stream_controller import AdaptiveStreamController
+    from video_decoder import create_h264_decoder
+    from depth_decoder import MEASURE_MESSAGE_TYPES, decode_measure
+    from udp_receiver import UdpFrameReceiver
+
 # Logging ayarları
 logger = logging.getLogger(__name__)
 
+# JPEG DCT ölçekleme ile küçültülmüş decode bayrakları
+DECODE_SCALE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Gecikme histogramı kova sınırları (ms)
+LATENCY_BUCKETS_MS = (10, 20, 50, 100, 200, 500, 1000)
+
+def create_camera_stats():
+    """Bir kamera için boş istatistik kaydı"""
+    return {
+        'frames_received': 0,
+        'fps': 0,
+        'last_fps_time': time.time(),
+        'frame_count_for_fps': 0,
+        'errors': 0,
+        'last_frame_time': 0,
+        'connection_lost': False,
+        'decode_drops': 0,
+        'queue_depth': 0,
+        'dropped_frames': 0,
+        'last_seq': 0,
+        'last_tx_seq': 0,
+        'frames_expected': 0,
+        'frames_lost': 0,
+        'loss_rate': 0.0,
+        'jitter_ms': 0.0,
+        'latency_ms': 0.0,
+        'encode_ms': 0.0,
+        'latency_histogram': {label: 0 for label in latency_bucket_labels()},
+        'last_transit_ns': None
+    }
+
+def latency_bucket_labels():
+    """Histogram kova etiketleri ('<10ms', '10-20ms', ..., '>1000ms')"""
+    labels = [f"<{LATENCY_BUCKETS_MS[0]}ms"]
+    for low, high in zip(LATENCY_BUCKETS_MS, LATENCY_BUCKETS_MS[1:]):
+        labels.append(f"{low}-{high}ms")
+    labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+    return labels
+
+def reset_sequence_stats(stats):
+    """Yeni bağlantıda seq'e bağlı alanları sıfırla (server sayaçları baştan başlar)"""
+    stats.update({
+        'last_seq': 0,
+        'last_tx_seq': 0,
+        'frames_expected': 0,
+        'frames_lost': 0,
+        'loss_rate': 0.0,
+        'last_transit_ns': None
+    })
+
+def record_arrival_stats(stats, header, arrival_ns):
+    """Frame header'ındaki tx_seq ve capture_ts_ns ile kayıp ve jitter hesapla
+
+    Kayıp yalnızca server'ın bu bağlantıya gerçekten gönderdiği frame'leri
+    sayan tx_seq'teki boşluklardan hesaplanır. seq yakalama sırasıdır;
+    server onu fps sınırı, yavaş pull veya durağan sahne yüzünden bilerek
+    atlayabildiğinden kayıp sayılmaz. tx_seq göndermeyen server'larda
+    kayıp hesaplanmaz.
+
+    Jitter RFC 3550'deki gibi ardışık frame'lerin transit süresi
+    farklarının yumuşatılmış ortalamasıdır; saat farkından etkilenmez.
+    """
+    seq = header.get('seq')
+    if seq is not None and seq > stats['last_seq']:
+        stats['last_seq'] = seq
+    
+    tx_seq = header.get('tx_seq')
+    if tx_seq is not None:
+        last_tx_seq = stats['last_tx_seq']
+        if tx_seq > last_tx_seq:
+            # İlk frame başlangıç noktasıdır; yayına sonradan katılan
+            # istemci önceki frame'leri kayıp saymaz
+            gap = tx_seq - last_tx_seq if last_tx_seq else 1
+            stats['frames_expected'] += gap
+            stats['frames_lost'] += gap - 1
+            stats['last_tx_seq'] = tx_seq
+        stats['loss_rate'] = stats['frames_lost'] / stats['frames_expected']
+    
+    capture_ts_ns = header.get('capture_ts_ns')
+    if capture_ts_ns is not None:
+        transit_ns = arrival_ns - capture_ts_ns
+        last_transit_ns = stats['last_transit_ns']
+        if last_transit_ns is not None:
+            delta_ms = abs(transit_ns - last_transit_ns) / 1e6
+            stats['jitter_ms'] += (delta_ms - stats['jitter_ms']) / 16.0
+        stats['last_transit_ns'] = transit_ns
+    
+    if 'encode_ms' in header:
+        stats['encode_ms'] = header['encode_ms']
+
+def record_latency_stats(stats, header, display_ns):
+    """Yakalamadan GUI'ye teslime kadar geçen süreyi histograma ekle
+
+    Server ve istemci saatlerinin (NTP/chrony) senkron olduğu varsayılır.
+    """
+    capture_ts_ns = header.get('capture_ts_ns')
+    if capture_ts_ns is None:
+        return
+    
+    latency_ms = max(0.0, (display_ns - capture_ts_ns) / 1e6)
+    stats['latency_ms'] = latency_ms
+    
+    histogram = stats['latency_histogram']
+    for bound, label in zip(LATENCY_BUCKETS_MS, histogram):
+        if latency_ms < bound:
+            histogram[label] += 1
+            return
+    histogram[f">{LATENCY_BUCKETS_MS[-1]}ms"] += 1
+
+def record_frame_stats(stats, current_time):
+    """Yayınlanan frame'i istatistiklere işle"""
+    stats['frames_received'] += 1
+    stats['frame_count_for_fps'] += 1
+    stats['last_frame_time'] = current_time
+    stats['connection_lost'] = False
+    
+    # FPS hesapla (her 5 frame'de bir - çok sık güncelle)
+    if stats['frame_count_for_fps'] >= 5:
+        fps_elapsed = current_time - stats['last_fps_time']
+        if fps_elapsed > 0:
+            stats['fps'] = 5.0 / fps_elapsed
+        stats['last_fps_time'] = current_time
+        stats['frame_count_for_fps'] = 0
+
+class FrameBufferPool:
+    """recv_into ile doldurulan, yeniden kullanılabilir frame buffer havuzu
+
+    Buffer'lar decode bitene kadar kullanıcıda kalır ve release() ile havuza
+    geri döner; böylece her frame için yeni bytes nesnesi oluşturulmaz.
+    """
+    
+    def __init__(self, max_buffers=8, initial_size=512 * 1024):
+        self.max_buffers = max_buffers
+        self.initial_size = initial_size
+        self.allocations = 0
+        self._free = []
+        self._lock = threading.Lock()
+    
+    def acquire(self, size):
+        """En az size byte kapasiteli bir buffer döndür"""
+        with self._lock:
+            # Yeterince büyük boş buffer varsa onu kullan
+            for i, buf in enumerate(self._free):
+                if len(buf) >= size:
+                    return self._free.pop(i)
+            # Küçük kalan buffer'ı at, yerine büyüğünü ayır
+            if self._free:
+                self._free.pop(0)
+            self.allocations += 1
+        
+        # Büyüyen frame'lerde sık yeniden ayırmayı önlemek için pay bırak
+        return bytearray(max(self.initial_size, size + size // 2))
+    
+    def release(self, buf):
+        """Decode'u biten buffer'ı havuza geri ver"""
+        if buf is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_buffers:
+                self._free.append(buf)
+
+class FrameMailbox:
+    """Kamera başına en yeni N frame'i tutan ring mailbox
+
+    Yeni frame geldiğinde en eski frame ezilir; hiç okunmadan ezilen
+    frame'ler frames_dropped ile sayılır. Her tüketici kendi son seq
+    değerini tutarak kendi hızında okur, alıcı thread hiç bloklanmaz.
+    """
+    
+    def __init__(self, slots=1):
+        self.slots = max(1, int(slots))
+        self.frames_put = 0
+        self.frames_dropped = 0
+        self._frames = deque(maxlen=self.slots)  # (seq, frame)
+        self._seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+    
+    def put(self, frame):
+        """Frame'i ekle, atanan seq'i döndür"""
+        with self._cond:
+            if len(self._frames) == self.slots and self._frames[0][0] > self._read_seq:
+                self.frames_dropped += 1
+            self._seq += 1
+            self._frames.append((self._seq, frame))
+            self.frames_put += 1
+            self._cond.notify_all()
+            return self._seq
+    
+    def mark_read(self, seq):
+        """seq'e kadar olan frame'leri teslim edilmiş say"""
+        with self._cond:
+            self._read_seq = max(self._read_seq, seq)
+    
+    def get_latest(self, after_seq=0):
+        """after_seq'ten yeni en son frame'i (seq, frame) olarak döndür"""
+        with self._cond:
+            if not self._frames or self._frames[-1][0] <= after_seq:
+                return after_seq, None
+            seq, frame = self._frames[-1]
+            self._read_seq = max(self._read_seq, seq)
+            return seq, frame
+    
+    def get_next(self, after_seq=0):
+        """after_seq'ten sonraki en eski frame'i döndür (kayıt gibi sıralı tüketiciler için)"""
+        with self._cond:
+            for seq, frame in self._frames:
+                if seq > after_seq:
+                    self._read_seq = max(self._read_seq, seq)
+                    return seq, frame
+            return after_seq, None
+    
+    def wait_latest(self, after_seq=0, timeout=None):
+        """Yeni frame gelene kadar bekle (en fazla timeout saniye)"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._frames and self._frames[-1][0] > after_seq,
+                timeout
+            )
+        return self.get_latest(after_seq)
+    
+    def depth(self):
+        """Henüz hiçbir tüketiciye teslim edilmemiş frame sayısı"""
+        with self._cond:
+            return sum(1 for seq, _ in self._frames if seq > self._read_seq)
+
 class CameraClient(QObject):
     # PyQt sinyalleri
     frame_received = pyqtSignal(int, np.ndarray)  # camera_id, frame
@@ -22,11 +267,38 @@ class CameraClient(QObject):
     error_occurred = pyqtSignal(str)              # error_message
     camera_list_updated = pyqtSignal(list)        # camera_ids
     stats_updated = pyqtSignal(dict)              # camera_stats
+    depth_received = pyqtSignal(int, np.ndarray)        # camera_id, uint16 mm (H, W)
+    point_cloud_received = pyqtSignal(int, np.ndarray)  # camera_id, float16 m (H, W, 3)
     
-    def __init__(self, server_host="localhost", server_port=9995):
+    def __init__(self, server_host="localhost", server_port=9995, pipeline_depth=1,
+                 stream_mode='auto', decode_workers=3, frame_slots=1, adaptive=False,
+                 target_latency_ms=150, profile=None, transport='tcp', udp_deadline_ms=100,
+                 multicast_interface=None):
         super().__init__()
         self.server_host = server_host
         self.server_port = server_port
+        
+        # Kamera başına aynı anda yolda olabilecek get_frame isteği (1 = lockstep)
+        self.pipeline_depth = max(1, int(pipeline_depth))
+        
+        # 'pull' = get_frame istekleri, 'push' = subscribe, 'auto' = server destekliyorsa push
+        self.stream_mode = stream_mode
+        self.push_active = False
+        
+        # Server'ın encode profili (ör. 'thumbnail'); None = server varsayılanı
+        self.profile = profile
+        
+        # İstenen bölge [x, y, w, h] (0-1 oranları) ve çıktı boyutu; None = tam frame
+        self.roi = None
+        self.output_size = None
+        
+        # Push frame'lerinin aktarımı: 'tcp', 'udp' veya 'multicast'
+        # (kontrol her zaman TCP'de)
+        self.transport = transport
+        self.udp_deadline_ms = udp_deadline_ms
+        self.multicast_interface = multicast_interface
+        self.udp_receiver = None
+        self.push_timeout = 10.0
         self.socket = None
         self.running = False
         self.cameras = []
@@ -35,9 +307,55 @@ class CameraClient(QObject):
         # Thread-safe socket kullanımı için lock
         self.socket_lock = threading.Lock()
         
-        # Her kamera için istatistikler
+        # Her kamera için istatistikler ve en yeni frame mailbox'ları
         self.camera_stats = {}
         self.frame_queues = {}
+        self.frame_slots = frame_slots
+        
+        # Socket okuyucusundan ayrı decode worker sayısı (kontrolcü de kullanır)
+        self.decode_workers = max(1, int(decode_workers))
+        
+        # Throughput, decode süresi ve RTT'ye göre kalite/fps/çözünürlük ayarlayan kontrolcü
+        self.stream_controller = None
+        if adaptive:
+            self.stream_controller = AdaptiveStreamController(
+                target_latency_ms=target_latency_ms,
+                decode_workers=self.decode_workers
+            )
+        
+        # Kamera başına decode ölçeği (1, 2, 4, 8) ve görüntü alanı boyutları
+        self.decode_scales = {}
+        self.auto_decode_scale = True
+        self._display_sizes = {}
+        self._full_frame_sizes = {}
+        
+        # frame_received kamera başına en fazla bir bekleyen sinyalle sınırlı
+        self._signal_lock = threading.Lock()
+        self._signal_pending = {}
+        self._signaled_seq = {}
+        self.frame_received.connect(self._on_frame_delivered)
+        
+        # Sıfır kopya alım için buffer havuzu ve uzunluk prefix buffer'ı
+        self.buffer_pool = FrameBufferPool()
+        self._length_buf = bytearray(4)
+        
+        # Socket okuyucusundan ayrı decode worker havuzu
+        self.decode_executor = None
+        self._decode_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._decode_inflight = {}
+        self._decode_waiting = {}
+        self._arrival_seq = {}
+        self._last_emitted_seq = {}
+        
+        # H.264 akışları: kamera başına durumlu decoder ve sıralı paket kuyruğu
+        self.video_queue_limit = 30
+        self._video_decoders = {}
+        self._video_queues = {}
+        self._video_active = set()
+        
+        # Derinlik / nokta bulutu decode'u: (camera_id, tip) başına tek iş
+        self._measure_inflight = set()
         
         # Bağlantı durumu
         self.connected = False
@@ -63,19 +381,14 @@ class CameraClient(QObject):
             logger.info("✅ Server'a bağlandı")
             
             # İlk mesajı al (kamera listesi)
-            header_data = self.socket.recv(4)
-            if len(header_data) != 4:
+            msg_size = self._recv_length()
+            if msg_size is None:
                 raise Exception("Header alınamadı")
             
-            msg_size = struct.unpack("!I", header_data)[0]
-            
             # JSON mesajını al
-            json_data = b""
-            while len(json_data) < msg_size:
-                chunk = self.socket.recv(msg_size - len(json_data))
-                if not chunk:
-                    break
-                json_data += chunk
+            json_data = self._recv_exact(msg_size)
+            if json_data is None:
+                raise Exception("Kamera listesi alınamadı")
             
             camera_info = json.loads(json_data.decode('utf-8'))
             
@@ -88,6 +401,9 @@ class CameraClient(QObject):
                 logger.info(f"  📐 Çözünürlük: {self.server_info['resolution']}")
                 logger.info(f"  💾 Kalite: {self.server_info['quality']}%")
                 logger.info(f"  📹 Kameralar: {self.cameras}")
+                logger.info(f"  📡 Push desteği: {self.server_supports_push()}")
+                if self.server_info.get('codec'):
+                    logger.info(f"  🎞️ Codec: {self.server_info['codec']}")
                 
                 # Kamera listesini sinyal ile gönder
                 self.camera_list_updated.emit(self.cameras)
@@ -110,6 +426,93 @@ class CameraClient(QObject):
             logger.error(error_msg)
             return False
     
+    def server_supports_push(self):
+        """Server camera_list handshake'inde push modunu duyurdu mu?"""
+        return bool(self.server_info.get('push_supported', False))
+    
+    def server_supports_pull(self):
+        """Server get_frame isteklerini yanıtlıyor mu? (yayın sunucuları yalnızca push)"""
+        return bool(self.server_info.get('pull_supported', True))
+    
+    def subscribe(self, camera_ids=None, fps=None, quality=None):
+        """Server'dan frame'leri istek göndermeden push etmesini iste
+        
+        quality verilmezse profilin kalitesi kullanılır; verilirse server
+        bu abonelik için ayrı bir encode anahtarı açar.
+        """
+        request = {
+            'type': 'subscribe',
+            'camera_ids': list(camera_ids if camera_ids is not None else self.cameras),
+            'fps': fps if fps is not None else self.server_info.get('fps', 30)
+        }
+        if quality is not None:
+            request['quality'] = quality
+        self._add_view_fields(request)
+        if self.udp_receiver is not None and self.udp_receiver.multicast_group:
+            request['transport'] = 'multicast'
+        elif self.udp_receiver is not None:
+            request['transport'] = 'udp'
+            request['udp_port'] = self.udp_receiver.port
+        return self.send_request_safe(request)
+    
+    def _open_udp_receiver(self):
+        """UDP/multicast aktarımı istendiyse ve server destekliyorsa alıcı socket'i aç"""
+        if self.transport == 'multicast':
+            multicast = self.server_info.get('multicast')
+            if not multicast:
+                logger.warning("⚠️ Server multicast yayını yapmıyor, TCP kullanılıyor")
+                return
+            self.udp_receiver = UdpFrameReceiver(
+                self.buffer_pool, self.udp_deadline_ms,
+                port=multicast['port'],
+                multicast_group=multicast['group'],
+                multicast_interface=self.multicast_interface
+            )
+            logger.info(f"📡 Multicast grubuna katılındı: {multicast['group']}:{multicast['port']} "
+                        f"({multicast.get('profile')})")
+            return
+        
+        if self.transport != 'udp':
+            return
+        if not self.server_info.get('udp_supported', False):
+            logger.warning("⚠️ Server UDP aktarımını desteklemiyor, TCP kullanılıyor")
+            return
+        self.udp_receiver = UdpFrameReceiver(self.buffer_pool, self.udp_deadline_ms)
+        logger.info(f"📦 UDP aktarımı: port {self.udp_receiver.port}, deadline {self.udp_deadline_ms}ms")
+    
+    def _close_udp_receiver(self):
+        if self.udp_receiver is not None:
+            self.udp_receiver.close()
+            self.udp_receiver = None
+    
+    def set_roi(self, roi=None, output_size=None):
+        """Server'dan yalnızca bir bölgeyi iste (kesme encode'dan önce yapılır)
+        
+        roi [x, y, w, h] tam frame'e oranla 0-1 aralığında, output_size
+        [w, h] piksel; ikisi de None ise tam frame'e dönülür. Push modunda
+        abonelik yeni bölgeyle yenilenir, pull modunda sonraki istekler
+        bölgeyi taşır.
+        """
+        self.roi = list(roi) if roi is not None else None
+        self.output_size = list(output_size) if output_size is not None else None
+        if self.push_active:
+            return self.subscribe()
+        return True
+    
+    def _add_view_fields(self, request):
+        """İsteğe profil, ROI ve çıktı boyutu alanlarını ekle"""
+        if self.profile:
+            request['profile'] = self.profile
+        if self.roi is not None:
+            request['roi'] = self.roi
+        if self.output_size is not None:
+            request['output_size'] = self.output_size
+        return request
+    
+    def unsubscribe(self):
+        """Push aboneliğini sonlandır"""
+        return self.send_request_safe({'type': 'unsubscribe'})
+    
     def send_request_safe(self, request):
         """Thread-safe request gönderme"""
         try:
@@ -127,53 +530,79 @@ class CameraClient(QObject):
             self.connected = False
             return False
     
+    def _recv_into_exact(self, view):
+        """memoryview tamamen dolana kadar doğrudan içine oku"""
+        total = len(view)
+        received = 0
+        while received < total:
+            count = self.socket.recv_into(view[received:])
+            if count == 0:
+                return False
+            received += count
+        return True
+    
+    def _recv_length(self):
+        """4 byte'lık !I uzunluk prefix'ini oku"""
+        with memoryview(self._length_buf) as view:
+            if not self._recv_into_exact(view):
+                return None
+        return struct.unpack_from("!I", self._length_buf)[0]
+    
+    def _recv_exact(self, size):
+        """Tam size byte oku (küçük JSON mesajları için)"""
+        data = bytearray(size)
+        with memoryview(data) as view:
+            if not self._recv_into_exact(view):
+                return None
+        return data
+    
     def receive_response_safe(self):
-        """Thread-safe response alma"""
+        """Thread-safe response alma
+        
+        Frame verisi havuzdan alınan buffer'a recv_into ile yazılır ve
+        memoryview olarak döner. Çağıran taraf decode bittikten sonra
+        release_response() ile buffer'ı havuza geri vermelidir.
+        """
         try:
             with self.socket_lock:
                 if not self.connected:
                     return None
                     
                 # Header al
-                header_data = self.socket.recv(4)
-                if len(header_data) != 4:
+                header_size = self._recv_length()
+                if header_size is None:
                     return None
                 
-                header_size = struct.unpack("!I", header_data)[0]
-                
                 # Header JSON al
-                header_json_data = b""
-                while len(header_json_data) < header_size:
-                    chunk = self.socket.recv(header_size - len(header_json_data))
-                    if not chunk:
-                        return None
-                    header_json_data += chunk
+                header_json_data = self._recv_exact(header_size)
+                if header_json_data is None:
+                    return None
                 
                 header = json.loads(header_json_data.decode('utf-8'))
                 
-                # Frame data varsa al
-                if header['type'] == 'frame':
-                    frame_size_data = self.socket.recv(4)
-                    if len(frame_size_data) != 4:
+                # Frame (veya derinlik ölçümü) verisi varsa al
+                if header['type'] == 'frame' or header['type'] in MEASURE_MESSAGE_TYPES:
+                    frame_size = self._recv_length()
+                    if frame_size is None:
                         return None
                     
-                    frame_size = struct.unpack("!I", frame_size_data)[0]
-                    
-                    frame_data = b""
-                    while len(frame_data) < frame_size:
-                        chunk = self.socket.recv(min(frame_size - len(frame_data), 65536))
-                        if not chunk:
-                            return None
-                        frame_data += chunk
+                    buffer = self.buffer_pool.acquire(frame_size)
+                    frame_view = memoryview(buffer)[:frame_size]
+                    if not self._recv_into_exact(frame_view):
+                        frame_view.release()
+                        self.buffer_pool.release(buffer)
+                        return None
                     
                     return {
                         'header': header,
-                        'frame_data': frame_data
+                        'frame_data': frame_view,
+                        'buffer': buffer
                     }
                 else:
                     return {
                         'header': header,
-                        'frame_data': None
+                        'frame_data': None,
+                        'buffer': None
                     }
                     
         except Exception as e:
@@ -182,19 +611,384 @@ class CameraClient(QObject):
             self.connected = False
             return None
     
+    def release_response(self, response):
+        """Response'un frame buffer'ını havuza geri ver"""
+        frame_view = response.get('frame_data')
+        if frame_view is not None:
+            frame_view.release()
+        self.buffer_pool.release(response.get('buffer'))
+    
+    def decode_frame(self, frame_data, flags=cv2.IMREAD_COLOR):
+        """Buffer'ı kopyalamadan JPEG decode et"""
+        frame_np = np.frombuffer(frame_data, dtype=np.uint8)
+        try:
+            return cv2.imdecode(frame_np, flags)
+        finally:
+            del frame_np
+    
+    def _ensure_stats(self, camera_id):
+        """Kamera için istatistik kaydı yoksa oluştur"""
+        if camera_id not in self.camera_stats:
+            self.camera_stats[camera_id] = create_camera_stats()
+        return self.camera_stats[camera_id]
+    
+    def get_mailbox(self, camera_id):
+        """Kameranın frame mailbox'ını döndür (yoksa oluştur)"""
+        mailbox = self.frame_queues.get(camera_id)
+        if mailbox is None:
+            mailbox = self.frame_queues.setdefault(camera_id, FrameMailbox(self.frame_slots))
+        return mailbox
+    
+    def get_latest_frame(self, camera_id, after_seq=0):
+        """Kameranın en yeni frame'ini (seq, frame) olarak döndür"""
+        return self.get_mailbox(camera_id).get_latest(after_seq)
+    
+    def _handle_response(self, camera_id, response):
+        """Gelen response'u işle (frame, no_frame veya error)"""
+        header = response['header']
+        
+        if header['type'] == 'frame' and response['frame_data']:
+            if self.stream_controller is not None:
+                self.stream_controller.record_frame(camera_id, len(response['frame_data']))
+            
+            # Kayıp ve jitter varış anında ölçülür
+            with self._stats_lock:
+                stats = self._ensure_stats(camera_id)
+                lost_before = stats['frames_lost']
+                record_arrival_stats(stats, header, time.time_ns())
+                lost = stats['frames_lost'] - lost_before
+            if lost and self.stream_controller is not None:
+                self.stream_controller.record_loss(camera_id, lost)
+            
+            # Decode socket okuyucusunu bekletmesin, worker havuzuna gönder
+            self._submit_decode(camera_id, response)
+        
+        elif header['type'] in MEASURE_MESSAGE_TYPES and response['frame_data']:
+            self._submit_measure_decode(camera_id, response)
+        
+        elif header['type'] == 'no_frame':
+            # Frame hazır değil, devam et
+            pass
+            
+        elif header['type'] == 'error':
+            error_msg = f"❌ Server hatası: {header['message']}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+            if camera_id in self.camera_stats:
+                self.camera_stats[camera_id]['errors'] += 1
+    
+    def set_decode_scale(self, camera_id, scale):
+        """Kamera için decode ölçeğini elle ayarla (1, 2, 4 veya 8)"""
+        if scale not in DECODE_SCALE_FLAGS:
+            raise ValueError(f"Geçersiz decode ölçeği: {scale}")
+        self.decode_scales[camera_id] = scale
+    
+    def set_display_size(self, width, height, camera_id=None):
+        """Görüntü widget'ının boyutuna göre decode ölçeğini seç
+        
+        camera_id verilmezse tüm kameralara uygulanır. 0 boyut (gizli
+        widget) en küçük ölçeği (1/8) seçer.
+        """
+        camera_ids = [camera_id] if camera_id is not None else list(self.cameras)
+        for cid in camera_ids:
+            self._display_sizes[cid] = (width, height)
+            if self.auto_decode_scale:
+                self.decode_scales[cid] = self._pick_decode_scale(cid)
+    
+    def _pick_decode_scale(self, camera_id):
+        """Görüntü alanını doldurmaya yeten en küçük decode boyutunu bul"""
+        width, height = self._display_sizes.get(camera_id, (0, 0))
+        if width <= 0 or height <= 0:
+            return 8
+        
+        full_size = self._full_frame_sizes.get(camera_id)
+        if full_size is None:
+            return 1
+        
+        full_width, full_height = full_size
+        for scale in (8, 4, 2):
+            if full_width // scale >= width and full_height // scale >= height:
+                return scale
+        return 1
+    
+    def _submit_decode(self, camera_id, response):
+        """Frame'i decode havuzuna ver (kamera başına en yeni frame kazanır)
+        
+        Bir kamera için decode_workers kadar iş zaten çalışıyorsa frame
+        tek kişilik bekleme yuvasına yazılır; yuvadaki eski frame düşürülür.
+        """
+        seq = response['header'].get('seq')
+        
+        with self._decode_lock:
+            if seq is None:
+                # Server seq göndermiyorsa geliş sırasını kullan
+                seq = self._arrival_seq.get(camera_id, 0) + 1
+            self._arrival_seq[camera_id] = seq
+        
+        if response['header'].get('codec') == 'h264':
+            self._submit_video_decode(camera_id, seq, response)
+            return
+        
+        with self._decode_lock:
+            if self._decode_inflight.get(camera_id, 0) < self.decode_workers:
+                self._decode_inflight[camera_id] = self._decode_inflight.get(camera_id, 0) + 1
+                dropped = None
+            else:
+                dropped = self._decode_waiting.get(camera_id)
+                self._decode_waiting[camera_id] = (seq, response)
+                response = None
+        
+        if dropped is not None:
+            self.release_response(dropped[1])
+            self._ensure_stats(camera_id)['decode_drops'] += 1
+        
+        if response is not None:
+            self.decode_executor.submit(self._decode_job, camera_id, seq, response)
+    
+    def _decode_job(self, camera_id, seq, response):
+        """Worker thread'inde decode et, sırası geçmiş frame'leri at"""
+        try:
+            while response is not None:
+                frame = None
+                header = response['header']
+                try:
+                    # Daha yeni bir frame zaten gösterildiyse decode etmeye gerek yok
+                    if seq > self._last_emitted_seq.get(camera_id, 0):
+                        scale = self.decode_scales.get(camera_id, 1)
+                        decode_start = time.perf_counter()
+                        frame = self.decode_frame(response['frame_data'], DECODE_SCALE_FLAGS[scale])
+                        if self.stream_controller is not None:
+                            self.stream_controller.record_decode(
+                                camera_id, (time.perf_counter() - decode_start) * 1000.0
+                            )
+                        if frame is not None:
+                            self._update_full_frame_size(camera_id, frame, scale)
+                finally:
+                    self.release_response(response)
+                
+                with self._decode_lock:
+                    stale = seq <= self._last_emitted_seq.get(camera_id, 0)
+                    publish = frame is not None and not stale
+                    if publish:
+                        self._last_emitted_seq[camera_id] = seq
+                    
+                    # Bekleme yuvasında frame varsa aynı worker'da devam et
+                    waiting = self._decode_waiting.pop(camera_id, None)
+                    if waiting is None:
+                        self._decode_inflight[camera_id] = max(
+                            0, self._decode_inflight.get(camera_id, 0) - 1
+                        )
+                
+                if publish:
+                    self._publish_frame(camera_id, frame, header)
+                elif stale:
+                    self._ensure_stats(camera_id)['decode_drops'] += 1
+                
+                seq, response = waiting if waiting is not None else (None, None)
+        except Exception as e:
+            error_msg = f"❌ Frame decode hatası: {e}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+    
+    def _submit_video_decode(self, camera_id, seq, response):
+        """H.264 frame'ini kameranın sıralı kuyruğuna ekle
+        
+        Inter-frame akışta frame atlanamaz; decode yetişemeyip kuyruk
+        dolarsa bekleyen frame'lerin hepsi atılır ve decoder bir sonraki
+        anahtar frame'e kadar bekler.
+        """
+        dropped = []
+        with self._decode_lock:
+            video_queue = self._video_queues.setdefault(camera_id, deque())
+            if len(video_queue) >= self.video_queue_limit:
+                dropped = list(video_queue)
+                video_queue.clear()
+                decoder = self._video_decoders.get(camera_id)
+                if decoder is not None:
+                    decoder.resync()
+            video_queue.append((seq, response))
+            
+            start = camera_id not in self._video_active
+            if start:
+                self._video_active.add(camera_id)
+        
+        for _, dropped_response in dropped:
+            self.release_response(dropped_response)
+        if dropped:
+            self._ensure_stats(camera_id)['decode_drops'] += len(dropped)
+        
+        if start:
+            self.decode_executor.submit(self._video_decode_job, camera_id)
+    
+    def _video_decode_job(self, camera_id):
+        """Kameranın H.264 kuyruğunu tek worker'da sırayla decode et"""
+        if camera_id not in self._video_decoders:
+            self._video_decoders[camera_id] = create_h264_decoder()
+        decoder = self._video_decoders[camera_id]
+        
+        while True:
+            with self._decode_lock:
+                video_queue = self._video_queues.get(camera_id)
+                if not video_queue:
+                    self._video_active.discard(camera_id)
+                    return
+                seq, response = video_queue.popleft()
+            
+            header = response['header']
+            frame = None
+            try:
+                if decoder is not None:
+                    decode_start = time.perf_counter()
+                    frame = decoder.decode(response['frame_data'], header.get('keyframe', False))
+                    if self.stream_controller is not None:
+                        self.stream_controller.record_decode(
+                            camera_id, (time.perf_counter() - decode_start) * 1000.0
+                        )
+            except Exception as e:
+                error_msg = f"❌ Frame decode hatası: {e}"
+                self.error_occurred.emit(error_msg)
+                logger.error(error_msg)
+            finally:
+                self.release_response(response)
+            
+            if frame is not None:
+                with self._decode_lock:
+                    self._last_emitted_seq[camera_id] = seq
+                self._publish_frame(camera_id, frame, header)
+    
+    def _submit_measure_decode(self, camera_id, response):
+        """Derinlik / nokta bulutu mesajını decode havuzuna ver
+        
+        Önceki ölçüm hâlâ decode ediliyorsa yenisi atılır; bu veriler
+        yalnızca en güncel haliyle anlamlıdır.
+        """
+        key = (camera_id, response['header']['type'])
+        with self._decode_lock:
+            busy = key in self._measure_inflight
+            if not busy:
+                self._measure_inflight.add(key)
+        
+        if busy:
+            self.release_response(response)
+            self._ensure_stats(camera_id)['decode_drops'] += 1
+            return
+        self.decode_executor.submit(self._measure_decode_job, camera_id, key, response)
+    
+    def _measure_decode_job(self, camera_id, key, response):
+        """Worker thread'inde ölçümü çöz ve ilgili sinyali gönder"""
+        header = response['header']
+        try:
+            measure = decode_measure(header, response['frame_data'])
+        except Exception as e:
+            measure = None
+            error_msg = f"❌ {header['type']} decode hatası: {e}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+        finally:
+            self.release_response(response)
+            with self._decode_lock:
+                self._measure_inflight.discard(key)
+        
+        if measure is None:
+            return
+        if header['type'] == 'depth':
+            self.depth_received.emit(camera_id, measure)
+        else:
+            self.point_cloud_received.emit(camera_id, measure)
+    
+    def _update_full_frame_size(self, camera_id, frame, scale):
+        """Tam çözünürlüğü takip et, değişirse ölçeği yeniden seç"""
+        full_size = (frame.shape[1] * scale, frame.shape[0] * scale)
+        if self._full_frame_sizes.get(camera_id) != full_size:
+            self._full_frame_sizes[camera_id] = full_size
+            if self.auto_decode_scale and camera_id in self._display_sizes:
+                self.decode_scales[camera_id] = self._pick_decode_scale(camera_id)
+    
+    def _publish_frame(self, camera_id, frame, header=None):
+        """Decode edilmiş frame'i mailbox'a yaz ve istatistikleri güncelle"""
+        mailbox = self.get_mailbox(camera_id)
+        seq = mailbox.put(frame)
+        
+        with self._stats_lock:
+            current_time = time.time()
+            
+            # İstatistikleri güncelle
+            stats = self._ensure_stats(camera_id)
+            record_frame_stats(stats, current_time)
+            if header is not None:
+                record_latency_stats(stats, header, time.time_ns())
+            stats['queue_depth'] = mailbox.depth()
+            stats['dropped_frames'] = mailbox.frames_dropped
+        
+        # GUI önceki frame'i henüz işlemediyse sinyal kuyruğu büyütülmez;
+        # teslimde mailbox'taki en yeni frame gönderilir
+        with self._signal_lock:
+            emit = not self._signal_pending.get(camera_id, False)
+            if emit:
+                self._signal_pending[camera_id] = True
+                self._signaled_seq[camera_id] = seq
+        
+        if emit:
+            mailbox.mark_read(seq)
+            self.frame_received.emit(camera_id, frame)
+            
+            # İstatistikleri güncelle sinyali
+            self.stats_updated.emit(self.camera_stats)
+    
+    def _on_frame_delivered(self, camera_id, frame):
+        """frame_received Qt tarafında işlendi; arada gelen frame varsa onu gönder"""
+        mailbox = self.get_mailbox(camera_id)
+        with self._signal_lock:
+            seq, latest = mailbox.get_latest(self._signaled_seq.get(camera_id, 0))
+            if latest is None:
+                self._signal_pending[camera_id] = False
+                return
+            self._signaled_seq[camera_id] = seq
+        
+        self.frame_received.emit(camera_id, latest)
+        self.stats_updated.emit(self.camera_stats)
+    
+    def _run_adaptive_control(self):
+        """Kontrolcünün ürettiği ayar isteklerini server'a gönder"""
+        if self.stream_controller is None:
+            return
+        for request in self.stream_controller.evaluate():
+            logger.info(f"🎚️ Adaptif ayar: {request}")
+            self.send_request_safe(request)
+    
+    def _request_interval(self, camera_id, target_fps):
+        """Kamera için get_frame aralığı (adaptif kontrolcü fps'i düşürmüş olabilir)"""
+        if self.stream_controller is not None and camera_id in self.stream_controller.cameras:
+            target_fps = self.stream_controller.cameras[camera_id].fps
+        if self.pipeline_depth > 1:
+            # Pencere RTT'yi gizlediği için hedef fps kadar istek yeterli
+            return 1.0 / target_fps
+        return 1.0 / (target_fps * 3)  # 3x daha hızlı request
+    
     def frame_receiver_thread(self):
-        """Tüm kameralar için frame alma thread'i"""
-        logger.info("🎥 Frame receiver thread başlatılıyor...")
+        """Tüm kameralar için frame alma thread'i
         
-        # Her kamera için son request zamanı
+        Her kamera için en fazla pipeline_depth kadar get_frame isteği
+        aynı anda yolda olabilir (kredi penceresi). Response'lar header'daki
+        camera_id ile kameralara eşleştirilir; böylece her frame tam bir
+        round trip beklemez.
+        """
+        logger.info(f"🎥 Frame receiver thread başlatılıyor (pipeline: {self.pipeline_depth})...")
+        
+        # Her kamera için son request zamanı ve yoldaki istek sayısı
         last_request_times = {camera_id: 0 for camera_id in self.cameras}
+        in_flight = {camera_id: 0 for camera_id in self.cameras}
+        
+        # Gönderim sırası - camera_id içermeyen eski server'lar için FIFO eşleştirme
+        pending = deque()
+        
+        # RTT ölçümü için kamera başına gönderim zamanları
+        request_sent_times = {camera_id: deque() for camera_id in self.cameras}
         
         # FPS kontrolü için - maksimum hız
         target_fps = self.server_info.get('fps', 30)
-        frame_interval = 1.0 / (target_fps * 3)  # 3x daha hızlı request
         
-        # Round-robin kamera seçimi
-        camera_index = 0
+        camera_id = None
         
         while self.running and self.main_thread_running and self.connected:
             try:
@@ -204,27 +998,56 @@ class CameraClient(QObject):
                     time.sleep(0.1)
                     continue
                 
-                # Hangi kameradan frame isteyeceğini belirle
-                camera_id = self.cameras[camera_index % len(self.cameras)]
-                camera_index += 1
-                
-                # Bu kameradan ne zaman son frame istendiğini kontrol et
-                if current_time - last_request_times[camera_id] < frame_interval:
-                    continue  # Hiç bekleme
-                
-                # Frame isteği gönder
-                request = {
-                    'type': 'get_frame',
-                    'camera_id': camera_id
-                }
+                # Kredisi olan ve zamanı gelen kameralara istek gönder
+                next_due = None
+                send_failed = False
+                for request_camera_id in self.cameras:
+                    if request_camera_id not in in_flight:
+                        in_flight[request_camera_id] = 0
+                        last_request_times[request_camera_id] = 0
+                    
+                    if in_flight[request_camera_id] >= self.pipeline_depth:
+                        continue
+                    
+                    frame_interval = self._request_interval(request_camera_id, target_fps)
+                    due_time = last_request_times[request_camera_id] + frame_interval
+                    if current_time < due_time:
+                        next_due = due_time if next_due is None else min(next_due, due_time)
+                        continue
+                    
+                    # Frame isteği gönder
+                    request = self._add_view_fields({
+                        'type': 'get_frame',
+                        'camera_id': request_camera_id
+                    })
+                    
+                    if not self.send_request_safe(request):
+                        send_failed = True
+                        break
+                    
+                    in_flight[request_camera_id] += 1
+                    pending.append(request_camera_id)
+                    request_sent_times.setdefault(request_camera_id, deque()).append(time.perf_counter())
+                    last_request_times[request_camera_id] = current_time
                 
-                if not self.send_request_safe(request):
+                if send_failed:
                     error_msg = "❌ Frame request gönderilemedi - bağlantı koptu"
                     self.error_occurred.emit(error_msg)
                     logger.error(error_msg)
                     break
                 
-                last_request_times[camera_id] = current_time
+                # Sıradaki isteğe kadar bekle; bu sürede response gelirse oku
+                wait_time = 0.1
+                if next_due is not None:
+                    wait_time = max(0.0, next_due - time.time())
+                
+                if not pending:
+                    time.sleep(wait_time)
+                    continue
+                
+                readable, _, _ = select.select([self.socket], [], [], wait_time)
+                if not readable:
+                    continue
                 
                 # Response al
                 response = self.receive_response_safe()
@@ -234,66 +1057,91 @@ class CameraClient(QObject):
                     logger.error(error_msg)
                     break
                 
-                header = response['header']
+                # Response'u kameraya eşleştir ve krediyi geri ver
+                # Derinlik mesajları bir isteğin yanıtı değildir, kredi tüketmez
+                camera_id = response['header'].get('camera_id', pending[0])
+                if camera_id in pending and response['header']['type'] not in MEASURE_MESSAGE_TYPES:
+                    pending.remove(camera_id)
+                    in_flight[camera_id] = max(0, in_flight[camera_id] - 1)
+                    sent_times = request_sent_times.get(camera_id)
+                    if sent_times and self.stream_controller is not None:
+                        self.stream_controller.record_rtt(camera_id, time.perf_counter() - sent_times.popleft())
+                    elif sent_times:
+                        sent_times.popleft()
                 
-                if header['type'] == 'frame' and response['frame_data']:
-                    # Frame decode et
-                    frame_np = np.frombuffer(response['frame_data'], dtype=np.uint8)
-                    frame = cv2.imdecode(frame_np, cv2.IMREAD_COLOR)
-                    
-                    if frame is not None:
-                        # İstatistikleri güncelle
-                        if camera_id not in self.camera_stats:
-                            self.camera_stats[camera_id] = {
-                                'frames_received': 0,
-                                'fps': 0,
-                                'last_fps_time': current_time,
-                                'frame_count_for_fps': 0,
-                                'errors': 0,
-                                'last_frame_time': 0,
-                                'connection_lost': False
-                            }
-                        
-                        stats = self.camera_stats[camera_id]
-                        stats['frames_received'] += 1
-                        stats['frame_count_for_fps'] += 1
-                        stats['last_frame_time'] = current_time
-                        stats['connection_lost'] = False
-                        
-                        # FPS hesapla (her 5 frame'de bir - çok sık güncelle)
-                        if stats['frame_count_for_fps'] >= 5:
-                            fps_elapsed = current_time - stats['last_fps_time']
-                            if fps_elapsed > 0:
-                                stats['fps'] = 5.0 / fps_elapsed
-                            stats['last_fps_time'] = current_time
-                            stats['frame_count_for_fps'] = 0
-                        
-                        # Frame'i PyQt sinyali ile gönder
-                        self.frame_received.emit(camera_id, frame)
-                        
-                        # İstatistikleri güncelle sinyali
-                        self.stats_updated.emit(self.camera_stats)
+                self._handle_response(camera_id, response)
+                self._run_adaptive_control()
                 
-                elif header['type'] == 'no_frame':
-                    # Frame hazır değil, devam et
-                    pass
-                    
-                elif header['type'] == 'error':
-                    error_msg = f"❌ Server hatası: {header['message']}"
+            except Exception as e:
+                error_msg = f"❌ Frame receiver beklenmeyen hata: {e}"
+                self.error_occurred.emit(error_msg)
+                logger.error(error_msg)
+                if camera_id in self.camera_stats:
+                    self.camera_stats[camera_id]['connection_lost'] = True
+                time.sleep(0.1)
+        
+        logger.info("🔚 Frame receiver thread sonlandırıldı")
+    
+    def push_receiver_thread(self):
+        """Push modunda server'ın gönderdiği frame'leri al
+        
+        Tek bir subscribe mesajından sonra istek gönderilmez; thread
+        socket okunabilir olana kadar select ile uyur. UDP aktarımında
+        frame'ler UDP socket'inden, kontrol mesajları TCP'den okunur.
+        """
+        logger.info("📡 Push receiver thread başlatılıyor...")
+        
+        last_activity = time.time()
+        camera_id = None
+        udp_receiver = self.udp_receiver
+        sockets = [self.socket] + ([udp_receiver] if udp_receiver is not None else [])
+        
+        while self.running and self.main_thread_running and self.connected:
+            try:
+                # UDP'de eksik mesajların deadline'ı kaçmasın diye kısa uyunur
+                timeout = 1.0 if udp_receiver is None else self.udp_deadline_ms / 1000.0
+                readable, _, _ = select.select(sockets, [], [], timeout)
+                if udp_receiver is not None:
+                    udp_receiver.expire()
+                if not readable:
+                    if time.time() - last_activity > self.push_timeout:
+                        error_msg = "⏱️ Push akışında veri gelmiyor - bağlantı koptu"
+                        self.error_occurred.emit(error_msg)
+                        logger.error(error_msg)
+                        break
+                    continue
+                
+                if udp_receiver is not None and udp_receiver in readable:
+                    for response in udp_receiver.receive():
+                        last_activity = time.time()
+                        camera_id = response['header'].get('camera_id')
+                        self._handle_response(camera_id, response)
+                    self._run_adaptive_control()
+                    if self.socket not in readable:
+                        continue
+                
+                response = self.receive_response_safe()
+                if not response:
+                    error_msg = "❌ Response alınamadı - bağlantı koptu"
                     self.error_occurred.emit(error_msg)
                     logger.error(error_msg)
-                    if camera_id in self.camera_stats:
-                        self.camera_stats[camera_id]['errors'] += 1
+                    break
+                
+                last_activity = time.time()
+                camera_id = response['header'].get('camera_id')
+                self._handle_response(camera_id, response)
+                self._run_adaptive_control()
                 
             except Exception as e:
-                error_msg = f"❌ Frame receiver beklenmeyen hata: {e}"
+                error_msg = f"❌ Push receiver beklenmeyen hata: {e}"
                 self.error_occurred.emit(error_msg)
                 logger.error(error_msg)
                 if camera_id in self.camera_stats:
                     self.camera_stats[camera_id]['connection_lost'] = True
                 time.sleep(0.1)
         
-        logger.info("🔚 Frame receiver thread sonlandırıldı")
+        self.push_active = False
+        logger.info("🔚 Push receiver thread sonlandırıldı")
     
     def connect(self, host=None, port=None):
         """Bağlantıyı başlat - PyQt uyumlu"""
@@ -306,8 +1154,43 @@ class CameraClient(QObject):
             self.running = True
             self.main_thread_running = True
             
+            # Yeni oturumda server seq'leri baştan başlar
+            with self._decode_lock:
+                self._arrival_seq.clear()
+                self._last_emitted_seq.clear()
+            for stats in self.camera_stats.values():
+                reset_sequence_stats(stats)
+            with self._signal_lock:
+                self._signal_pending.clear()
+            
+            # Decode worker havuzunu başlat
+            if self.decode_executor is None:
+                self.decode_executor = ThreadPoolExecutor(
+                    max_workers=self.decode_workers,
+                    thread_name_prefix="frame-decode"
+                )
+            
+            if self.stream_controller is not None:
+                self.stream_controller.reset(self.cameras, self.server_info)
+            
+            # Push modu seçildiyse abone ol, değilse pull döngüsünü kullan
+            use_push = self.stream_mode == 'push' or (
+                self.stream_mode == 'auto' and self.server_supports_push()
+            )
+            if not use_push and not self.server_supports_pull():
+                logger.warning("⚠️ Server get_frame desteklemiyor, push modu kullanılıyor")
+                use_push = True
+            if use_push:
+                self._open_udp_receiver()
+            if use_push and self.subscribe():
+                self.push_active = True
+                target = self.push_receiver_thread
+            else:
+                self._close_udp_receiver()
+                target = self.frame_receiver_thread
+            
             # Frame receiver thread'ini başlat
-            receiver_thread = threading.Thread(target=self.frame_receiver_thread)
+            receiver_thread = threading.Thread(target=target)
             receiver_thread.daemon = True
             receiver_thread.start()
             
@@ -316,6 +1199,10 @@ class CameraClient(QObject):
     
     def disconnect(self):
         """Bağlantıyı kes - PyQt uyumlu"""
+        if self.push_active:
+            self.unsubscribe()
+            self.push_active = False
+        
         self.running = False
         self.main_thread_running = False
         self.connected = False
@@ -325,6 +1212,25 @@ class CameraClient(QObject):
                 self.socket.close()
             except:
                 pass
+        self._close_udp_receiver()
+        
+        # Decode havuzunu kapat ve bekleyen buffer'ları geri ver
+        if self.decode_executor is not None:
+            self.decode_executor.shutdown(wait=False)
+            self.decode_executor = None
+        with self._decode_lock:
+            waiting = list(self._decode_waiting.values())
+            self._decode_waiting.clear()
+            self._decode_inflight.clear()
+            
+            # Yeni bağlantı yeni decoder ile anahtar frame'den başlar
+            for video_queue in self._video_queues.values():
+                waiting.extend(video_queue)
+            self._video_queues.clear()
+            self._video_decoders.clear()
+            self._video_active.clear()
+        for _, response in waiting:
+            self.release_response(response)
         
         self.connection_status.emit(False, "Bağlantı kesildi")
         logger.info("🔌 Bağlantı kesildi")
@@ -344,6 +1250,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='🎥 Network Multi Camera Client')
     parser.add_argument('server_ip', help='Server IP adresi')
     parser.add_argument('--port', type=int, default=9995, help='Server port numarası')
+    parser.add_argument('--pipeline', type=int, default=1, help='Kamera başına yoldaki istek sayısı')
+    parser.add_argument('--mode', choices=['auto', 'pull', 'push'], default='auto', help='Akış modu')
+    parser.add_argument('--adaptive', action='store_true', help='Bağlantıya göre kalite/fps ayarla')
+    parser.add_argument('--profile', help='Server encode profili (ör. thumbnail, full)')
+    parser.add_argument('--roi', type=float, nargs=4, metavar=('X', 'Y', 'W', 'H'),
+                        help='İstenen bölge (0-1 oranları)')
+    parser.add_argument('--output-size', type=int, nargs=2, metavar=('W', 'H'), help='Bölgenin çıktı boyutu')
+    parser.add_argument('--transport', choices=['tcp', 'udp', 'multicast'], default='tcp', help='Push frame aktarımı')
+    parser.add_argument('--multicast-interface', help='Multicast için yerel arayüz IP adresi')
     parser.add_argument('--verbose', '-v', action='store_true', help='Detaylı log')
     
     args = parser.parse_args()
@@ -354,7 +1269,12 @@ if __name__ == "__main__":
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     
     # Client oluştur
-    client = CameraClient(args.server_ip, args.port)
+    client = CameraClient(args.server_ip, args.port, pipeline_depth=args.pipeline,
+                          stream_mode=args.mode, adaptive=args.adaptive, profile=args.profile,
+                          transport=args.transport, multicast_interface=args.multicast_interface)
+    
+    if args.roi or args.output_size:
+        client.set_roi(args.roi, args.output_size)
     
     try:
         if client.connect():
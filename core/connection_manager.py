@@ -1 +1,591 @@
 # Connection Manager
+# core/connection_manager.py - Çoklu kamera server bağlantı havuzu
+# =============================================================================
+
+import json
+import logging
+import queue
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .camera_client import (
+    FrameMailbox,
+    create_camera_stats,
+    record_arrival_stats,
+    record_frame_stats,
+    record_latency_stats,
+    reset_sequence_stats,
+)
+from .depth_decoder import MEASURE_MESSAGE_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Yeniden bağlanma bekleme süreleri (saniye)
+INITIAL_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+class ServerConnection:
+    """Havuzdaki tek bir kamera server bağlantısının durumu"""
+    
+    def __init__(self, host, port, pipeline_depth=2):
+        self.host = host
+        self.port = port
+        self.key = f"{host}:{port}"
+        self.pipeline_depth = pipeline_depth
+        
+        # 'backoff' -> 'connecting' -> 'handshake' -> 'streaming'
+        self.state = 'backoff'
+        self.sock = None
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self._partial_header = None
+        
+        self.cameras = []
+        self.server_info = {}
+        self.camera_stats = {}
+        # Yalnızca push yapan server'lara get_frame yerine abone olunur
+        self.push_active = False
+        self.in_flight = {}
+        self.pending = deque()
+        self.last_request_times = {}
+        
+        self.retry_delay = INITIAL_RETRY_DELAY
+        self.next_retry = 0.0
+        self.connect_started = 0.0
+        self.last_activity = 0.0
+        self.events = 0
+    
+    def reset(self):
+        """Bağlantıya özel tamponları temizle"""
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self._partial_header = None
+        self.push_active = False
+        self.in_flight = {camera_id: 0 for camera_id in self.cameras}
+        self.pending.clear()
+    
+    def queue_request(self, request):
+        """Uzunluk prefix'li JSON isteği gönderim tamponuna ekle"""
+        request_json = json.dumps(request).encode('utf-8')
+        self.outbox += struct.pack("!I", len(request_json))
+        self.outbox += request_json
+    
+    def parse_messages(self):
+        """inbox'taki tamamlanmış mesajları (header, frame_data) olarak çıkar
+        
+        Yarım kalan frame'in header'ı saklanır; böylece parçalar geldikçe
+        JSON tekrar tekrar çözülmez.
+        """
+        inbox = self.inbox
+        messages = []
+        offset = 0
+        
+        while True:
+            if offset == 0 and self._partial_header is not None:
+                header, header_end = self._partial_header
+            else:
+                if len(inbox) - offset < 4:
+                    break
+                header_size = struct.unpack_from("!I", inbox, offset)[0]
+                header_end = offset + 4 + header_size
+                if len(inbox) < header_end:
+                    break
+                header = json.loads(inbox[offset + 4:header_end].decode('utf-8'))
+            
+            end = header_end
+            frame_data = None
+            if header['type'] == 'frame' or header['type'] in MEASURE_MESSAGE_TYPES:
+                if len(inbox) < header_end + 4:
+                    self._partial_header = (header, header_end - offset)
+                    break
+                frame_size = struct.unpack_from("!I", inbox, header_end)[0]
+                end = header_end + 4 + frame_size
+                if len(inbox) < end:
+                    self._partial_header = (header, header_end - offset)
+                    break
+                frame_data = bytes(inbox[header_end + 4:end])
+            
+            messages.append((header, frame_data))
+            self._partial_header = None
+            offset = end
+        
+        if offset:
+            del inbox[:offset]
+        return messages
+
+class ConnectionManager(QObject):
+    """Tüm kamera server'larını tek selectors/epoll döngüsünde çoğullayan havuz
+    
+    Her server için ayrı thread ve lock yerine tek bir I/O thread'i vardır.
+    Decode worker'ları tüm server'lar arasında paylaşılır; global bant
+    genişliği bütçesi yeni get_frame isteklerini, decode bütçesi ise aynı
+    anda decode edilen frame sayısını sınırlar. get_frame desteklemeyen
+    yayın server'larına abone olunur. Kopan bağlantılar üstel bekleme ile
+    yeniden kurulur.
+    """
+    
+    frame_received = pyqtSignal(str, int, np.ndarray)  # server_key, camera_id, frame
+    connection_status = pyqtSignal(str, bool, str)     # server_key, connected, message
+    camera_list_updated = pyqtSignal(str, list)        # server_key, camera_ids
+    stats_updated = pyqtSignal(str, dict)              # server_key, camera_stats
+    error_occurred = pyqtSignal(str)                   # error_message
+    
+    def __init__(self, decode_workers=3, decode_budget=None, bandwidth_budget=None,
+                 pipeline_depth=2, connect_timeout=10.0, stall_timeout=10.0):
+        super().__init__()
+        self.pipeline_depth = pipeline_depth
+        self.connect_timeout = connect_timeout
+        self.stall_timeout = stall_timeout
+        
+        self.connections = {}
+        self.frame_queues = {}
+        self.running = False
+        self.io_thread = None
+        
+        self.selector = selectors.DefaultSelector()
+        self._commands = queue.Queue()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        
+        # Paylaşılan decode havuzu ve global decode bütçesi
+        self.decode_executor = ThreadPoolExecutor(
+            max_workers=decode_workers,
+            thread_name_prefix="pool-frame-decode"
+        )
+        self.decode_budget = decode_budget or decode_workers * 2
+        self._decode_lock = threading.Lock()
+        self._decode_inflight = 0
+        self._decode_waiting = OrderedDict()
+        
+        # Global bant genişliği bütçesi (byte/s, None = sınırsız)
+        self.bandwidth_budget = bandwidth_budget
+        self._tokens = bandwidth_budget or 0
+        self._tokens_time = time.monotonic()
+        
+        self._stats_lock = threading.Lock()
+    
+    def start(self):
+        """I/O thread'ini başlat"""
+        if self.running:
+            return
+        self.running = True
+        self.io_thread = threading.Thread(target=self._io_loop, name="camera-pool-io")
+        self.io_thread.daemon = True
+        self.io_thread.start()
+        logger.info("🌐 Kamera bağlantı havuzu başlatıldı")
+    
+    def stop(self):
+        """Tüm bağlantıları kapat ve thread'i durdur"""
+        self.running = False
+        self._wake()
+        if self.io_thread and self.io_thread.is_alive():
+            self.io_thread.join(timeout=2)
+        self.decode_executor.shutdown(wait=False)
+        
+        # I/O thread'i hiç başlamadıysa socket'ler burada kapanır
+        for conn in list(self.connections.values()):
+            self._close_socket(conn)
+        self.selector.close()
+        for sock in (self._wakeup_r, self._wakeup_w):
+            try:
+                sock.close()
+            except OSError:
+                pass
+        logger.info("🔚 Kamera bağlantı havuzu durduruldu")
+    
+    def add_server(self, host, port=9995):
+        """Havuza kamera server'ı ekle (herhangi bir thread'den)"""
+        self._commands.put(('add', host, port))
+        self._wake()
+        return f"{host}:{port}"
+    
+    def remove_server(self, host, port=9995):
+        """Server'ı havuzdan çıkar"""
+        self._commands.put(('remove', host, port))
+        self._wake()
+    
+    def get_latest_frame(self, server_key, camera_id, after_seq=0):
+        """Server/kamera için en yeni frame'i (seq, frame) olarak döndür"""
+        mailbox = self.frame_queues.get((server_key, camera_id))
+        if mailbox is None:
+            return after_seq, None
+        return mailbox.get_latest(after_seq)
+    
+    def _wake(self):
+        """select() içindeki I/O thread'ini uyandır"""
+        try:
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _io_loop(self):
+        """Tek thread'lik selectors döngüsü"""
+        while self.running:
+            try:
+                events = self.selector.select(self._next_timeout())
+                for key, mask in events:
+                    if key.fileobj is self._wakeup_r:
+                        self._drain_wakeup()
+                        continue
+                    
+                    conn = key.data
+                    if conn.state == 'connecting':
+                        if mask & selectors.EVENT_WRITE:
+                            self._finish_connect(conn)
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(conn)
+                    if mask & selectors.EVENT_WRITE and conn.sock is not None:
+                        self._flush(conn)
+                
+                self._process_commands()
+                self._service_connections()
+            
+            except Exception as e:
+                error_msg = f"❌ Bağlantı havuzu hatası: {e}"
+                self.error_occurred.emit(error_msg)
+                logger.error(error_msg)
+                time.sleep(0.1)
+        
+        for conn in list(self.connections.values()):
+            self._close_socket(conn)
+    
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(1024):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _process_commands(self):
+        """Diğer thread'lerden gelen ekle/çıkar komutlarını uygula"""
+        while True:
+            try:
+                command, host, port = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            
+            key = f"{host}:{port}"
+            if command == 'add' and key not in self.connections:
+                self.connections[key] = ServerConnection(host, port, self.pipeline_depth)
+                logger.info(f"➕ Havuza server eklendi: {key}")
+            elif command == 'remove' and key in self.connections:
+                conn = self.connections.pop(key)
+                self._close_socket(conn)
+                self.connection_status.emit(key, False, "Bağlantı kesildi")
+                logger.info(f"➖ Server havuzdan çıkarıldı: {key}")
+    
+    def _start_connect(self, conn):
+        """Non-blocking bağlantıyı başlat"""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+            sock.setblocking(False)
+            sock.connect_ex((conn.host, conn.port))
+        except OSError as e:
+            self._fail(conn, f"Bağlantı başlatılamadı: {e}")
+            return
+        
+        conn.sock = sock
+        conn.state = 'connecting'
+        conn.connect_started = time.monotonic()
+        conn.reset()
+        self.selector.register(sock, selectors.EVENT_WRITE, conn)
+        conn.events = selectors.EVENT_WRITE
+    
+    def _finish_connect(self, conn):
+        """Bağlantı tamamlandı mı kontrol et, handshake'i beklemeye geç"""
+        err = conn.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err != 0:
+            self._fail(conn, f"Bağlantı hatası: {err}")
+            return
+        
+        conn.state = 'handshake'
+        conn.last_activity = time.monotonic()
+        self.selector.modify(conn.sock, selectors.EVENT_READ, conn)
+        conn.events = selectors.EVENT_READ
+        logger.info(f"🔗 Server'a bağlanıldı: {conn.key}")
+    
+    def _on_readable(self, conn):
+        """Gelen veriyi oku ve tamamlanan mesajları işle"""
+        try:
+            data = conn.sock.recv(262144)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(conn, f"Okuma hatası: {e}")
+            return
+        
+        if not data:
+            self._fail(conn, "Server bağlantıyı kapattı")
+            return
+        
+        conn.inbox += data
+        conn.last_activity = time.monotonic()
+        if self.bandwidth_budget:
+            self._tokens -= len(data)
+        
+        for header, frame_data in conn.parse_messages():
+            self._handle_message(conn, header, frame_data)
+    
+    def _handle_message(self, conn, header, frame_data):
+        """Handshake veya frame/no_frame/error mesajını işle"""
+        if conn.state == 'handshake':
+            if header.get('type') != 'camera_list':
+                self._fail(conn, "Geçersiz server response")
+                return
+            
+            conn.cameras = header['cameras']
+            conn.server_info = header['server_info']
+            conn.state = 'streaming'
+            conn.retry_delay = INITIAL_RETRY_DELAY
+            conn.reset()
+            
+            # Yeni bağlantıda server tx_seq'i baştan sayar
+            with self._stats_lock:
+                for stats in conn.camera_stats.values():
+                    reset_sequence_stats(stats)
+            
+            if not conn.server_info.get('pull_supported', True):
+                conn.queue_request({
+                    'type': 'subscribe',
+                    'camera_ids': list(conn.cameras),
+                    'fps': conn.server_info.get('fps', 30)
+                })
+                conn.push_active = True
+                self._update_interest(conn)
+            
+            self.connection_status.emit(conn.key, True, "✅ Server'a bağlandı")
+            self.camera_list_updated.emit(conn.key, conn.cameras)
+            logger.info(f"📋 {conn.key} kameraları: {conn.cameras}")
+            return
+        
+        # Derinlik verisi bu havuzda gösterilmez, isteğin yanıtı da değildir
+        if header['type'] in MEASURE_MESSAGE_TYPES:
+            return
+        
+        # Response'u kameraya eşleştir ve krediyi geri ver
+        camera_id = header.get('camera_id')
+        if camera_id is None and conn.pending:
+            camera_id = conn.pending[0]
+        if camera_id in conn.pending:
+            conn.pending.remove(camera_id)
+            conn.in_flight[camera_id] = max(0, conn.in_flight.get(camera_id, 0) - 1)
+        
+        if header['type'] == 'frame' and frame_data:
+            # Kayıp ve jitter varış anında ölçülür
+            with self._stats_lock:
+                record_arrival_stats(self._stats(conn, camera_id), header, time.time_ns())
+            self._submit_decode(conn, camera_id, header, frame_data)
+        elif header['type'] == 'error':
+            error_msg = f"❌ {conn.key} server hatası: {header.get('message')}"
+            self.error_occurred.emit(error_msg)
+            logger.error(error_msg)
+            if camera_id in conn.camera_stats:
+                conn.camera_stats[camera_id]['errors'] += 1
+    
+    def _flush(self, conn):
+        """Gönderim tamponunu non-blocking yaz"""
+        if not conn.outbox:
+            return
+        try:
+            sent = conn.sock.send(conn.outbox)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(conn, f"Gönderim hatası: {e}")
+            return
+        del conn.outbox[:sent]
+    
+    def _refill_tokens(self, now):
+        """Bant genişliği bütçesini zamana göre doldur (en fazla 1 saniyelik)"""
+        if not self.bandwidth_budget:
+            return
+        elapsed = now - self._tokens_time
+        self._tokens_time = now
+        self._tokens = min(self.bandwidth_budget, self._tokens + elapsed * self.bandwidth_budget)
+    
+    def _service_connections(self):
+        """Zaman aşımlarını, yeniden bağlanmayı ve get_frame isteklerini yönet"""
+        now = time.monotonic()
+        self._refill_tokens(now)
+        budget_ok = not self.bandwidth_budget or self._tokens > 0
+        
+        for conn in list(self.connections.values()):
+            if conn.state == 'backoff':
+                if now >= conn.next_retry:
+                    self._start_connect(conn)
+                continue
+            
+            if conn.state in ('connecting', 'handshake'):
+                if now - conn.connect_started > self.connect_timeout:
+                    self._fail(conn, "⏱️ Bağlantı timeout")
+                continue
+            
+            # Push'ta istek beklenmez; keepalive'lar da gelmiyorsa bağlantı ölüdür
+            waiting = conn.push_active or conn.pending
+            if waiting and now - conn.last_activity > self.stall_timeout:
+                self._fail(conn, "⏱️ Server yanıt vermiyor")
+                continue
+            
+            if budget_ok and not conn.push_active:
+                self._queue_frame_requests(conn, now)
+            
+            if conn.outbox:
+                self._flush(conn)
+            self._update_interest(conn)
+    
+    def _frame_interval(self, conn):
+        target_fps = conn.server_info.get('fps', 30)
+        return 1.0 / target_fps
+    
+    def _queue_frame_requests(self, conn, now):
+        """Kredisi olan ve zamanı gelen kameralar için get_frame ekle"""
+        frame_interval = self._frame_interval(conn)
+        for camera_id in conn.cameras:
+            if conn.in_flight.get(camera_id, 0) >= conn.pipeline_depth:
+                continue
+            if now - conn.last_request_times.get(camera_id, 0) < frame_interval:
+                continue
+            
+            conn.queue_request({'type': 'get_frame', 'camera_id': camera_id})
+            conn.in_flight[camera_id] = conn.in_flight.get(camera_id, 0) + 1
+            conn.pending.append(camera_id)
+            conn.last_request_times[camera_id] = now
+    
+    def _next_timeout(self):
+        """select() için bir sonraki zamanlanmış işe kadar süre"""
+        now = time.monotonic()
+        timeout = 1.0
+        
+        for conn in self.connections.values():
+            if conn.state == 'backoff':
+                timeout = min(timeout, conn.next_retry - now)
+            elif conn.state == 'streaming' and not conn.push_active:
+                frame_interval = self._frame_interval(conn)
+                for camera_id in conn.cameras:
+                    if conn.in_flight.get(camera_id, 0) < conn.pipeline_depth:
+                        due = conn.last_request_times.get(camera_id, 0) + frame_interval
+                        timeout = min(timeout, due - now)
+        
+        if self.bandwidth_budget and self._tokens <= 0:
+            timeout = max(timeout, -self._tokens / self.bandwidth_budget)
+        
+        return max(0.0, timeout)
+    
+    def _update_interest(self, conn):
+        """Gönderilecek veri varsa yazma olayını da izle"""
+        if conn.sock is None:
+            return
+        events = selectors.EVENT_READ
+        if conn.outbox:
+            events |= selectors.EVENT_WRITE
+        if events != conn.events:
+            self.selector.modify(conn.sock, events, conn)
+            conn.events = events
+    
+    def _close_socket(self, conn):
+        if conn.sock is None:
+            return
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+        conn.sock = None
+    
+    def _fail(self, conn, reason):
+        """Bağlantıyı kapat ve üstel bekleme ile yeniden denemeyi planla"""
+        was_streaming = conn.state == 'streaming'
+        self._close_socket(conn)
+        conn.reset()
+        conn.state = 'backoff'
+        conn.next_retry = time.monotonic() + conn.retry_delay
+        
+        message = f"❌ {conn.key}: {reason} - {conn.retry_delay:.0f}s sonra tekrar denenecek"
+        conn.retry_delay = min(conn.retry_delay * 2, MAX_RETRY_DELAY)
+        
+        for stats in conn.camera_stats.values():
+            stats['connection_lost'] = True
+        
+        if was_streaming:
+            self.connection_status.emit(conn.key, False, message)
+        logger.warning(message)
+    
+    def _submit_decode(self, conn, camera_id, header, frame_data):
+        """Frame'i ortak decode havuzuna ver; bütçe doluysa en yenisi bekler"""
+        key = (conn.key, camera_id)
+        with self._decode_lock:
+            if self._decode_inflight < self.decode_budget:
+                self._decode_inflight += 1
+                dropped = False
+            else:
+                dropped = key in self._decode_waiting
+                self._decode_waiting[key] = (conn, camera_id, header, frame_data)
+                self._decode_waiting.move_to_end(key)
+                frame_data = None
+        
+        if dropped:
+            with self._stats_lock:
+                self._stats(conn, camera_id)['decode_drops'] += 1
+        
+        if frame_data is not None:
+            self.decode_executor.submit(self._decode_job, conn, camera_id, header, frame_data)
+    
+    def _decode_job(self, conn, camera_id, header, frame_data):
+        """Worker'da decode et; bekleyen iş varsa sıradakine geç"""
+        while frame_data is not None:
+            try:
+                frame = cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    self._publish_frame(conn, camera_id, header, frame)
+            except Exception as e:
+                error_msg = f"❌ Frame decode hatası: {e}"
+                self.error_occurred.emit(error_msg)
+                logger.error(error_msg)
+            
+            # En uzun süredir bekleyen kameranın en yeni frame'ine geç
+            with self._decode_lock:
+                if self._decode_waiting:
+                    _, (conn, camera_id, header, frame_data) = self._decode_waiting.popitem(last=False)
+                else:
+                    self._decode_inflight -= 1
+                    frame_data = None
+    
+    def _stats(self, conn, camera_id):
+        if camera_id not in conn.camera_stats:
+            conn.camera_stats[camera_id] = create_camera_stats()
+        return conn.camera_stats[camera_id]
+    
+    def _publish_frame(self, conn, camera_id, header, frame):
+        """Frame'i mailbox'a yaz ve sinyalle yayınla"""
+        key = (conn.key, camera_id)
+        mailbox = self.frame_queues.get(key)
+        if mailbox is None:
+            mailbox = self.frame_queues.setdefault(key, FrameMailbox())
+        mailbox.mark_read(mailbox.put(frame))
+        
+        with self._stats_lock:
+            stats = self._stats(conn, camera_id)
+            record_frame_stats(stats, time.time())
+            record_latency_stats(stats, header, time.time_ns())
+            stats['queue_depth'] = mailbox.depth()
+            stats['dropped_frames'] = mailbox.frames_dropped
+        
+        self.frame_received.emit(conn.key, camera_id, frame)
+        self.stats_updated.emit(conn.key, conn.camera_stats)
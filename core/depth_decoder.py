@@ -0,0 +1,43 @@
+# Depth Decoder
+# core/depth_decoder.py - ZED derinlik ve nokta bulutu mesajlarının çözülmesi
+# =============================================================================
+
+import cv2
+import numpy as np
+try:
+    import zstandard # type: ignore
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Frame gibi header'dan sonra !I uzunluklu veri taşıyan ölçüm mesajları
+MEASURE_MESSAGE_TYPES = ('depth', 'point_cloud')
+
+def _decompress(header, data):
+    encoding = header.get('encoding')
+    if encoding == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd ile sıkıştırılmış veri için zstandard paketi gerekli")
+        return zstandard.ZstdDecompressor().decompress(bytes(data))
+    return data
+
+def decode_depth(header, data):
+    """'depth' mesajını uint16 milimetre (H, W) diziye çevir (0 = geçersiz)"""
+    if header.get('encoding') == 'png':
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    
+    raw = _decompress(header, data)
+    depth = np.frombuffer(raw, dtype=np.uint16)
+    return depth.reshape(header['height'], header['width']).copy()
+
+def decode_point_cloud(header, data):
+    """'point_cloud' mesajını float16 (H, W, 3) metre diziye çevir (NaN = geçersiz)"""
+    raw = _decompress(header, data)
+    points = np.frombuffer(raw, dtype=np.float16)
+    return points.reshape(header['shape']).copy()
+
+def decode_measure(header, data):
+    """Mesaj tipine göre derinlik veya nokta bulutunu çöz"""
+    if header['type'] == 'depth':
+        return decode_depth(header, data)
+    return decode_point_cloud(header, data)
@@ -0,0 +1,211 @@
+# Stream Controller
+# core/stream_controller.py - İstemci ölçümlerine dayalı adaptif kalite/fps kontrolü
+# =============================================================================
+
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+def parse_resolution(resolution):
+    """'640x480' veya [640, 480] biçimindeki çözünürlüğü (w, h) olarak döndür"""
+    try:
+        if isinstance(resolution, str):
+            width, height = resolution.lower().split('x')
+        else:
+            width, height = resolution
+        return int(width), int(height)
+    except (TypeError, ValueError):
+        return None
+
+class CameraLinkState:
+    """Bir kamera için ölçüm penceresi ve server'a istenen son ayarlar"""
+    
+    def __init__(self, quality, fps, resolution):
+        self.quality = quality
+        self.fps = fps
+        self.scale_index = 0
+        self.base_resolution = resolution
+        
+        self.rtts = deque(maxlen=30)
+        self.decode_times = deque(maxlen=30)
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.frames_lost = 0
+        self.window_start = time.monotonic()
+        self.healthy_windows = 0
+    
+    def reset_window(self, now):
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.frames_lost = 0
+        self.window_start = now
+
+class AdaptiveStreamController:
+    """Throughput, decode süresi ve RTT'ye göre kapalı döngü kalite kontrolü
+    
+    Her değerlendirme aralığında hedef gecikme aşılıyorsa önce JPEG
+    kalitesi, sonra fps, en son çözünürlük çarpımsal olarak düşürülür.
+    Bağlantı art arda birkaç pencere boyunca sağlıklıysa ayarlar ters
+    sırada, küçük adımlarla geri artırılır. Çıktı server'a gönderilecek
+    set_quality / set_fps / set_resolution istekleridir.
+    
+    Server handshake'te change_detection ilan ettiyse durağan sahnede
+    yalnızca keepalive frame'leri gelir; düşük alım hızı bağlantı sorunu
+    sayılmaz, yetersizlik yalnızca kayıp ve gecikmeyle değerlendirilir.
+    """
+    
+    RESOLUTION_SCALES = [1.0, 0.75, 0.5, 0.25]
+    
+    def __init__(self, target_latency_ms=150, interval=1.0, min_quality=30, max_quality=90,
+                 min_fps=5, max_fps=30, decode_workers=1, recover_windows=3, max_loss=0.1):
+        self.target_latency_ms = target_latency_ms
+        self.max_loss = max_loss
+        self.interval = interval
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.decode_workers = decode_workers
+        self.recover_windows = recover_windows
+        
+        self.cameras = {}
+        # Server değişmeyen frame'leri atlıyor mu (alım hızı sahneye bağlı)
+        self.change_gated = False
+        self.last_evaluation = time.monotonic()
+    
+    def reset(self, camera_ids, server_info):
+        """Yeni bağlantıda server'ın başlangıç ayarlarından başla"""
+        quality = server_info.get('quality', 80)
+        fps = server_info.get('fps', 30)
+        resolution = parse_resolution(server_info.get('resolution'))
+        
+        self.max_quality = max(self.max_quality, quality)
+        self.max_fps = max(self.max_fps, fps)
+        self.change_gated = bool(server_info.get('change_detection', False))
+        self.cameras = {
+            camera_id: CameraLinkState(quality, fps, resolution) for camera_id in camera_ids
+        }
+        self.last_evaluation = time.monotonic()
+    
+    def _state(self, camera_id):
+        return self.cameras.get(camera_id)
+    
+    def record_frame(self, camera_id, nbytes):
+        """Alınan frame boyutunu kaydet"""
+        state = self._state(camera_id)
+        if state is not None:
+            state.bytes_received += nbytes
+            state.frames_received += 1
+    
+    def record_loss(self, camera_id, count):
+        """Server'ın gönderip istemciye ulaşmayan frame sayısını (tx_seq boşluğu) kaydet"""
+        state = self._state(camera_id)
+        if state is not None:
+            state.frames_lost += count
+    
+    def record_rtt(self, camera_id, rtt):
+        """İstek/response gidiş-dönüş süresini (saniye) kaydet"""
+        state = self._state(camera_id)
+        if state is not None:
+            state.rtts.append(rtt * 1000.0)
+    
+    def record_decode(self, camera_id, decode_ms):
+        """Frame decode süresini (ms) kaydet"""
+        state = self._state(camera_id)
+        if state is not None:
+            state.decode_times.append(decode_ms)
+    
+    def evaluate(self, now=None):
+        """Aralık dolduysa server'a gönderilecek ayar isteklerini döndür"""
+        now = time.monotonic() if now is None else now
+        if now - self.last_evaluation < self.interval:
+            return []
+        self.last_evaluation = now
+        
+        requests = []
+        for camera_id, state in self.cameras.items():
+            requests.extend(self._evaluate_camera(camera_id, state, now))
+        return requests
+    
+    def _evaluate_camera(self, camera_id, state, now):
+        elapsed = max(now - state.window_start, 1e-3)
+        frames_received = state.frames_received
+        frames_lost = state.frames_lost
+        received_fps = frames_received / elapsed
+        throughput = state.bytes_received / elapsed
+        state.reset_window(now)
+        
+        rtt_ms = sorted(state.rtts)[len(state.rtts) // 2] if state.rtts else 0.0
+        decode_ms = sum(state.decode_times) / len(state.decode_times) if state.decode_times else 0.0
+        
+        # Gecikme hedefi aşıldı mı, frame'ler kayboluyor veya istenen hızda
+        # gelmiyor mu, decode istenen fps'e yetişemiyor mu? Değişim kapılı
+        # akışta düşük hız durağan sahne demektir, yalnızca kayıp sayılır.
+        latency_high = rtt_ms > self.target_latency_ms
+        sent = frames_received + frames_lost
+        starved = sent > 0 and frames_lost / sent > self.max_loss
+        if not self.change_gated:
+            starved = starved or (frames_received > 0 and received_fps < state.fps * 0.7)
+        decode_bound = decode_ms * state.fps > 1000.0 * self.decode_workers * 0.8
+        
+        if latency_high or starved or decode_bound:
+            state.healthy_windows = 0
+            logger.debug(
+                f"📉 Kamera {camera_id}: rtt={rtt_ms:.0f}ms fps={received_fps:.1f} "
+                f"decode={decode_ms:.1f}ms throughput={throughput / 1024:.0f}KB/s"
+            )
+            return self._step_down(camera_id, state, prefer_resolution=decode_bound)
+        
+        state.healthy_windows += 1
+        if state.healthy_windows >= self.recover_windows:
+            state.healthy_windows = 0
+            return self._step_up(camera_id, state)
+        return []
+    
+    def _step_down(self, camera_id, state, prefer_resolution=False):
+        """Önce kalite, sonra fps, en son çözünürlük düşür"""
+        if prefer_resolution and self._can_scale_down(state):
+            return [self._resolution_request(camera_id, state, state.scale_index + 1)]
+        
+        if state.quality > self.min_quality:
+            state.quality = max(self.min_quality, int(state.quality * 0.8))
+            return [{'type': 'set_quality', 'camera_id': camera_id, 'quality': state.quality}]
+        
+        if state.fps > self.min_fps:
+            state.fps = max(self.min_fps, int(state.fps * 0.7))
+            return [{'type': 'set_fps', 'camera_id': camera_id, 'fps': state.fps}]
+        
+        if self._can_scale_down(state):
+            return [self._resolution_request(camera_id, state, state.scale_index + 1)]
+        return []
+    
+    def _step_up(self, camera_id, state):
+        """Düşürme sırasının tersine küçük adımlarla geri artır"""
+        if state.scale_index > 0:
+            return [self._resolution_request(camera_id, state, state.scale_index - 1)]
+        
+        if state.fps < self.max_fps:
+            state.fps = min(self.max_fps, state.fps + 2)
+            return [{'type': 'set_fps', 'camera_id': camera_id, 'fps': state.fps}]
+        
+        if state.quality < self.max_quality:
+            state.quality = min(self.max_quality, state.quality + 5)
+            return [{'type': 'set_quality', 'camera_id': camera_id, 'quality': state.quality}]
+        return []
+    
+    def _can_scale_down(self, state):
+        return (state.base_resolution is not None and
+                state.scale_index < len(self.RESOLUTION_SCALES) - 1)
+    
+    def _resolution_request(self, camera_id, state, scale_index):
+        state.scale_index = scale_index
+        scale = self.RESOLUTION_SCALES[scale_index]
+        width, height = state.base_resolution
+        return {
+            'type': 'set_resolution',
+            'camera_id': camera_id,
+            'width': int(width * scale) // 2 * 2,
+            'height': int(height * scale) // 2 * 2
+        }
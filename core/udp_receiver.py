@@ -0,0 +1,192 @@
+# UDP Receiver
+# core/udp_receiver.py - UDP parçalarından frame mesajlarının yeniden birleştirilmesi
+# =============================================================================
+
+import json
+import socket
+import struct
+import time
+from collections import OrderedDict
+
+# server/udp_transport.py ile aynı parça header'ı:
+# mesaj no, toplam boyut, ofset, parça sırası, parça sayısı
+FRAGMENT_HEADER = struct.Struct("!IIIHH")
+
+class _PartialMessage:
+    __slots__ = ('buffer', 'total', 'count', 'fragment_size', 'received', 'started')
+    
+    def __init__(self, buffer, total, count, fragment_size, started):
+        self.buffer = buffer
+        self.total = total
+        self.count = count
+        self.fragment_size = fragment_size
+        self.received = set()
+        self.started = started
+
+def fragment_size_of(total, offset, index, count, length):
+    """Parça header'ından gönderenin parça boyutunu çıkar; tutarsızsa None
+    
+    Gönderen mesajı eşit parçalara böler, yalnızca sonuncusu kısa olabilir:
+    ofset index * parça boyutu, parça sayısı ceil(total / parça boyutu)
+    olmalıdır. Port'a gelen başka trafik bu kontrollerden geçemez.
+    """
+    if length == 0 or index >= count:
+        return None
+    if index < count - 1 or count == 1:
+        fragment_size = length
+    elif offset % index:
+        return None
+    else:
+        fragment_size = offset // index
+    
+    if offset != index * fragment_size or -(-total // fragment_size) != count:
+        return None
+    if offset + length > total or (index == count - 1 and offset + length != total):
+        return None
+    return fragment_size
+
+class UdpFrameReceiver:
+    """Server'ın UDP parçalarını toplayıp TCP ile aynı response'a çevirir
+    
+    Parçalar havuzdan alınan buffer'a ofsetlerine göre yazılır. Süresi
+    (deadline_ms) dolan veya yeni mesajlar yüzünden yer kalmayan eksik
+    mesajlar beklenmeden atılır; kayıp frame'i tekrar göndermek yerine bir
+    sonraki frame gösterilir.
+    
+    multicast_group verilirse socket gruba katılır; aynı makinedeki birden
+    çok istemci aynı portu paylaşabilir.
+    
+    Buffer ayrılmadan önce parça header'ı doğrulanır: max_message_size'ı
+    aşan veya parça düzeni tutarsız datagram'lar (ör. multicast portuna
+    gelen RTP trafiği) atılır.
+    """
+    
+    def __init__(self, buffer_pool, deadline_ms=100, max_pending=8, receive_buffer=4 * 1024 * 1024,
+                 port=0, multicast_group=None, multicast_interface=None,
+                 max_message_size=32 * 1024 * 1024):
+        self.buffer_pool = buffer_pool
+        self.deadline = deadline_ms / 1000.0
+        self.max_pending = max_pending
+        self.max_message_size = max_message_size
+        self.multicast_group = multicast_group
+        
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        if multicast_group:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('', port))
+        if multicast_group:
+            membership = socket.inet_aton(multicast_group) + socket.inet_aton(multicast_interface or '0.0.0.0')
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.setblocking(False)
+        
+        self.messages_completed = 0
+        self.messages_dropped = 0
+        self.fragments_rejected = 0
+        self._pending = OrderedDict()
+        self._datagram = bytearray(65536)
+    
+    @property
+    def port(self):
+        return self.sock.getsockname()[1]
+    
+    def fileno(self):
+        return self.sock.fileno()
+    
+    def receive(self):
+        """Bekleyen tüm datagram'ları oku, tamamlanan response'ları döndür"""
+        responses = []
+        with memoryview(self._datagram) as datagram:
+            while True:
+                try:
+                    size = self.sock.recv_into(datagram)
+                except (BlockingIOError, InterruptedError):
+                    break
+                if size < FRAGMENT_HEADER.size:
+                    continue
+                response = self._add_fragment(datagram, size)
+                if response is not None:
+                    responses.append(response)
+        self.expire()
+        return responses
+    
+    def _add_fragment(self, datagram, size):
+        message_id, total, offset, index, count = FRAGMENT_HEADER.unpack_from(datagram)
+        data = datagram[FRAGMENT_HEADER.size:size]
+        fragment_size = None
+        if total <= self.max_message_size:
+            fragment_size = fragment_size_of(total, offset, index, count, len(data))
+        if fragment_size is None:
+            self.fragments_rejected += 1
+            return None
+        
+        message = self._pending.get(message_id)
+        if message is None:
+            if len(self._pending) >= self.max_pending:
+                _, oldest = self._pending.popitem(last=False)
+                self._drop(oldest)
+            message = _PartialMessage(self.buffer_pool.acquire(total), total, count,
+                                      fragment_size, time.monotonic())
+            self._pending[message_id] = message
+        elif (total, count, fragment_size) != (message.total, message.count, message.fragment_size):
+            # Aynı mesaj no'lu başka bir mesajın parçası bekleyen frame'i bozmasın
+            self.fragments_rejected += 1
+            return None
+        
+        if index in message.received:
+            return None
+        message.received.add(index)
+        message.buffer[offset:offset + len(data)] = data
+        
+        if len(message.received) < message.count:
+            return None
+        
+        del self._pending[message_id]
+        self.messages_completed += 1
+        return self._parse(message)
+    
+    def _parse(self, message):
+        """Birleşen mesajı receive_response_safe ile aynı sözlüğe çevir"""
+        buffer = message.buffer
+        try:
+            header_size = struct.unpack_from("!I", buffer, 0)[0]
+            header = json.loads(bytes(buffer[4:4 + header_size]).decode('utf-8'))
+            position = 4 + header_size
+            if position >= message.total:
+                self.buffer_pool.release(buffer)
+                return {'header': header, 'frame_data': None, 'buffer': None}
+            
+            frame_size = struct.unpack_from("!I", buffer, position)[0]
+            position += 4
+            return {
+                'header': header,
+                'frame_data': memoryview(buffer)[position:position + frame_size],
+                'buffer': buffer
+            }
+        except (ValueError, struct.error):
+            self.buffer_pool.release(buffer)
+            self.messages_dropped += 1
+            return None
+    
+    def expire(self):
+        """Süresi dolan eksik mesajları at"""
+        cutoff = time.monotonic() - self.deadline
+        while self._pending:
+            message_id, message = next(iter(self._pending.items()))
+            if message.started > cutoff:
+                break
+            del self._pending[message_id]
+            self._drop(message)
+    
+    def _drop(self, message):
+        self.messages_dropped += 1
+        self.buffer_pool.release(message.buffer)
+    
+    def close(self):
+        for message in self._pending.values():
+            self.buffer_pool.release(message.buffer)
+        self._pending.clear()
+        try:
+            self.sock.close()
+        except:
+            pass
@@ -0,0 +1,54 @@
+# Video Decoder
+# core/video_decoder.py - H.264 akışları için durumlu decoder
+# =============================================================================
+
+import logging
+try:
+    import av # type: ignore
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class H264Decoder:
+    """Kamera başına bir PyAV H.264 decoder'ı
+    
+    Her mesaj server'ın ürettiği tek bir erişim birimidir (Annex B). JPEG'in
+    aksine frame'ler birbirine bağlıdır: decode sırayla yapılmalı ve bir
+    frame kaybolursa bir sonraki anahtar frame beklenmelidir.
+    """
+    
+    def __init__(self):
+        self.context = av.CodecContext.create('h264', 'r')
+        self.needs_keyframe = True
+        self.frames_skipped = 0
+    
+    def resync(self):
+        """Zincir koptu (frame atıldı); bir sonraki anahtar frame'e kadar atla"""
+        self.needs_keyframe = True
+    
+    def decode(self, data, keyframe=False):
+        """Erişim birimini decode et, BGR frame döndür (hazır değilse None)"""
+        if self.needs_keyframe:
+            if not keyframe:
+                self.frames_skipped += 1
+                return None
+            self.needs_keyframe = False
+        
+        frame = None
+        try:
+            for video_frame in self.context.decode(av.Packet(bytes(data))):
+                frame = video_frame.to_ndarray(format='bgr24')
+        except Exception as e:
+            logger.warning(f"⚠️ H.264 decode hatası, anahtar frame bekleniyor: {e}")
+            self.resync()
+            return None
+        return frame
+
+def create_h264_decoder():
+    """PyAV varsa decoder oluştur, yoksa None"""
+    if not PYAV_AVAILABLE:
+        logger.error("❌ H.264 akışı için PyAV (av) gerekli")
+        return None
+    return H264Decoder()
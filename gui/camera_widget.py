@@ -10,6 +10,7 @@ from PyQt5.QtGui import *
 
 class CameraWidget(QWidget):
     frame_updated = pyqtSignal(np.ndarray)
+    display_size_changed = pyqtSignal(int, int)  # width, height (gizliyken 0, 0)
     
     def __init__(self):
         super().__init__()
@@ -43,4 +44,19 @@ class CameraWidget(QWidget):
             if time_diff > 0:
                 self.current_fps = int(1.0 / time_diff)
         
-        self.last_fps_time = current_time
\ No newline at end of file
+        self.last_fps_time = current_time
+    
+    def resizeEvent(self, event):
+        """Boyut değişince decode ölçeği için yeni boyutu bildir"""
+        super().resizeEvent(event)
+        self.display_size_changed.emit(self.width(), self.height())
+    
+    def showEvent(self, event):
+        """Widget görünür olunca gerçek boyutu bildir"""
+        super().showEvent(event)
+        self.display_size_changed.emit(self.width(), self.height())
+    
+    def hideEvent(self, event):
+        """Gizli widget için en küçük decode ölçeği yeterli"""
+        super().hideEvent(event)
+        self.display_size_changed.emit(0, 0)
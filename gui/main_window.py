@@ -226,6 +226,8 @@ class MainWindow(QMainWindow):
         if ip in self.device_manager.camera_clients:
             camera_client = self.device_manager.camera_clients[ip]
             camera_client.frame_received.connect(self.camera_widget.update_frame)
+            camera_client.set_display_size(self.camera_widget.width(), self.camera_widget.height())
+            self.camera_widget.display_size_changed.connect(camera_client.set_display_size)
             camera_client.connection_status.connect(
                 lambda status: self.status_bar.set_video_status(status)
             )
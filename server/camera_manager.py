@@ -1 +1,1039 @@
 # Camera Manager
+# server/camera_manager.py - İstek/yanıt tabanlı çoklu kamera sunucusu
+# =============================================================================
+
+import cv2
+import numpy as np
+import json
+import math
+import socket
+import struct
+import threading
+import time
+import logging
+from config import CAMERA_MANAGER_CONFIG, SERVER_CONFIG
+from frame_protocol import FrameStamper, build_frame_header, build_message
+from frame_pipeline import DeadlineScheduler, ChangeDetector
+from jpeg_encoder import OpenCVJpegEncoder, select_encoder
+from udp_transport import UdpFrameSender
+
+def parse_roi(request):
+    """İstekteki roi ve output_size alanlarını (roi, output_size) olarak doğrula
+    
+    roi [x, y, w, h] tam frame'e oranla 0-1 aralığındadır; böylece
+    yakalama çözünürlüğü değişse de aynı bölgeyi gösterir. Yalnızca
+    output_size verilirse tüm frame o boyuta ölçeklenir. Tam frame ve
+    boyut yoksa (None, None) döner. Geçersiz değerde ValueError.
+    """
+    roi = request.get('roi')
+    output_size = request.get('output_size')
+    
+    if roi is None:
+        roi = (0.0, 0.0, 1.0, 1.0)
+    if len(roi) != 4:
+        raise ValueError(f"roi [x, y, w, h] olmalı: {roi}")
+    # json NaN/Infinity kabul eder; NaN her karşılaştırmada False olduğundan
+    # aralık kontrolünü geçer, bu yüzden önce sonlu olduğu doğrulanır
+    values = [float(value) for value in roi]
+    if not all(math.isfinite(value) for value in values):
+        raise ValueError(f"roi sonlu sayılardan oluşmalı: {roi}")
+    # Yakın ROI'ler aynı önbellek girdisini paylaşsın diye yuvarlanır
+    x, y, w, h = (round(value, 4) for value in values)
+    if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > 1.0001 or y + h > 1.0001:
+        raise ValueError(f"roi 0-1 aralığında olmalı: {roi}")
+    
+    if output_size is not None:
+        if len(output_size) != 2:
+            raise ValueError(f"output_size [w, h] olmalı: {output_size}")
+        if not all(math.isfinite(float(value)) for value in output_size):
+            raise ValueError(f"output_size sonlu sayılardan oluşmalı: {output_size}")
+        output_size = (int(output_size[0]), int(output_size[1]))
+        if output_size[0] <= 0 or output_size[1] <= 0:
+            raise ValueError(f"Geçersiz output_size: {output_size}")
+    
+    if (x, y, w, h) == (0.0, 0.0, 1.0, 1.0) and output_size is None:
+        return None, None
+    return (x, y, w, h), output_size
+
+class ManagedCamera:
+    """Tek bir VideoCapture cihazı ve profil başına encode önbelleği
+    
+    Her yakalanan frame, abonesi olan her encode profili için en fazla bir
+    kez encode edilir; get_frame istekleri doğrudan bu önbellekten
+    yanıtlanır. Aynı profili isteyen istemci sayısı encode maliyetini
+    artırmaz, kimsenin kullanmadığı profil hiç encode edilmez.
+    
+    Önbellek anahtarı profil adı veya ROI / oturuma özel kalite istekleri
+    için (profil, roi, output_size, quality) dörtlüsüdür (bkz. stream_key);
+    aynı bölgeyi ve kaliteyi isteyen istemciler de tek encode'u paylaşır.
+    """
+    
+    DEFAULT_PROFILE = 'default'
+    
+    def __init__(self, camera_id, device, config, on_frame=None, encoder=None):
+        self.camera_id = camera_id
+        self.device = device
+        self.width = config.get('width', 640)
+        self.height = config.get('height', 480)
+        self.fps = config.get('fps', 30)
+        self.quality = config.get('quality', 80)
+        self.on_frame = on_frame
+        self.encoder = encoder or OpenCVJpegEncoder()
+        
+        # 'default' profil kameranın config'teki ayarlarını kullanır
+        self.profiles = {self.DEFAULT_PROFILE: {}}
+        self.profiles.update(config.get('profiles', {}))
+        
+        self.capture = None
+        self.running = False
+        self.stamper = FrameStamper(camera_id)
+        # Sahne değişmediyse frame encode edilmez, önbellekteki kalır (None = kapalı)
+        self.change_detector = ChangeDetector.from_config(config)
+        self.logger = logging.getLogger(__name__)
+        
+        # En son yakalanan ham frame: (seq, frame, capture_ts_ns)
+        self.raw_frame = None
+        # Profil başına en son encode: {profil: (seq, header, frame_data)};
+        # header oturumun tx_seq'i eklenerek gönderimde serileştirilir
+        self.encoded = {}
+        # Profil başına kullanıcı (istemci oturumu) sayısı
+        self.profile_users = {}
+        self.frame_seq = 0
+        
+        self._lock = threading.Lock()
+        self._encode_locks = {}
+    
+    def open(self):
+        """Kamera cihazını aç ve ayarları uygula"""
+        self.capture = cv2.VideoCapture(self.device)
+        self._apply_resolution()
+        self.capture.set(cv2.CAP_PROP_FPS, self.fps)
+        
+        if not self.capture.isOpened():
+            raise Exception(f"Kamera açılamadı: {self.device}")
+        
+        self.logger.info(f"Kamera {self.camera_id} başlatıldı: {self.width}x{self.height}@{self.fps}fps")
+    
+    def _apply_resolution(self):
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+    
+    def start(self):
+        """Yakalama thread'ini başlat"""
+        self.running = True
+        capture_thread = threading.Thread(target=self._capture_loop)
+        capture_thread.daemon = True
+        capture_thread.start()
+    
+    def stop(self):
+        """Yakalamayı durdur ve cihazı bırak"""
+        self.running = False
+        if self.capture:
+            self.capture.release()
+    
+    def stream_key(self, profile, roi=None, output_size=None, quality=None):
+        """Önbellek anahtarı: profil adı veya (profil, roi, output_size, quality)
+        
+        Profilin kendi kalitesine eşit quality yok sayılır; böylece aynı
+        ayarı isteyen istemciler profilin ortak encode'unu paylaşır.
+        """
+        if quality is not None and profile in self.profiles and \
+                quality == self._profile_settings(profile)[2]:
+            quality = None
+        if roi is None and quality is None:
+            return profile
+        return (profile, roi, output_size, quality)
+    
+    @staticmethod
+    def _split_key(key):
+        if isinstance(key, tuple):
+            return key
+        return key, None, None, None
+    
+    def has_profile(self, key):
+        return self._split_key(key)[0] in self.profiles
+    
+    def acquire_profile(self, key):
+        """Bir oturumun profili (veya ROI akışını) kullanmaya başladığını kaydet"""
+        with self._lock:
+            self.profile_users[key] = self.profile_users.get(key, 0) + 1
+    
+    def release_profile(self, key):
+        """Profili kullanan oturum sayısını azalt; sıfırsa encode durur"""
+        with self._lock:
+            users = self.profile_users.get(key, 0) - 1
+            if users > 0:
+                self.profile_users[key] = users
+            else:
+                self.profile_users.pop(key, None)
+                self.encoded.pop(key, None)
+                if isinstance(key, tuple):
+                    # ROI/kalite anahtarları sınırsız olabilir, kilidi de bırakılır
+                    self._encode_locks.pop(key, None)
+    
+    def _encode_lock(self, key):
+        with self._lock:
+            lock = self._encode_locks.get(key)
+            if lock is None:
+                lock = self._encode_locks[key] = threading.Lock()
+            return lock
+    
+    def get_latest(self, key=DEFAULT_PROFILE):
+        """Profilin en son frame'ini (seq, header, frame_data) döndür
+        
+        Önbellek son yakalanan frame'den eskiyse (profil henüz yakalama
+        döngüsünde encode edilmiyorsa) frame burada bir kez encode edilir ve
+        aynı frame'i isteyen diğer istemciler önbellekten alır.
+        """
+        with self._lock:
+            cached = self.encoded.get(key)
+            raw_frame = self.raw_frame
+        if raw_frame is None or (cached is not None and cached[0] >= raw_frame[0]):
+            return cached
+        
+        with self._encode_lock(key):
+            with self._lock:
+                cached = self.encoded.get(key)
+            if cached is not None and cached[0] >= raw_frame[0]:
+                return cached
+            seq, frame, capture_ts_ns = raw_frame
+            return self._encode_profile(key, seq, frame, capture_ts_ns, {})
+    
+    def _capture_loop(self):
+        """Kameradan sürekli oku, hedef fps'e göre encode edip önbelleğe yaz"""
+        scheduler_deadline = time.monotonic()
+        
+        while self.running:
+            try:
+                # Kamera buffer'ı taze kalsın diye her frame okunur
+                ret, frame = self.capture.read()
+                if not ret:
+                    time.sleep(0.005)
+                    continue
+                capture_ts_ns = self.stamper.capture_timestamp()
+                
+                # Hedef fps'ten hızlı gelen frame'ler encode edilmez
+                now = time.monotonic()
+                if now < scheduler_deadline:
+                    continue
+                scheduler_deadline = max(scheduler_deadline + 1.0 / self.fps, now)
+                
+                # Durağan sahnede yeni seq üretilmez; push döngüleri bir şey
+                # göndermez, get_frame önbellekteki son frame'i alır
+                if self.change_detector is not None and not self.change_detector.should_send(frame):
+                    continue
+                
+                self._encode_and_cache(frame, capture_ts_ns)
+            
+            except Exception as e:
+                self.logger.error(f"Kamera {self.camera_id} yakalama hatası: {e}")
+                time.sleep(0.1)
+    
+    def _encode_and_cache(self, frame, capture_ts_ns):
+        """Kullanımdaki her profili bir kez encode et ve önbelleği güncelle"""
+        self.frame_seq += 1
+        seq = self.frame_seq
+        
+        with self._lock:
+            active_profiles = list(self.profile_users)
+        
+        # Aynı çözünürlükteki (veya aynı ROI'deki) profiller resize/crop
+        # sonucunu paylaşır
+        resized = {}
+        for key in active_profiles:
+            # Bir anahtarın hatası diğer profillerin encode'unu durdurmaz
+            try:
+                with self._encode_lock(key):
+                    self._encode_profile(key, seq, frame, capture_ts_ns, resized)
+            except Exception as e:
+                self.logger.error(f"Kamera {self.camera_id} encode hatası ({key}): {e}")
+        
+        # Ham frame profiller encode edildikten sonra yayınlanır; böylece
+        # get_latest aktif profilleri ikinci kez encode etmez
+        with self._lock:
+            self.raw_frame = (seq, frame, capture_ts_ns)
+        
+        if self.on_frame:
+            self.on_frame(self.camera_id)
+    
+    def _profile_settings(self, profile):
+        """Profilin (width, height, quality) değerleri; boyut None ise yakalanan boyut"""
+        spec = self.profiles[profile]
+        return spec.get('width'), spec.get('height'), spec.get('quality', self.quality)
+    
+    def _crop(self, frame, roi, output_size, resized):
+        """ROI'yi kes ve (verildiyse) output_size'a ölçekle; aynı frame'de paylaşılır
+        
+        output_size yoksa bölge kendi piksel boyutunda, tam detayla gönderilir.
+        """
+        cached = resized.get((roi, output_size))
+        if cached is not None:
+            return cached
+        
+        frame_height, frame_width = frame.shape[:2]
+        x, y, w, h = roi
+        x0 = min(frame_width - 1, int(x * frame_width))
+        y0 = min(frame_height - 1, int(y * frame_height))
+        x1 = max(x0 + 1, min(frame_width, int(round((x + w) * frame_width))))
+        y1 = max(y0 + 1, min(frame_height, int(round((y + h) * frame_height))))
+        image = frame[y0:y1, x0:x1]
+        
+        if output_size and output_size != (x1 - x0, y1 - y0):
+            interpolation = cv2.INTER_AREA if output_size[0] < x1 - x0 else cv2.INTER_LINEAR
+            image = cv2.resize(image, output_size, interpolation=interpolation)
+        else:
+            # Encoder backend'leri bitişik buffer bekler; kesit küçük olduğundan kopya ucuz
+            image = np.ascontiguousarray(image)
+        
+        resized[(roi, output_size)] = image
+        return image
+    
+    def _encode_profile(self, key, seq, frame, capture_ts_ns, resized):
+        """Frame'i profilin (ve varsa ROI'nin) ayarlarıyla encode edip önbelleğe yaz"""
+        profile, roi, output_size, key_quality = self._split_key(key)
+        width, height, quality = self._profile_settings(profile)
+        if key_quality is not None:
+            quality = key_quality
+        
+        encode_start = time.perf_counter()
+        image = frame
+        extra = {'profile': profile}
+        if roi is not None:
+            # Kesme encode'dan önce yapılır; yalnızca bölgenin pikselleri encode edilir
+            image = self._crop(frame, roi, output_size, resized)
+            extra['roi'] = list(roi)
+        elif width and height and (frame.shape[1], frame.shape[0]) != (width, height):
+            image = resized.get((width, height))
+            if image is None:
+                image = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                resized[(width, height)] = image
+        
+        frame_data = self.encoder.encode(image, quality)
+        if not frame_data:
+            return None
+        encode_ms = (time.perf_counter() - encode_start) * 1000.0
+        
+        header = self.stamper.stamp(capture_ts_ns, encode_ms, seq=seq, **extra)
+        entry = (seq, header, frame_data)
+        
+        with self._lock:
+            previous = self.encoded.get(key)
+            if previous is None or previous[0] < seq:
+                self.encoded[key] = entry
+        return entry
+
+class ClientSession:
+    """Tek bir istemcinin istek döngüsü ve (varsa) push aboneliği"""
+    
+    def __init__(self, manager, sock, address):
+        self.manager = manager
+        self.sock = sock
+        self.address = address
+        self.running = True
+        self.logger = logging.getLogger(__name__)
+        
+        # İstek thread'i ve push thread'i aynı socket'e yazar
+        self.send_lock = threading.Lock()
+        
+        # Push aboneliği
+        self.subscribed_cameras = []
+        self.subscription_fps = 0
+        # Aboneliğin istek alanları ve kamera başına önbellek anahtarı
+        # (oturum ayarları kameraya göre anahtarı değiştirebilir)
+        self.subscription_request = {}
+        self.subscription_keys = {}
+        # transport='udp' aboneliğinde frame'lerin gönderildiği (ip, port)
+        self.udp_address = None
+        # Gönderilemeyen datagram sayısı (frame atılır, oturum sürer)
+        self.udp_send_errors = 0
+        # transport='multicast' aboneliğinde frame'ler ortak gruptan gelir
+        self.multicast = False
+        self.push_thread = None
+        self.last_sent_seq = {}
+        
+        # Bu oturumun kullandığı (camera_id, anahtar) çiftleri ve kamera
+        # başına son get_frame anahtarı
+        self.profiles_in_use = set()
+        self.pull_keys = {}
+        # (camera_id, anahtar) başına get_frame ile gönderilen son seq
+        self.pull_sent_seq = {}
+        
+        # set_quality / set_fps / set_resolution yalnızca bu oturuma uygulanır:
+        # {camera_id: {'quality', 'fps', 'output_size'}}. Kameranın yakalama
+        # ayarları ve diğer istemcilerin akışları değişmez.
+        self.overrides = {}
+        # Kamera başına son gönderim zamanı (fps ayarı için)
+        self.last_frame_time = {}
+        # Kamera başına bu oturuma gerçekten gönderilen frame sayacı; seq
+        # yakalama sırası olduğundan atlanan frame'ler istemcide kayıp sayılmasın
+        self.tx_seq = {}
+    
+    def send(self, *parts):
+        with self.send_lock:
+            for part in parts:
+                self.sock.sendall(part)
+    
+    def _send_cached(self, camera_id, entry, udp_address=None):
+        """Önbellekteki frame'i oturumun sıradaki tx_seq'iyle gönder"""
+        seq, header, frame_data = entry
+        # Sayaç ve gönderim aynı kilitte: pull ve push aynı kamerayı
+        # gönderse de tx_seq hatta sırayla görünür
+        with self.send_lock:
+            tx_seq = self.tx_seq.get(camera_id, 0) + 1
+            self.tx_seq[camera_id] = tx_seq
+            header_data = build_frame_header(dict(header, tx_seq=tx_seq), len(frame_data))
+            if udp_address is not None:
+                try:
+                    self.manager.udp_sender.send(udp_address, header_data, frame_data)
+                except (OSError, ValueError) as e:
+                    # Tek frame'in kaybı oturumu bitirmez; istemci tx_seq
+                    # boşluğunu kayıp olarak görür
+                    self.udp_send_errors += 1
+                    if self.udp_send_errors == 1 or self.udp_send_errors % 100 == 0:
+                        self.logger.warning(
+                            f"UDP gönderim hatası {udp_address} "
+                            f"({self.udp_send_errors} frame atıldı): {e}"
+                        )
+            else:
+                self.sock.sendall(header_data)
+                self.sock.sendall(frame_data)
+    
+    def _recv_exact(self, size):
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            try:
+                count = self.sock.recv_into(view[received:])
+            except socket.timeout:
+                if not self.running or not self.manager.running:
+                    return None
+                continue
+            if count == 0:
+                return None
+            received += count
+        return data
+    
+    def _read_request(self):
+        length_data = self._recv_exact(4)
+        if length_data is None:
+            return None
+        request_size = struct.unpack("!I", length_data)[0]
+        request_data = self._recv_exact(request_size)
+        if request_data is None:
+            return None
+        return json.loads(request_data.decode('utf-8'))
+    
+    def run(self):
+        """Handshake gönder ve istekleri işle"""
+        try:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.settimeout(SERVER_CONFIG.get('send_timeout', 5.0))
+            self.send(build_message(self.manager.camera_list_message()))
+            
+            while self.running and self.manager.running:
+                request = self._read_request()
+                if request is None:
+                    break
+                self._dispatch(request)
+        
+        except Exception as e:
+            self.logger.warning(f"İstemci bağlantısı kesildi {self.address}: {e}")
+        finally:
+            self.close()
+    
+    def _dispatch(self, request):
+        request_type = request.get('type')
+        camera_id = request.get('camera_id')
+        
+        if request_type == 'get_frame':
+            self._send_frame(camera_id, request)
+        elif request_type == 'subscribe':
+            self._subscribe(request)
+        elif request_type == 'unsubscribe':
+            self.subscribed_cameras = []
+            self.udp_address = None
+            self._release_profiles()
+            self._leave_multicast()
+        elif request_type in ('set_quality', 'set_fps', 'set_resolution'):
+            self._apply_setting(request)
+        else:
+            self._send_error(camera_id, f"Bilinmeyen istek: {request_type}")
+    
+    def _send_error(self, camera_id, message):
+        self.send(build_message({
+            'type': 'error',
+            'camera_id': camera_id,
+            'message': message
+        }))
+    
+    def _use_profile(self, camera_id, key):
+        """Profili bu oturum için kullanımda işaretle (oturum başına bir kez)"""
+        if (camera_id, key) not in self.profiles_in_use:
+            self.manager.cameras[camera_id].acquire_profile(key)
+            self.profiles_in_use.add((camera_id, key))
+    
+    def _release_if_unused(self, camera_id, key):
+        """Ne abonelikte ne de son get_frame'de kullanılan anahtarı bırak"""
+        if (camera_id, key) not in self.profiles_in_use:
+            return
+        if self.pull_keys.get(camera_id) == key:
+            return
+        if camera_id in self.subscribed_cameras and self.subscription_keys.get(camera_id) == key:
+            return
+        self.manager.cameras[camera_id].release_profile(key)
+        self.profiles_in_use.discard((camera_id, key))
+        self.pull_sent_seq.pop((camera_id, key), None)
+    
+    def _stream_key(self, camera, request):
+        """İsteğin profil/ROI/quality alanlarından ve oturum ayarlarından
+        önbellek anahtarını üret; geçersizse None
+        
+        Oturumun set_resolution boyutu istekte output_size yoksa kullanılır.
+        Kalite önceliği: set_quality, istekteki quality, profilin kalitesi.
+        """
+        camera_id = camera.camera_id
+        profile = request.get('profile') or ManagedCamera.DEFAULT_PROFILE
+        override = self.overrides.get(camera_id, {})
+        if 'output_size' in override and request.get('output_size') is None:
+            request = dict(request, output_size=override['output_size'])
+        try:
+            roi, output_size = parse_roi(request)
+        except (TypeError, ValueError) as e:
+            self._send_error(camera_id, f"Geçersiz ROI: {e}")
+            return None
+        
+        quality = override.get('quality')
+        if quality is None and request.get('quality') is not None:
+            try:
+                quality = max(1, min(100, int(request['quality'])))
+            except (TypeError, ValueError, OverflowError) as e:
+                self._send_error(camera_id, f"Geçersiz quality: {e}")
+                return None
+        return camera.stream_key(profile, roi, output_size, quality)
+    
+    def _apply_setting(self, request):
+        """set_quality / set_fps / set_resolution isteğini oturuma uygula
+        
+        Ayar yalnızca bu oturumun önbellek anahtarını (veya gönderim
+        hızını) değiştirir; aynı ayarı isteyen oturumlar encode'u paylaşır.
+        """
+        camera_id = request.get('camera_id')
+        if camera_id not in self.manager.cameras:
+            self._send_error(camera_id, f"Kamera bulunamadı: {camera_id}")
+            return
+        
+        override = dict(self.overrides.get(camera_id, {}))
+        request_type = request['type']
+        try:
+            if request_type == 'set_quality':
+                override['quality'] = max(1, min(100, int(request['quality'])))
+            elif request_type == 'set_fps':
+                override['fps'] = max(1, int(request['fps']))
+            else:
+                width, height = int(request['width']), int(request['height'])
+                if width <= 0 or height <= 0:
+                    raise ValueError(f"{width}x{height}")
+                override['output_size'] = (width, height)
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            self._send_error(camera_id, f"Geçersiz ayar ({request_type}): {e}")
+            return
+        
+        self.overrides[camera_id] = override
+        self._refresh_subscription(camera_id)
+        self.logger.info(f"Oturum ayarı {self.address} kamera {camera_id}: {override}")
+    
+    def _refresh_subscription(self, camera_id):
+        """Oturum ayarı değişince aboneliğin bu kameradaki anahtarını güncelle"""
+        if camera_id not in self.subscribed_cameras:
+            return
+        camera = self.manager.cameras[camera_id]
+        previous = self.subscription_keys.get(camera_id)
+        key = self._stream_key(camera, self.subscription_request)
+        if key is None or key == previous:
+            return
+        
+        self._use_profile(camera_id, key)
+        # Push thread'i sözlüğü okurken değiştirmemek için kopyası atanır
+        keys = dict(self.subscription_keys)
+        keys[camera_id] = key
+        self.subscription_keys = keys
+        if previous is not None:
+            self._release_if_unused(camera_id, previous)
+    
+    def _frame_due(self, camera_id):
+        """Oturumun bu kamera için fps ayarı varsa bir sonraki frame zamanı geldi mi"""
+        fps = self.overrides.get(camera_id, {}).get('fps')
+        if not fps:
+            return True
+        # Zamanlama titremesi frame atlatmasın diye periyodun %90'ı yeterli sayılır
+        elapsed = time.monotonic() - self.last_frame_time.get(camera_id, 0.0)
+        return elapsed >= 0.9 / fps
+    
+    def _release_profiles(self):
+        for camera_id, profile in self.profiles_in_use:
+            self.manager.cameras[camera_id].release_profile(profile)
+        self.profiles_in_use = set()
+    
+    def _send_frame(self, camera_id, request):
+        """get_frame'i profil önbelleğinden yanıtla (istek başına encode yok)
+        
+        Oturum bu frame'i zaten aldıysa aynı JPEG tekrar gönderilmez,
+        no_frame ile yanıtlanır; istemci yakalama hızından hızlı sorsa da
+        hat yalnızca yeni frame'leri taşır.
+        """
+        camera = self.manager.cameras.get(camera_id)
+        if camera is None:
+            self._send_error(camera_id, f"Kamera bulunamadı: {camera_id}")
+            return
+        if not camera.has_profile(request.get('profile') or ManagedCamera.DEFAULT_PROFILE):
+            self._send_error(camera_id, f"Bilinmeyen profil: {request.get('profile')}")
+            return
+        key = self._stream_key(camera, request)
+        if key is None:
+            return
+        
+        # ROI değiştiyse önceki bölge artık encode edilmez
+        previous = self.pull_keys.get(camera_id)
+        self.pull_keys[camera_id] = key
+        self._use_profile(camera_id, key)
+        if previous is not None and previous != key:
+            self._release_if_unused(camera_id, previous)
+        
+        latest = camera.get_latest(key)
+        if latest is None or latest[0] <= self.pull_sent_seq.get((camera_id, key), 0) \
+                or not self._frame_due(camera_id):
+            self.send(build_message({'type': 'no_frame', 'camera_id': camera_id}))
+            return
+        
+        self._send_cached(camera_id, latest)
+        self.pull_sent_seq[(camera_id, key)] = latest[0]
+        self.last_frame_time[camera_id] = time.monotonic()
+    
+    def _subscribe(self, request):
+        """Push aboneliğini başlat veya güncelle"""
+        if request.get('transport') == 'multicast':
+            self._join_multicast()
+            return
+        
+        camera_ids = request.get('camera_ids') or list(self.manager.cameras)
+        profile = request.get('profile') or ManagedCamera.DEFAULT_PROFILE
+        subscription_keys = {}
+        for cid in camera_ids:
+            camera = self.manager.cameras.get(cid)
+            if camera is None or not camera.has_profile(profile):
+                continue
+            key = self._stream_key(camera, request)
+            if key is None:
+                return
+            subscription_keys[cid] = key
+        subscribed_cameras = list(subscription_keys)
+        if not subscribed_cameras:
+            self._send_error(None, f"Abonelik için uygun kamera/profil yok: {profile}")
+            return
+        
+        # UDP'de yalnızca frame'ler datagram olarak gider; kontrol mesajları
+        # ve hatalar bu TCP bağlantısında kalır
+        udp_address = None
+        if request.get('transport', 'tcp') == 'udp':
+            if self.manager.udp_sender is None or not request.get('udp_port'):
+                self._send_error(None, "UDP aktarımı kullanılamıyor")
+                return
+            udp_address = (self.address[0], int(request['udp_port']))
+        
+        # Önceki aboneliğin profilleri bırakılır; push döngüsü yeni profili
+        # ilk turda önbellekten (gerekirse bir kez encode ederek) alır
+        self._release_profiles()
+        self._leave_multicast()
+        for camera_id, key in subscription_keys.items():
+            self._use_profile(camera_id, key)
+        self.subscription_request = request
+        self.subscription_keys = subscription_keys
+        self.subscribed_cameras = subscribed_cameras
+        self.subscription_fps = request.get('fps') or CAMERA_MANAGER_CONFIG.get('fps', 30)
+        self.udp_address = udp_address
+        self.last_sent_seq = {}
+        
+        self.logger.info(
+            f"Push aboneliği {self.address}: {self.subscribed_cameras} "
+            f"@ {self.subscription_fps}fps ({profile}, {'udp' if udp_address else 'tcp'})"
+        )
+        
+        if self.push_thread is None:
+            self.push_thread = threading.Thread(target=self._push_loop)
+            self.push_thread.daemon = True
+            self.push_thread.start()
+    
+    def _join_multicast(self):
+        """Oturumu ortak multicast yayınının izleyicisi yap
+        
+        Frame'ler bu oturuma ayrıca gönderilmez; istemci handshake'te ilan
+        edilen gruba katılır. Varsa tekil abonelik sonlandırılır.
+        """
+        if self.manager.multicast_sender is None:
+            self._send_error(None, "Multicast yayını etkin değil")
+            return
+        
+        self.subscribed_cameras = []
+        self.udp_address = None
+        self._release_profiles()
+        if not self.multicast:
+            self.multicast = True
+            self.manager.add_multicast_viewer(self)
+        self.logger.info(f"Multicast izleyicisi {self.address}: {self.manager.multicast_address}")
+    
+    def _leave_multicast(self):
+        if self.multicast:
+            self.multicast = False
+            self.manager.remove_multicast_viewer(self)
+    
+    def _push_loop(self):
+        """Abone olunan kameraların yeni frame'lerini istek beklemeden gönder"""
+        scheduler = DeadlineScheduler(self.subscription_fps)
+        
+        while self.running and self.manager.running:
+            try:
+                # Yeni frame yoksa herhangi bir kameradan frame gelene kadar uyu
+                if not self._push_new_frames():
+                    self.manager.wait_for_frame(timeout=0.5)
+                    continue
+                
+                # Abonelik fps'ini aşmamak için bir sonraki tick'e kadar bekle
+                scheduler.set_fps(self.subscription_fps)
+                scheduler.wait()
+            
+            except Exception as e:
+                self.logger.warning(f"Push gönderim hatası {self.address}: {e}")
+                self.running = False
+    
+    def _push_new_frames(self):
+        """Abone olunan kameraların gönderilmemiş son frame'lerini gönder"""
+        sent = False
+        keys = self.subscription_keys
+        for camera_id in list(self.subscribed_cameras):
+            key = keys.get(camera_id)
+            if key is None or not self._frame_due(camera_id):
+                continue
+            latest = self.manager.cameras[camera_id].get_latest(key)
+            if latest is None or latest[0] <= self.last_sent_seq.get(camera_id, 0):
+                continue
+            self._send_cached(camera_id, latest, self.udp_address)
+            self.last_sent_seq[camera_id] = latest[0]
+            self.last_frame_time[camera_id] = time.monotonic()
+            sent = True
+        return sent
+    
+    def close(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except:
+            pass
+        self._release_profiles()
+        self._leave_multicast()
+        self.manager.remove_session(self)
+
+class CameraManager:
+    """CameraClient'ın beklediği protokolü konuşan çoklu kamera sunucusu
+    
+    Bağlanan istemciye önce camera_list handshake'i gönderilir; ardından
+    get_frame istekleri kameranın önbelleğindeki son frame ile yanıtlanır
+    veya subscribe ile push moduna geçilir.
+    """
+    
+    def __init__(self, host='0.0.0.0', port=None, devices=None):
+        self.host = host
+        self.port = port or CAMERA_MANAGER_CONFIG.get('port', 9995)
+        self.devices = devices if devices is not None else CAMERA_MANAGER_CONFIG.get('devices', [0])
+        self.config = CAMERA_MANAGER_CONFIG
+        self.server_socket = None
+        self.running = False
+        self.cameras = {}
+        self.sessions = []
+        self.encoder = None
+        self.udp_sender = None
+        
+        # Multicast yayını: tek gönderim, izleyici varken çalışır
+        self.multicast_config = self.config.get('multicast', {})
+        self.multicast_sender = None
+        self.multicast_address = None
+        self.multicast_profile = self.multicast_config.get('profile', ManagedCamera.DEFAULT_PROFILE)
+        self.multicast_viewers = set()
+        self.logger = logging.getLogger(__name__)
+        
+        self._sessions_lock = threading.Lock()
+        self._frame_cond = threading.Condition()
+        self._frame_counter = 0
+    
+    def start_server(self):
+        """Kameraları aç ve sunucuyu başlat"""
+        try:
+            # Tüm kameralar başlangıçta seçilen tek encoder'ı paylaşır
+            self.encoder = select_encoder(
+                self.config.get('encoder', 'auto'),
+                self.config.get('width', 640),
+                self.config.get('height', 480),
+                self.config.get('quality', 80)
+            )
+            
+            for camera_id, device in enumerate(self.devices):
+                camera = ManagedCamera(camera_id, device, self.config, self._on_frame, self.encoder)
+                camera.open()
+                self.cameras[camera_id] = camera
+            
+            # Socket sunucusunu başlat
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(5)
+            self.server_socket.settimeout(1.0)
+            
+            # Push aboneliklerinin isteğe bağlı UDP aktarımı
+            if self.config.get('udp_enabled', True):
+                self.udp_sender = UdpFrameSender(self.config.get('udp_payload_size', 1400))
+            if self.multicast_config.get('enabled', False):
+                self._init_multicast()
+            
+            self.running = True
+            for camera in self.cameras.values():
+                camera.start()
+            
+            self.logger.info(f"Kamera yöneticisi başlatıldı: {self.host}:{self.port} ({len(self.cameras)} kamera)")
+            
+            # İstemci kabul thread'i
+            accept_thread = threading.Thread(target=self._accept_clients)
+            accept_thread.daemon = True
+            accept_thread.start()
+            
+            if self.multicast_sender is not None:
+                multicast_thread = threading.Thread(target=self._multicast_loop)
+                multicast_thread.daemon = True
+                multicast_thread.start()
+            
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"Kamera yöneticisi başlatma hatası: {e}")
+            for camera in self.cameras.values():
+                camera.stop()
+            return False
+    
+    def _init_multicast(self):
+        """Multicast gönderici socket'ini ve grup adresini hazırla"""
+        if self.multicast_profile not in self._profile_list():
+            raise Exception(f"Bilinmeyen multicast profili: {self.multicast_profile}")
+        
+        self.multicast_sender = UdpFrameSender(
+            self.config.get('udp_payload_size', 1400),
+            multicast_ttl=self.multicast_config.get('ttl', 1),
+            multicast_interface=self.multicast_config.get('interface')
+        )
+        self.multicast_address = (
+            self.multicast_config.get('group', '239.255.42.1'),
+            self.multicast_config.get('port', 5004)
+        )
+        self.logger.info(
+            f"Multicast yayını: {self.multicast_address[0]}:{self.multicast_address[1]} "
+            f"({self.multicast_profile})"
+        )
+    
+    def camera_list_message(self):
+        """Handshake mesajı: kameralar ve server bilgileri"""
+        return {
+            'type': 'camera_list',
+            'cameras': list(self.cameras),
+            'server_info': {
+                'fps': self.config.get('fps', 30),
+                'resolution': f"{self.config.get('width', 640)}x{self.config.get('height', 480)}",
+                'quality': self.config.get('quality', 80),
+                'push_supported': True,
+                'pull_supported': True,
+                # Durağan sahnede yalnızca keepalive frame'leri gönderilir
+                'change_detection': bool(self.config.get('change_detection', False)),
+                'udp_supported': self.udp_sender is not None,
+                'multicast': self._multicast_info(),
+                'encoder': self.encoder.name if self.encoder else None,
+                'profiles': self._profile_list()
+            }
+        }
+    
+    def _profile_list(self):
+        """Handshake'te ilan edilen encode profilleri"""
+        profiles = {ManagedCamera.DEFAULT_PROFILE: {}}
+        profiles.update(self.config.get('profiles', {}))
+        return {
+            name: {
+                'width': spec.get('width', self.config.get('width', 640)),
+                'height': spec.get('height', self.config.get('height', 480)),
+                'quality': spec.get('quality', self.config.get('quality', 80))
+            }
+            for name, spec in profiles.items()
+        }
+    
+    def _multicast_info(self):
+        """Handshake'te ilan edilen multicast grubu (etkin değilse None)"""
+        if self.multicast_address is None:
+            return None
+        return {
+            'group': self.multicast_address[0],
+            'port': self.multicast_address[1],
+            'profile': self.multicast_profile
+        }
+    
+    def add_multicast_viewer(self, session):
+        """İlk izleyici geldiğinde multicast profilini kullanıma al"""
+        with self._sessions_lock:
+            first = not self.multicast_viewers
+            self.multicast_viewers.add(session)
+        if first:
+            for camera in self.cameras.values():
+                camera.acquire_profile(self.multicast_profile)
+    
+    def remove_multicast_viewer(self, session):
+        """Son izleyici ayrıldığında yayını durdur"""
+        with self._sessions_lock:
+            if session not in self.multicast_viewers:
+                return
+            self.multicast_viewers.discard(session)
+            last = not self.multicast_viewers
+        if last:
+            for camera in self.cameras.values():
+                camera.release_profile(self.multicast_profile)
+    
+    def _multicast_loop(self):
+        """Her kameranın yeni frame'ini gruba bir kez gönder
+        
+        Gönderim izleyici sayısından bağımsızdır; izleyici yoksa hiçbir şey
+        gönderilmez ve profil encode edilmez.
+        """
+        scheduler = DeadlineScheduler(self.multicast_config.get('fps', self.config.get('fps', 30)))
+        last_sent_seq = {}
+        # Gruba gönderilen frame sayacı (istemcinin kayıp hesabı için)
+        tx_seq = {}
+        
+        while self.running:
+            try:
+                if not self.multicast_viewers:
+                    last_sent_seq = {}
+                    self.wait_for_frame(timeout=0.5)
+                    continue
+                
+                sent = False
+                for camera_id, camera in self.cameras.items():
+                    latest = camera.get_latest(self.multicast_profile)
+                    if latest is None or latest[0] <= last_sent_seq.get(camera_id, 0):
+                        continue
+                    seq, header, frame_data = latest
+                    tx_seq[camera_id] = tx_seq.get(camera_id, 0) + 1
+                    header_data = build_frame_header(dict(header, tx_seq=tx_seq[camera_id]),
+                                                     len(frame_data))
+                    self.multicast_sender.send(self.multicast_address, header_data, frame_data)
+                    last_sent_seq[camera_id] = seq
+                    sent = True
+                
+                if not sent:
+                    self.wait_for_frame(timeout=0.5)
+                    continue
+                scheduler.wait()
+            
+            except Exception as e:
+                if self.running:
+                    self.logger.error(f"Multicast gönderim hatası: {e}")
+                    time.sleep(0.1)
+    
+    def _on_frame(self, camera_id):
+        """Yeni frame önbelleğe yazıldığında push döngülerini uyandır"""
+        with self._frame_cond:
+            self._frame_counter += 1
+            self._frame_cond.notify_all()
+    
+    def wait_for_frame(self, timeout=None):
+        """Herhangi bir kameradan yeni frame gelene kadar bekle"""
+        with self._frame_cond:
+            counter = self._frame_counter
+            return self._frame_cond.wait_for(lambda: self._frame_counter != counter, timeout)
+    
+    def _accept_clients(self):
+        """İstemci bağlantılarını kabul et"""
+        while self.running:
+            try:
+                client_socket, client_address = self.server_socket.accept()
+            except socket.timeout:
+                continue
+            except Exception as e:
+                if self.running:
+                    self.logger.error(f"İstemci kabul hatası: {e}")
+                continue
+            
+            with self._sessions_lock:
+                if len(self.sessions) >= SERVER_CONFIG.get('max_clients', 5):
+                    self.logger.warning(f"İstemci reddedildi (limit dolu): {client_address}")
+                    try:
+                        client_socket.sendall(build_message({
+                            'type': 'error',
+                            'message': "Maksimum istemci sayısına ulaşıldı"
+                        }))
+                        client_socket.close()
+                    except:
+                        pass
+                    continue
+                
+                session = ClientSession(self, client_socket, client_address)
+                self.sessions.append(session)
+            
+            self.logger.info(f"İstemci bağlandı: {client_address}")
+            session_thread = threading.Thread(target=session.run)
+            session_thread.daemon = True
+            session_thread.start()
+    
+    def remove_session(self, session):
+        with self._sessions_lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+                self.logger.info(f"İstemci ayrıldı: {session.address}")
+    
+    def stop_server(self):
+        """Sunucuyu durdur"""
+        self.running = False
+        
+        # İstemci bağlantılarını kapat
+        with self._sessions_lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.close()
+        
+        # Kameraları kapat; encoder'ın donanım pipeline'ları da bırakılır
+        for camera in self.cameras.values():
+            camera.stop()
+        if self.encoder is not None:
+            self.encoder.close()
+        
+        # Sunucu socket'lerini kapat
+        if self.server_socket:
+            self.server_socket.close()
+        if self.udp_sender:
+            self.udp_sender.close()
+        if self.multicast_sender:
+            self.multicast_sender.close()
+        
+        self.logger.info("Kamera yöneticisi durduruldu")
+
+if __name__ == "__main__":
+    # Logging ayarla
+    logging.basicConfig(level=logging.INFO)
+    
+    # Sunucuyu başlat
+    server = CameraManager()
+    
+    try:
+        if server.start_server():
+            # Sunucuyu çalışır durumda tut
+            while server.running:
+                time.sleep(1)
+        else:
+            print("Kamera yöneticisi başlatılamadı!")
+    
+    except KeyboardInterrupt:
+        print("Kamera yöneticisi durduruluyor...")
+    finally:
+        server.stop_server()
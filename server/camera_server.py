@@ -7,7 +7,12 @@ import socket
 import threading
 import time
 import logging
-from config import CAMERA_CONFIG
+from config import CAMERA_CONFIG, SERVER_CONFIG
+from frame_protocol import FrameStamper, build_frame_header
+from stream_broadcaster import StreamBroadcaster
+from frame_pipeline import LatestFrameSlot, DeadlineScheduler, EncodePipeline, ChangeDetector, join_threads
+from jpeg_encoder import select_encoder
+from video_encoder import VideoPacket, H264Stream
 
 class CameraServer:
     def __init__(self, host='0.0.0.0', port=8888):
@@ -15,19 +20,69 @@ class CameraServer:
         self.port = port
         self.server_socket = None
         self.running = False
-        self.clients = []
+        # Yakalama ve streaming thread'leri (stop_server bitmelerini bekler)
+        self.threads = []
+        # H.264 encoder'ı; yeni istemcinin anahtar frame isteğini de taşır
+        self.video_stream = H264Stream()
+        
+        # Kabul ve gönderim tek bir non-blocking I/O thread'inde;
+        # her istemcinin sınırlı bir kuyruğu var
+        self.broadcaster = StreamBroadcaster(
+            max_queue=SERVER_CONFIG.get('client_queue_size', 3),
+            send_timeout=SERVER_CONFIG.get('send_timeout', 5.0),
+            on_keyframe_needed=self.video_stream.request_keyframe,
+            max_clients=SERVER_CONFIG.get('max_clients', 5),
+            send_buffer_limit=SERVER_CONFIG.get('client_send_buffer', 4 * 1024 * 1024),
+            handshake=self.camera_list_message
+        )
         self.camera = None
+        self.encoder = None
+        
+        # True ise kameranın JPEG byte'ları olduğu gibi iletilir
+        self.passthrough = False
         self.logger = logging.getLogger(__name__)
         
         # Kamera ayarları
         self.camera_config = CAMERA_CONFIG
         
+        # Her frame'e seq, capture_ts_ns ve encode_ms ekler
+        self.stamper = FrameStamper(self.camera_config.get('index', 0))
+        
+        # Yakalama thread'i en yeni frame'i buraya yazar, encode havuzda yapılır
+        self.frame_slot = LatestFrameSlot()
+        
+        # Sahne değişmediyse encode/gönderim atlanır (None = kapalı)
+        self.change_detector = ChangeDetector.from_config(self.camera_config)
+        
+        # H.264 modunda encoder durumludur, frame'ler tek worker'da sırayla encode edilir
+        self.codec = self.camera_config.get('codec', 'jpeg')
+        self.encode_pipeline = EncodePipeline(
+            self._encode_frame,
+            self._publish_frame,
+            workers=1 if self.codec == 'h264' else self.camera_config.get('encode_workers', 2)
+        )
+    
     def start_server(self):
         """Sunucuyu başlat"""
         try:
             # Kamerayı başlat
             self._init_camera()
             
+            # Bu çözünürlükte en hızlı JPEG encoder'ı seç
+            self.encoder = select_encoder(
+                self.camera_config.get('encoder', 'auto'),
+                self.camera_config.get('width', 640),
+                self.camera_config.get('height', 480),
+                self.camera_config.get('quality', 80)
+            )
+            
+            if self.codec == 'h264' and not self.video_stream.open(
+                    self.camera_config,
+                    int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                    int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                    self.broadcaster):
+                self.codec = 'jpeg'
+            
             # Socket sunucusunu başlat
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -37,27 +92,71 @@ class CameraServer:
             self.running = True
             self.logger.info(f"Kamera sunucusu başlatıldı: {self.host}:{self.port}")
             
-            # İstemci kabul thread'i
-            accept_thread = threading.Thread(target=self._accept_clients)
-            accept_thread.daemon = True
-            accept_thread.start()
+            # İstemci kabul ve gönderim döngüsü
+            self.broadcaster.start(self.server_socket)
+            
+            # Kamera yakalama thread'i
+            capture_thread = threading.Thread(target=self._capture_frames)
+            capture_thread.daemon = True
+            capture_thread.start()
+            self.threads.append(capture_thread)
             
             # Video streaming thread'i
             stream_thread = threading.Thread(target=self._stream_video)
             stream_thread.daemon = True
             stream_thread.start()
+            self.threads.append(stream_thread)
             
             return True
-            
+        
         except Exception as e:
             self.logger.error(f"Sunucu başlatma hatası: {e}")
             return False
     
+    def camera_list_message(self):
+        """Handshake mesajı: CameraClient'ın beklediği kamera listesi ve yayın bilgileri
+        
+        Yayın sunucusu istek kabul etmez (pull yok); istemci push moduna
+        geçer ve frame'leri abonelik beklemeden alır.
+        """
+        if self.passthrough:
+            encoder = 'passthrough'
+        elif self.codec == 'h264' and self.video_stream.encoder is not None:
+            encoder = self.video_stream.name
+        else:
+            encoder = self.encoder.name if self.encoder else None
+        return {
+            'type': 'camera_list',
+            'cameras': [self.stamper.camera_id],
+            'server_info': {
+                'fps': self.camera_config.get('fps', 30),
+                'resolution': f"{self.camera_config.get('width', 640)}x{self.camera_config.get('height', 480)}",
+                'quality': self.camera_config.get('quality', 80),
+                'push_supported': True,
+                'pull_supported': False,
+                # Passthrough JPEG'i karşılaştırılamadığından kapıdan geçmez
+                'change_detection': self.change_detector is not None and not self.passthrough,
+                'udp_supported': False,
+                'multicast': None,
+                'codec': self.codec,
+                'encoder': encoder
+            }
+        }
+    
     def _init_camera(self):
         """Kamerayı başlat"""
         try:
             camera_index = self.camera_config.get('index', 0)
-            self.camera = cv2.VideoCapture(camera_index)
+            # Passthrough JPEG byte'ları verir; H.264 modu ham frame'e ihtiyaç duyar
+            passthrough = (self.camera_config.get('mjpeg_passthrough', False) and
+                           self.camera_config.get('codec', 'jpeg') == 'jpeg')
+            
+            # FOURCC ve CONVERT_RGB ayarları V4L2 backend'inde geçerli
+            if passthrough:
+                self.camera = cv2.VideoCapture(camera_index, cv2.CAP_V4L2)
+                self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            else:
+                self.camera = cv2.VideoCapture(camera_index)
             
             # Kamera ayarları
             width = self.camera_config.get('width', 640)
@@ -71,67 +170,101 @@ class CameraServer:
             if not self.camera.isOpened():
                 raise Exception("Kamera açılamadı")
             
-            self.logger.info(f"Kamera başlatıldı: {width}x{height}@{fps}fps")
+            if passthrough:
+                self.passthrough = self._enable_passthrough()
             
+            mode = "MJPEG passthrough" if self.passthrough else "BGR"
+            self.logger.info(f"Kamera başlatıldı: {width}x{height}@{fps}fps ({mode})")
+        
         except Exception as e:
             self.logger.error(f"Kamera başlatma hatası: {e}")
             raise
     
-    def _accept_clients(self):
-        """İstemci bağlantılarını kabul et"""
-        while self.running:
-            try:
-                client_socket, client_address = self.server_socket.accept()
-                self.clients.append(client_socket)
-                self.logger.info(f"İstemci bağlandı: {client_address}")
-                
-            except Exception as e:
-                if self.running:
-                    self.logger.error(f"İstemci kabul hatası: {e}")
+    def _enable_passthrough(self):
+        """Decode'u kapat; kamera gerçekten JPEG veriyorsa True döndür"""
+        self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        
+        ret, frame = self.camera.read()
+        if ret and self._is_jpeg(frame):
+            return True
+        
+        # Kamera MJPEG desteklemiyor veya backend ham byte vermiyor
+        self.logger.warning("MJPEG passthrough kullanılamıyor, encode moduna dönülüyor")
+        self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        return False
     
-    def _stream_video(self):
-        """Video akışını gönder"""
+    @staticmethod
+    def _is_jpeg(frame):
+        """CONVERT_RGB kapalıyken read() sıkıştırılmış byte'ları tek boyutlu verir"""
+        if frame is None or frame.ndim == 3 or frame.size < 4:
+            return False
+        data = frame.reshape(-1)
+        return data[0] == 0xFF and data[1] == 0xD8
+    
+    def _capture_frames(self):
+        """Kameradan sürekli oku, en yeni frame'i yuvaya yaz"""
         while self.running and self.camera:
             try:
                 ret, frame = self.camera.read()
                 if not ret:
+                    time.sleep(0.005)
                     continue
+                self.frame_slot.put(frame, self.stamper.capture_timestamp())
+            
+            except Exception as e:
+                self.logger.error(f"Kamera okuma hatası: {e}")
+                time.sleep(0.1)
+    
+    def _encode_frame(self, frame):
+        """Encode worker'ında JPEG'e (veya H.264 modunda H.264'e) çevir"""
+        if self.codec == 'h264':
+            return self.video_stream.encode(frame)
+        return self.encoder.encode(frame, self.camera_config.get('quality', 80))
+    
+    def _publish_frame(self, capture_ts_ns, frame_data, encode_ms):
+        """Encode sırasıyla header ekle ve istemcilere dağıt"""
+        if isinstance(frame_data, VideoPacket):
+            header = self.stamper.stamp(capture_ts_ns, encode_ms, codec='h264',
+                                        keyframe=frame_data.keyframe)
+            header_data = build_frame_header(header, len(frame_data.data))
+            self.broadcaster.broadcast(header_data, frame_data.data, keyframe=frame_data.keyframe)
+            return
+        
+        # Header: seq, yakalama zamanı ve encode süresi
+        header = self.stamper.stamp(capture_ts_ns, encode_ms)
+        header_data = build_frame_header(header, len(frame_data))
+        
+        # Paylaşılan buffer'ı tüm istemci kuyruklarına ekle (bloklamaz)
+        self.broadcaster.broadcast(header_data, frame_data)
+    
+    def _stream_video(self):
+        """Monoton zamanlayıcı ile en yeni frame'i encode havuzuna ver"""
+        scheduler = DeadlineScheduler(self.camera_config.get('fps', 30))
+        last_seq = 0
+        
+        while self.running and self.camera:
+            try:
+                # FPS kontrolü - sabit sleep yerine bir sonraki tick'e kadar bekle
+                scheduler.wait()
                 
-                # Frame'i encode et
-                _, buffer = cv2.imencode('.jpg', frame, 
-                                       [cv2.IMWRITE_JPEG_QUALITY, 
-                                        self.camera_config.get('quality', 80)])
-                
-                frame_data = buffer.tobytes()
-                frame_size = len(frame_data)
-                
-                # Bağlı tüm istemcilere gönder
-                disconnected_clients = []
-                
-                for client in self.clients[:]:
-                    try:
-                        # Frame boyutunu gönder
-                        client.send(frame_size.to_bytes(4, 'big'))
-                        
-                        # Frame verisini gönder
-                        client.sendall(frame_data)
-                        
-                    except Exception as e:
-                        disconnected_clients.append(client)
-                        self.logger.warning(f"İstemci bağlantısı kesildi: {e}")
-                
-                # Bağlantısı kesilen istemcileri temizle
-                for client in disconnected_clients:
-                    if client in self.clients:
-                        self.clients.remove(client)
-                        try:
-                            client.close()
-                        except:
-                            pass
+                seq, frame, capture_ts_ns = self.frame_slot.get_newer(last_seq, timeout=0.5)
+                if frame is None:
+                    continue
+                last_seq = seq
                 
-                # FPS kontrolü
-                time.sleep(1.0 / self.camera_config.get('fps', 30))
+                # Durağan sahnede frame atlanır; passthrough JPEG'i decode
+                # edilmediği için karşılaştırılamaz. Anahtar frame isteği
+                # (yeni istemci) beklemeden gönderilir.
+                if (self.change_detector is not None and not self.passthrough and
+                        not self.change_detector.should_send(frame, force=self.video_stream.keyframe_requested)):
+                    continue
                 
+                if self.passthrough:
+                    # Kameranın ürettiği JPEG byte'ları değiştirilmeden gönderilir
+                    self._publish_frame(capture_ts_ns, memoryview(frame).cast('B'), 0.0)
+                else:
+                    self.encode_pipeline.submit(frame, capture_ts_ns)
+            
             except Exception as e:
                 self.logger.error(f"Video streaming hatası: {e}")
                 time.sleep(0.1)
@@ -140,12 +273,16 @@ class CameraServer:
         """Sunucuyu durdur"""
         self.running = False
         
-        # İstemci bağlantılarını kapat
-        for client in self.clients:
-            try:
-                client.close()
-            except:
-                pass
+        # Havuza iş gönderen thread'ler bitmeden havuz kapatılmaz
+        join_threads(self.threads)
+        self.threads = []
+        
+        # Encode havuzunu (süren encode'lar bitince) ve istemci bağlantılarını kapat
+        self.encode_pipeline.shutdown(wait=True)
+        self.broadcaster.close_all()
+        self.video_stream.close()
+        if self.encoder is not None:
+            self.encoder.close()
         
         # Kamerayı kapat
         if self.camera:
@@ -170,7 +307,7 @@ if __name__ == "__main__":
         # Sunucuyu çalışır durumda tut
         while server.running:
             time.sleep(1)
-            
+    
     except KeyboardInterrupt:
         print("Sunucu durduruluyor...")
     finally:
@@ -9,7 +9,17 @@ CAMERA_CONFIG = {
     'height': 480,        # Çözünürlük yüksekliği
     'fps': 30,            # Frame per second
     'quality': 80,        # JPEG kalitesi (1-100)
-    'buffer_size': 1      # Kamera buffer boyutu
+    'buffer_size': 1,     # Kamera buffer boyutu
+    'encode_workers': 2,  # Paralel JPEG encode thread sayısı
+    'encoder': 'auto',    # auto, opencv, turbojpeg, gstreamer
+    'mjpeg_passthrough': False,  # Kameranın MJPEG çıktısını decode/encode etmeden ilet
+    'codec': 'jpeg',      # jpeg veya h264 (PyAV / GStreamer gerekir)
+    'h264_bitrate': 4000000,  # H.264 hedef bit hızı (bit/s)
+    'gop': 60,            # Periyodik anahtar frame aralığı (frame)
+    'change_detection': False,  # Sahne değişmediyse encode/gönderimi atla
+    'change_threshold': 0.01,   # Değişmiş sayılması için örneklerin oranı
+    'change_pixel_delta': 12,   # Bir örneğin değişmiş sayıldığı gri seviye farkı
+    'keepalive_interval': 1.0   # Değişim olmasa da en az bu aralıkta frame gönder (s)
 }
 
 # ZED kamera ayarları (Jetson için)
@@ -17,7 +27,58 @@ ZED_CONFIG = {
     'resolution': 'HD720',  # VGA, HD720, HD1080, HD2K
     'fps': 30,
     'depth_mode': 'PERFORMANCE',  # PERFORMANCE, QUALITY, ULTRA
-    'quality': 80
+    'quality': 80,
+    'encode_workers': 2,
+    'encoder': 'auto',
+    'codec': 'jpeg',
+    'h264_bitrate': 4000000,
+    'gop': 60,
+    'stereo_mode': None,          # None, side_by_side, top_bottom, separate (sol=0, sağ=1)
+    'depth_stream': False,        # uint16 mm derinlik haritası ('depth' mesajı)
+    'depth_encoding': 'png',      # png veya zstd (kayıpsız)
+    'depth_compression': 1,       # PNG/zstd sıkıştırma seviyesi
+    'depth_fps': 10,
+    'point_cloud_stream': False,  # float16 nokta bulutu ('point_cloud' mesajı)
+    'point_cloud_step': 8,        # Her eksende örnekleme adımı
+    'change_detection': False,
+    'change_threshold': 0.01,
+    'change_pixel_delta': 12,
+    'keepalive_interval': 1.0
+}
+
+# Çoklu kamera yöneticisi ayarları (CameraClient protokolü, istek/yanıt + push)
+CAMERA_MANAGER_CONFIG = {
+    'port': 9995,
+    'devices': [0],       # VideoCapture cihaz indeksleri / yolları
+    'width': 640,
+    'height': 480,
+    'fps': 30,
+    'quality': 80,
+    'encoder': 'auto',
+    'change_detection': False,
+    'change_threshold': 0.01,
+    'change_pixel_delta': 12,
+    'keepalive_interval': 1.0,
+    # Encode profilleri (çözünürlük x kalite); istemci get_frame/subscribe
+    # isteğinde 'profile' ile seçer. 'default' kameranın kendi ayarlarıdır.
+    'profiles': {
+        'thumbnail': {'width': 320, 'height': 240, 'quality': 60},
+        'full': {'quality': 90}
+    },
+    # subscribe isteğinde transport='udp' ile frame'ler UDP parçalarıyla gider
+    'udp_enabled': True,
+    'udp_payload_size': 1400,  # Datagram boyutu (byte), bağlantı MTU'sunun altında kalmalı
+    # Birden çok yer istasyonu için tek gönderimli yayın; istemci subscribe
+    # isteğinde transport='multicast' ile izleyici olur ve gruba katılır
+    'multicast': {
+        'enabled': False,
+        'group': '239.255.42.1',
+        'port': 5004,
+        'ttl': 1,             # 1 = yalnızca yerel ağ
+        'interface': None,    # Gönderim arayüzünün IP'si (None = varsayılan rota)
+        'profile': 'default',
+        'fps': 30
+    }
 }
 
 # Server ayarları
@@ -25,7 +86,10 @@ SERVER_CONFIG = {
     'raspberry_port': 8888,
     'jetson_port': 8889,
     'max_clients': 5,
-    'timeout': 30
+    'timeout': 30,
+    'client_queue_size': 3,   # İstemci başına bekleyen frame (dolunca en eski atılır)
+    'send_timeout': 5.0,      # Takılan istemcinin düşürülme süresi (saniye)
+    'client_send_buffer': 4 * 1024 * 1024  # İstemci başına kuyrukta bekleyebilecek byte
 }
 
 # Logging ayarları
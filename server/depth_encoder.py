@@ -0,0 +1,49 @@
+# Depth Encoder
+# server/depth_encoder.py - Derinlik haritası ve nokta bulutu için kompakt kodlama
+# =============================================================================
+
+import cv2
+import numpy as np
+try:
+    import zstandard # type: ignore
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+def depth_to_millimeters(depth):
+    """float32 milimetre derinliği uint16'ya çevir (geçersiz/NaN/inf = 0)
+    
+    uint16 milimetre 65.5 m'ye kadar 1 mm çözünürlük verir; float32
+    haritanın yarısı boyutundadır ve kayıpsız sıkıştırılabilir.
+    """
+    depth_mm = np.nan_to_num(depth, nan=0.0, posinf=0.0, neginf=0.0)
+    np.clip(depth_mm, 0, 65535, out=depth_mm)
+    return depth_mm.astype(np.uint16)
+
+def downsample_point_cloud(xyz, step=8, scale=0.001):
+    """XYZ(A) nokta bulutunu her step'te bir örnekleyip float16 (metre) yap"""
+    points = xyz[::step, ::step, :3] * scale
+    return np.ascontiguousarray(points, dtype=np.float16)
+
+def _zstd_compress(data, level):
+    # ZstdCompressor thread-safe değil; çağrı başına oluşturmak ucuz
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+def encode_depth(depth_mm, encoding='png', level=1):
+    """uint16 derinliği kayıpsız sıkıştır, (encoding, bytes) döndür
+    
+    zstd istenip kurulu değilse PNG kullanılır.
+    """
+    if encoding == 'zstd' and ZSTD_AVAILABLE:
+        return 'zstd', _zstd_compress(depth_mm, level)
+    
+    ok, buffer = cv2.imencode('.png', depth_mm, [cv2.IMWRITE_PNG_COMPRESSION, level])
+    if not ok:
+        return None, None
+    return 'png', memoryview(buffer).cast('B')
+
+def encode_point_cloud(points, level=1):
+    """float16 nokta bulutunu zstd ile (yoksa ham) paketle"""
+    if ZSTD_AVAILABLE:
+        return 'zstd', _zstd_compress(points, level)
+    return 'raw', memoryview(points).cast('B')
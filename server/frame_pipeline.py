@@ -0,0 +1,246 @@
+# Frame Pipeline
+# server/frame_pipeline.py - Yakalama / encode / gönderim ardışık düzeni
+# =============================================================================
+
+import time
+import threading
+import logging
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def join_threads(threads, timeout=2.0):
+    """Yakalama/streaming thread'lerinin döngüden çıkmasını bekle
+    
+    Çağıran thread listedeyse kendini beklemez.
+    """
+    for thread in threads:
+        if thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+
+class FrameArrayPool:
+    """Aynı boyuttaki frame dizilerini yeniden kullanan serbest liste
+    
+    Yakalama tarafı acquire() ile aldığı diziye dst= ile yazar; frame
+    encode edildiğinde (veya hiç kullanılmadan ezildiğinde) release() ile
+    geri döner. Sürekli durumda frame başına yeni dizi ayrılmaz.
+    """
+    
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self.allocations = 0
+        self._free = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                return free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+    
+    def release(self, frame):
+        """Diziyi (veya stereo (sol, sağ) tuple'ını) havuza geri ver"""
+        if isinstance(frame, tuple):
+            for part in frame:
+                self.release(part)
+            return
+        if not isinstance(frame, np.ndarray) or frame.base is not None:
+            return
+        key = (frame.shape, frame.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_free:
+                free.append(frame)
+
+class LatestFrameSlot:
+    """Yakalama thread'inin yazdığı tek kişilik en yeni frame yuvası
+    
+    Okuyucu yetişemezse eski frame'ler sessizce ezilir; kuyruk birikmez.
+    Hiç okunmadan ezilen frame on_discard ile (ör. havuza) geri verilir.
+    """
+    
+    def __init__(self, on_discard=None):
+        self.seq = 0
+        self.frame = None
+        self.capture_ts_ns = 0
+        self.on_discard = on_discard
+        self._consumed = True
+        self._cond = threading.Condition()
+    
+    def put(self, frame, capture_ts_ns):
+        """Yeni frame'i yaz ve bekleyenleri uyandır"""
+        with self._cond:
+            discarded = None if self._consumed else self.frame
+            self.seq += 1
+            self.frame = frame
+            self.capture_ts_ns = capture_ts_ns
+            self._consumed = False
+            self._cond.notify_all()
+            seq = self.seq
+        
+        if discarded is not None and self.on_discard:
+            self.on_discard(discarded)
+        return seq
+    
+    def get_newer(self, after_seq, timeout=None):
+        """after_seq'ten yeni frame gelene kadar bekle, (seq, frame, ts) döndür"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after_seq, timeout):
+                return after_seq, None, 0
+            self._consumed = True
+            return self.seq, self.frame, self.capture_ts_ns
+
+class DeadlineScheduler:
+    """time.monotonic tabanlı sabit periyotlu zamanlayıcı
+    
+    Sabit sleep yerine bir sonraki mutlak zamana kadar uyur; böylece
+    encode ve gönderim süresi periyoda eklenmez. Çok geride kalınırsa
+    birikmiş tick'ler patlama yapmak yerine atlanır.
+    """
+    
+    def __init__(self, fps):
+        self.set_fps(fps)
+        self.next_deadline = time.monotonic()
+    
+    def set_fps(self, fps):
+        self.period = 1.0 / max(1, fps)
+    
+    def wait(self):
+        """Bir sonraki tick'e kadar bekle"""
+        now = time.monotonic()
+        if self.next_deadline > now:
+            time.sleep(self.next_deadline - now)
+            self.next_deadline += self.period
+        elif now - self.next_deadline > self.period:
+            self.next_deadline = now + self.period
+        else:
+            self.next_deadline += self.period
+
+class ChangeDetector:
+    """Küçültülmüş gri görüntü farkıyla anlamlı değişim olup olmadığını söyler
+    
+    Frame her sample_width pikselde bir örneklenip (kopyasız stride)
+    tamsayı ağırlıklarla griye çevrilir ve son *gönderilen* frame'in
+    örneğiyle karşılaştırılır; yavaş kayma da birikip sonunda gönderilir.
+    Gri seviyesi pixel_delta'dan fazla değişen örneklerin oranı threshold'u
+    geçmezse frame atlanır. keepalive saniyede bir değişim olmasa da frame
+    gönderilir; istemci zaman aşımına düşmez, yeni katılan görüntü alır.
+    """
+    
+    def __init__(self, threshold=0.01, pixel_delta=12, keepalive=1.0, sample_width=80):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.keepalive = keepalive
+        self.sample_width = sample_width
+        self.reference = None
+        self.last_sent = 0.0
+        self.frames_skipped = 0
+    
+    def _sample(self, frame):
+        step = max(1, frame.shape[1] // self.sample_width)
+        sample = frame[::step, ::step]
+        if sample.ndim == 3:
+            # BGR -> gri, BT.601 ağırlıkları 256 ile ölçeklenmiş (uint16'ya sığar)
+            sample = sample.astype(np.uint16)
+            sample = (sample[..., 0] * 29 + sample[..., 1] * 150 + sample[..., 2] * 77) >> 8
+        return sample.astype(np.int16)
+    
+    def should_send(self, frame, force=False):
+        """Frame gönderilmeli mi? Gönderilecekse referans bu frame olur"""
+        now = time.monotonic()
+        sample = self._sample(frame)
+        
+        send = (force or self.reference is None or sample.shape != self.reference.shape or
+                now - self.last_sent >= self.keepalive)
+        if not send:
+            changed = np.count_nonzero(np.abs(sample - self.reference) > self.pixel_delta)
+            send = changed >= self.threshold * sample.size
+        
+        if send:
+            self.reference = sample
+            self.last_sent = now
+        else:
+            self.frames_skipped += 1
+        return send
+    
+    @classmethod
+    def from_config(cls, config):
+        """change_detection açıksa config'ten oluştur, değilse None"""
+        if not config.get('change_detection', False):
+            return None
+        return cls(
+            threshold=config.get('change_threshold', 0.01),
+            pixel_delta=config.get('change_pixel_delta', 12),
+            keepalive=config.get('keepalive_interval', 1.0)
+        )
+
+class EncodePipeline:
+    """Encode işlerini worker havuzunda çalıştırıp sonuçları sırayla yayınlar
+    
+    encode_fn(frame) worker thread'inde çalışır ve (frame_data, encode_ms)
+    döndürür; publish_fn(capture_ts_ns, frame_data, encode_ms) sonuçlar
+    gönderim sırasıyla çağrılır. Yoldaki iş sayısı sınırlıdır, fazlası atlanır.
+    Verilen frame encode bittiğinde (veya atlandığında) release_fn'e döner.
+    """
+    
+    def __init__(self, encode_fn, publish_fn, workers=2, max_in_flight=None, release_fn=None):
+        self.encode_fn = encode_fn
+        self.publish_fn = publish_fn
+        self.release_fn = release_fn
+        self.max_in_flight = max_in_flight or workers * 2
+        self.frames_skipped = 0
+        self.logger = logging.getLogger(__name__)
+        
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-encode")
+        self._pending = deque()  # (future, capture_ts_ns)
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+    
+    def submit(self, frame, capture_ts_ns):
+        """Frame'i encode için kuyruğa al; havuz doluysa atla"""
+        with self._lock:
+            accepted = len(self._pending) < self.max_in_flight
+            if accepted:
+                future = self.executor.submit(self._timed_encode, frame)
+                self._pending.append((future, capture_ts_ns))
+            else:
+                self.frames_skipped += 1
+        
+        if not accepted:
+            if self.release_fn:
+                self.release_fn(frame)
+            return False
+        future.add_done_callback(lambda _: self._drain())
+        return True
+    
+    def _timed_encode(self, frame):
+        start = time.perf_counter()
+        try:
+            frame_data = self.encode_fn(frame)
+        finally:
+            if self.release_fn:
+                self.release_fn(frame)
+        return frame_data, (time.perf_counter() - start) * 1000.0
+    
+    def _drain(self):
+        """Baştan itibaren tamamlanmış işleri sırasıyla yayınla"""
+        with self._publish_lock:
+            while True:
+                with self._lock:
+                    if not self._pending or not self._pending[0][0].done():
+                        return
+                    future, capture_ts_ns = self._pending.popleft()
+                
+                try:
+                    frame_data, encode_ms = future.result()
+                    if frame_data is not None:
+                        self.publish_fn(capture_ts_ns, frame_data, encode_ms)
+                except Exception as e:
+                    self.logger.error(f"Frame encode hatası: {e}")
+    
+    def shutdown(self, wait=False):
+        """Havuzu kapat; wait=True ise süren encode'ların bitmesini bekle"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,55 @@
+# Frame Protocol
+# server/frame_protocol.py - İstemci protokolü ile uyumlu frame mesajları
+# =============================================================================
+
+import json
+import struct
+import time
+
+def build_frame_header(header, frame_size):
+    """[!I uzunluk][JSON header][!I frame boyutu] önekini oluştur
+
+    Frame verisi öneke eklenmez; böylece JPEG buffer'ı kopyalanmadan
+    ayrıca gönderilebilir.
+    """
+    header_json = json.dumps(header).encode('utf-8')
+    return struct.pack("!I", len(header_json)) + header_json + struct.pack("!I", frame_size)
+
+def build_message(message):
+    """Frame içermeyen JSON mesajı ([!I uzunluk][JSON])"""
+    message_json = json.dumps(message).encode('utf-8')
+    return struct.pack("!I", len(message_json)) + message_json
+
+class FrameStamper:
+    """Kamera başına seq, capture_ts_ns ve encode_ms alanlarını üretir"""
+    
+    def __init__(self, camera_id=0):
+        self.camera_id = camera_id
+        self.seq = 0
+    
+    def capture_timestamp(self):
+        """Yakalama anı (duvar saati, ns) - istemci glass-to-glass gecikmesi için"""
+        return time.time_ns()
+    
+    def stamp(self, capture_ts_ns, encode_ms, seq=None, **extra):
+        """Sıradaki frame için header oluştur
+
+        Aynı yakalanan frame'in farklı encode'ları (profiller) aynı seq'i
+        paylaşsın diye seq dışarıdan verilebilir. Sayaç burada artırılırsa
+        (yayın sunucuları) seq aynı zamanda gönderim sırasıdır ve istemcinin
+        kayıp hesabı için tx_seq olarak da yazılır; dışarıdan verilen seq'te
+        tx_seq'i gönderen taraf ekler.
+        """
+        if seq is None:
+            self.seq += 1
+            seq = self.seq
+            extra['tx_seq'] = seq
+        header = {
+            'type': 'frame',
+            'camera_id': self.camera_id,
+            'seq': seq,
+            'capture_ts_ns': capture_ts_ns,
+            'encode_ms': round(encode_ms, 2)
+        }
+        header.update(extra)
+        return header
@@ -0,0 +1,274 @@
+# JPEG Encoder
+# server/jpeg_encoder.py - Değiştirilebilir JPEG encoder backend'leri
+# =============================================================================
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+import cv2
+import numpy as np
+from video_encoder import GSTREAMER_AVAILABLE, Gst
+try:
+    from turbojpeg import TurboJPEG # type: ignore
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class JpegEncoder:
+    """Encoder arayüzü: BGR frame'i verilen kalitede JPEG byte'larına çevirir
+    
+    encode() encode havuzunun birden fazla thread'inden aynı anda
+    çağrılabilir; thread-safe olmayan backend'ler thread başına kendi
+    durumunu tutar.
+    """
+    
+    name = 'base'
+    
+    @classmethod
+    def available(cls):
+        return False
+    
+    def encode(self, frame, quality):
+        raise NotImplementedError
+    
+    def close(self):
+        """Backend kaynaklarını bırak (sunucu kapanırken çağrılır)"""
+        pass
+
+class OpenCVJpegEncoder(JpegEncoder):
+    """cv2.imencode - her zaman mevcut, test edilen yedek backend"""
+    
+    name = 'opencv'
+    
+    @classmethod
+    def available(cls):
+        return True
+    
+    def encode(self, frame, quality):
+        # Encode edilmiş numpy buffer'ı kopyalanmadan (tobytes yok) tek boyutlu
+        # byte görünümü olarak döner; sendall memoryview'ı doğrudan gönderir
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return memoryview(buffer).cast('B') if ok else None
+
+class TurboJpegEncoder(JpegEncoder):
+    """PyTurboJPEG (libjpeg-turbo SIMD) - yüklüyse"""
+    
+    name = 'turbojpeg'
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    @classmethod
+    def available(cls):
+        if not TURBOJPEG_AVAILABLE:
+            return False
+        try:
+            TurboJPEG()
+            return True
+        except Exception:
+            # Python paketi var ama libturbojpeg bulunamadı
+            return False
+    
+    def encode(self, frame, quality):
+        # TurboJPEG handle'ı thread'ler arasında paylaşılmaz
+        jpeg = getattr(self._local, 'jpeg', None)
+        if jpeg is None:
+            jpeg = self._local.jpeg = TurboJPEG()
+        return jpeg.encode(frame, quality=quality)
+
+class GStreamerJpegEncoder(JpegEncoder):
+    """Donanım JPEG encoder'ı: Jetson nvjpegenc veya V4L2 M2M v4l2jpegenc
+    
+    appsrc ! videoconvert ! <encoder> ! appsink pipeline'ları frame boyutu
+    başına kurulup havuzda tutulur; her frame senkron olarak itilip çekilir.
+    Bir pipeline aynı anda tek encode'a verilir, boyutlar arası geçişte
+    yeniden kurulmaz (profiller ve ROI'ler aynı frame'de farklı boyutlar
+    ister). Toplam pipeline sayısı max_pipelines'ı aşarsa en uzun süredir
+    kullanılmayan boyutunki NULL durumuna alınır; close() hepsini kapatır.
+    """
+    
+    name = 'gstreamer'
+    ELEMENTS = ('nvjpegenc', 'v4l2jpegenc')
+    PULL_TIMEOUT = 1.0
+    
+    def __init__(self, element=None, max_pipelines=8):
+        self.element = element or self.find_element()
+        self.name = f"gstreamer-{self.element}"
+        self.max_pipelines = max_pipelines
+        # Boyut başına boştaki pipeline'lar; en son kullanılan boyut sonda
+        self._idle = OrderedDict()
+        # Boşta ve kullanımda olan toplam pipeline sayısı
+        self._pipeline_count = 0
+        self._closed = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def find_element(cls):
+        if not GSTREAMER_AVAILABLE:
+            return None
+        for element in cls.ELEMENTS:
+            if Gst.ElementFactory.find(element) is not None:
+                return element
+        return None
+    
+    @classmethod
+    def available(cls):
+        return cls.find_element() is not None
+    
+    def _acquire(self, size):
+        """Boyuttaki boş bir pipeline'ı al; yoksa yenisini kur"""
+        with self._lock:
+            idle = self._idle.get(size)
+            if idle:
+                elements = idle.pop()
+                if not idle:
+                    del self._idle[size]
+                return elements
+            self._pipeline_count += 1
+        try:
+            return self._build(*size)
+        except Exception:
+            with self._lock:
+                self._pipeline_count -= 1
+            raise
+    
+    def _release(self, size, elements, reuse=True):
+        """Pipeline'ı havuza geri koy; sınır aşıldıysa en eskileri kapat"""
+        stopped = []
+        with self._lock:
+            if reuse and not self._closed:
+                self._idle.setdefault(size, []).append(elements)
+                self._idle.move_to_end(size)
+            else:
+                stopped.append(elements)
+            while self._pipeline_count - len(stopped) > self.max_pipelines and self._idle:
+                oldest_size, idle = next(iter(self._idle.items()))
+                stopped.append(idle.pop(0))
+                if not idle:
+                    del self._idle[oldest_size]
+            self._pipeline_count -= len(stopped)
+        for pipeline, _, _, _ in stopped:
+            pipeline.set_state(Gst.State.NULL)
+    
+    def _build(self, width, height):
+        pipeline = Gst.parse_launch(
+            f"appsrc name=src format=time "
+            f"caps=video/x-raw,format=BGR,width={width},height={height},framerate=0/1 "
+            f"! videoconvert ! video/x-raw,format=I420 ! {self.element} name=enc "
+            f"! appsink name=sink sync=false max-buffers=1"
+        )
+        pipeline.set_state(Gst.State.PLAYING)
+        return (
+            pipeline,
+            pipeline.get_by_name('src'),
+            pipeline.get_by_name('enc'),
+            pipeline.get_by_name('sink')
+        )
+    
+    def encode(self, frame, quality):
+        size = (frame.shape[1], frame.shape[0])
+        elements = self._acquire(size)
+        reuse = False
+        try:
+            frame_data = self._encode_with(elements, frame, quality)
+            reuse = True
+            return frame_data
+        finally:
+            # Hata veren pipeline havuza dönmez, kapatılır
+            self._release(size, elements, reuse)
+    
+    def _encode_with(self, elements, frame, quality):
+        _, src, enc, sink = elements
+        
+        # nvjpegenc'in quality özelliği var; v4l2jpegenc sürücü varsayılanını kullanır
+        if enc.find_property('quality') is not None:
+            enc.set_property('quality', quality)
+        
+        src.emit('push-buffer', Gst.Buffer.new_wrapped(frame.tobytes()))
+        sample = sink.emit('try-pull-sample', int(self.PULL_TIMEOUT * Gst.SECOND))
+        if sample is None:
+            return None
+        
+        buffer = sample.get_buffer()
+        ok, info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return None
+        try:
+            return bytes(info.data)
+        finally:
+            buffer.unmap(info)
+    
+    def close(self):
+        """Boştaki pipeline'ları NULL durumuna al; kullanımdakiler iade edilince kapanır"""
+        with self._lock:
+            self._closed = True
+            stopped = [elements for idle in self._idle.values() for elements in idle]
+            self._idle.clear()
+            self._pipeline_count -= len(stopped)
+        for pipeline, _, _, _ in stopped:
+            pipeline.set_state(Gst.State.NULL)
+
+ENCODER_BACKENDS = {
+    'gstreamer': GStreamerJpegEncoder,
+    'turbojpeg': TurboJpegEncoder,
+    'opencv': OpenCVJpegEncoder
+}
+
+def available_encoders():
+    """Bu sistemde kullanılabilen backend adları"""
+    return [name for name, backend in ENCODER_BACKENDS.items() if backend.available()]
+
+def benchmark_encoder(encoder, frame, quality, rounds=5):
+    """Bir ısınma turundan sonra medyan encode süresi (ms); başarısızsa None"""
+    try:
+        if not encoder.encode(frame, quality):
+            return None
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            if not encoder.encode(frame, quality):
+                return None
+            timings.append((time.perf_counter() - start) * 1000.0)
+        return sorted(timings)[len(timings) // 2]
+    except Exception as e:
+        logger.warning(f"{encoder.name} encoder denemesi başarısız: {e}")
+        return None
+
+def select_encoder(preference='auto', width=640, height=480, quality=80):
+    """Tercih edilen veya (auto) en hızlı çalışan encoder'ı seç
+    
+    Seçim başlangıçta gerçek çözünürlükte sentetik bir frame üzerinde
+    ölçülerek yapılır. Hiçbir backend çalışmazsa OpenCV kullanılır.
+    """
+    if preference != 'auto':
+        backend = ENCODER_BACKENDS.get(preference)
+        if backend is not None and backend.available():
+            logger.info(f"JPEG encoder: {preference}")
+            return backend()
+        logger.warning(f"JPEG encoder '{preference}' kullanılamıyor, otomatik seçiliyor")
+    
+    # Düz renk sıkıştırmayı kolaylaştırır; gürültü gerçek görüntüye daha yakın
+    frame = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+    
+    best, best_ms = None, None
+    for name in available_encoders():
+        encoder = ENCODER_BACKENDS[name]()
+        encode_ms = benchmark_encoder(encoder, frame, quality)
+        if encode_ms is None:
+            encoder.close()
+            continue
+        logger.info(f"JPEG encoder {encoder.name}: {encode_ms:.2f}ms ({width}x{height})")
+        if best_ms is None or encode_ms < best_ms:
+            if best is not None:
+                best.close()
+            best, best_ms = encoder, encode_ms
+        else:
+            encoder.close()
+    
+    if best is None:
+        best = OpenCVJpegEncoder()
+    logger.info(f"JPEG encoder seçildi: {best.name}")
+    return best
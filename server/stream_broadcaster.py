@@ -0,0 +1,376 @@
+# Stream Broadcaster
+# server/stream_broadcaster.py - Bir kez encode, çok istemciye dağıtım
+# =============================================================================
+
+import socket
+import selectors
+import threading
+import time
+import logging
+from collections import deque
+from frame_protocol import build_message
+
+class ClientConnection:
+    """Tek bir istemcinin non-blocking socket'i ve sınırlı gönderim kuyruğu
+    
+    Kuyruk paket veya byte sınırını aştığında henüz gönderilmeye
+    başlanmamış en eski paket atılır. Yarım gönderilmiş paket her zaman
+    tamamlanır, böylece çerçeveleme bozulmaz. Yavaş bir bağlantı yalnızca
+    kendi frame'lerini kaybeder, kameraya veya diğer istemcilere yansımaz.
+    
+    H.264 gibi frame'lerin birbirine bağlı olduğu akışlarda tek paket atmak
+    sonraki frame'leri bozar; bu yüzden taşmada kuyruk boşaltılır ve
+    istemci bir sonraki anahtar frame'e kadar bekletilir.
+    """
+    
+    def __init__(self, sock, address, max_queue=3, send_buffer_limit=4 * 1024 * 1024,
+                 inter_frame=False):
+        self.sock = sock
+        self.address = address
+        self.alive = True
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.max_queue = max_queue
+        self.send_buffer_limit = send_buffer_limit
+        self.inter_frame = inter_frame
+        self.waiting_keyframe = inter_frame
+        self.events = 0
+        self.last_progress = time.monotonic()
+        
+        self._queue = deque()      # (parts, size) - gönderilmeye başlanmamış paketler
+        self._queued_bytes = 0
+        self._current = deque()    # gönderilmekte olan paketin kalan parçaları
+        self._lock = threading.Lock()
+        
+        self.sock.setblocking(False)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def put(self, packet, keyframe=None):
+        """Paketi kuyruğa ekle (bloklamaz, sınır aşılırsa en eskisini at)
+        
+        keyframe None değilse paket inter-frame akışın video frame'idir;
+        None ise bağımsız pakettir (ör. derinlik). Video zinciri koptuysa
+        False döner; çağıran yeni anahtar frame istemelidir.
+        """
+        size = sum(len(part) for part in packet)
+        
+        with self._lock:
+            if keyframe:
+                self.waiting_keyframe = False
+            elif keyframe is not None and self.waiting_keyframe:
+                self.frames_dropped += 1
+                return False
+            
+            chain_broken = False
+            if self._overflows(size):
+                if self.inter_frame:
+                    # Atılacak paket bir video frame'i olabilir: zinciri bozuk
+                    # göndermemek için bekleyenlerin hepsi atılır
+                    self.frames_dropped += len(self._queue)
+                    self._queue.clear()
+                    self._queued_bytes = 0
+                    if not keyframe:
+                        self.waiting_keyframe = True
+                        chain_broken = True
+                        if keyframe is not None:
+                            self.frames_dropped += 1
+                            return False
+                else:
+                    while self._queue and self._overflows(size):
+                        _, dropped_size = self._queue.popleft()
+                        self._queued_bytes -= dropped_size
+                        self.frames_dropped += 1
+            
+            if not self._queue and not self._current:
+                # Boşta bekleyen istemcinin takılma süresi şimdi başlar
+                self.last_progress = time.monotonic()
+            self._queue.append((packet, size))
+            self._queued_bytes += size
+            return not chain_broken
+    
+    def _overflows(self, size):
+        return (len(self._queue) >= self.max_queue or
+                (self._queue and self._queued_bytes + size > self.send_buffer_limit))
+    
+    def has_data(self):
+        with self._lock:
+            return bool(self._current or self._queue)
+    
+    def send_pending(self):
+        """Socket kabul ettiği kadar gönder; bağlantı koptuysa False döndür"""
+        while True:
+            if not self._current:
+                with self._lock:
+                    if not self._queue:
+                        return True
+                    parts, size = self._queue.popleft()
+                    self._queued_bytes -= size
+                self._current = deque(memoryview(part) for part in parts if len(part))
+                if not self._current:
+                    continue
+            
+            try:
+                # Header ve frame tek sistem çağrısında (scatter/gather)
+                sent = self.sock.sendmsg(list(self._current))
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                return False
+            
+            self.last_progress = time.monotonic()
+            while sent:
+                view = self._current[0]
+                if sent >= len(view):
+                    sent -= len(view)
+                    self._current.popleft()
+                else:
+                    self._current[0] = view[sent:]
+                    sent = 0
+            
+            if self._current:
+                # Kernel buffer'ı doldu, socket yazılabilir olunca devam edilir
+                return True
+            self.frames_sent += 1
+    
+    def close(self):
+        """Kuyruğu bırak ve socket'i kapat"""
+        self.alive = False
+        with self._lock:
+            self._queue.clear()
+            self._queued_bytes = 0
+        self._current.clear()
+        try:
+            self.sock.close()
+        except:
+            pass
+
+class StreamBroadcaster:
+    """Encode edilmiş frame'i tüm istemcilere paylaşılan buffer ile dağıtır
+    
+    Tek bir I/O thread'i selectors ile dinleme socket'ini ve tüm istemci
+    socket'lerini non-blocking olarak yönetir: kabul, gönderim ve kopan
+    bağlantıların temizliği burada yapılır. Header ve JPEG buffer'ı her
+    istemci kuyruğuna aynı nesne olarak konur; kopya yapılmaz.
+    broadcast() hiçbir zaman socket üzerinde bloklanmaz.
+    
+    inter_frame=True ise (H.264) yeni istemciler anahtar frame'den başlar;
+    anahtar frame gerektiğinde on_keyframe_needed çağrılır.
+    
+    handshake verilirse her yeni istemciye ilk paket olarak döndürdüğü
+    mesaj (CameraClient'ın beklediği camera_list) gönderilir.
+    """
+    
+    def __init__(self, max_queue=3, send_timeout=5.0, inter_frame=False, on_keyframe_needed=None,
+                 max_clients=5, send_buffer_limit=4 * 1024 * 1024, handshake=None):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.inter_frame = inter_frame
+        self.on_keyframe_needed = on_keyframe_needed
+        self.handshake = handshake
+        self.max_clients = max_clients
+        self.send_buffer_limit = send_buffer_limit
+        self.clients = []
+        self.running = False
+        self.logger = logging.getLogger(__name__)
+        
+        self.server_socket = None
+        self._selector = None
+        self._thread = None
+        self._lock = threading.Lock()
+        
+        # Diğer thread'lerden I/O thread'ini uyandırmak için socket çifti
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self._wakeup_pending = False
+    
+    def start(self, server_socket):
+        """Dinleme socket'ini devral ve I/O thread'ini başlat"""
+        self.server_socket = server_socket
+        self.server_socket.setblocking(False)
+        
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.server_socket, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, 'wakeup')
+        
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="stream-io")
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def add_client(self, sock, address):
+        """Kabul edilmiş istemciyi kaydet (I/O thread'inden çağrılır)"""
+        client = ClientConnection(sock, address, self.max_queue, self.send_buffer_limit,
+                                  inter_frame=self.inter_frame)
+        if self.handshake is not None:
+            # İstemci listeye eklenmeden kuyruğa girer; ilk frame'den önce gider
+            client.put((build_message(self.handshake()),))
+        client.events = selectors.EVENT_READ
+        self._selector.register(sock, client.events, client)
+        with self._lock:
+            self.clients.append(client)
+        
+        self.logger.info(f"İstemci bağlandı: {address}")
+        if self.inter_frame:
+            self._request_keyframe()
+        return client
+    
+    def broadcast(self, *parts, keyframe=None):
+        """Paketi (header, frame, ...) tüm canlı istemcilerin kuyruğuna ekle"""
+        with self._lock:
+            clients = list(self.clients)
+        
+        keyframe_needed = False
+        for client in clients:
+            if client.alive and not client.put(parts, keyframe):
+                keyframe_needed = True
+        if keyframe_needed:
+            self._request_keyframe()
+        
+        if clients:
+            self._wakeup()
+        return len(clients)
+    
+    def _request_keyframe(self):
+        if self.on_keyframe_needed:
+            self.on_keyframe_needed()
+    
+    def _wakeup(self):
+        if self._wakeup_pending:
+            return
+        self._wakeup_pending = True
+        try:
+            self._wakeup_send.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+    
+    def client_count(self):
+        """Bağlı istemci sayısı"""
+        with self._lock:
+            return sum(1 for client in self.clients if client.alive)
+    
+    def _run(self):
+        """Tek I/O döngüsü: kabul, gönderim, kopan/takılan istemciler"""
+        while self.running:
+            try:
+                self._flush_clients()
+                for key, mask in self._selector.select(timeout=0.5):
+                    if key.data == 'accept':
+                        self._accept()
+                    elif key.data == 'wakeup':
+                        self._drain_wakeup()
+                    else:
+                        self._service(key.data, mask)
+                self._drop_stalled()
+            except Exception as e:
+                if self.running:
+                    self.logger.error(f"Yayın I/O hatası: {e}")
+                    time.sleep(0.1)
+    
+    def _accept(self):
+        """Bekleyen bağlantıları kabul et, istemci sınırını uygula"""
+        while True:
+            try:
+                client_socket, client_address = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            
+            if self.client_count() >= self.max_clients:
+                self.logger.warning(f"İstemci reddedildi (limit dolu): {client_address}")
+                try:
+                    client_socket.setblocking(False)
+                    client_socket.send(build_message({
+                        'type': 'error',
+                        'message': "Maksimum istemci sayısına ulaşıldı"
+                    }))
+                except OSError:
+                    pass
+                client_socket.close()
+                continue
+            
+            self.add_client(client_socket, client_address)
+    
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_recv.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        # Bayrak okuma bittikten sonra bırakılır; arada gelen paketler
+        # döngünün başındaki _flush_clients ile zaten gönderilir
+        self._wakeup_pending = False
+    
+    def _flush_clients(self):
+        """Bekleyen veriyi hemen göndermeyi dene; kalan varsa yazılabilirliği izle"""
+        with self._lock:
+            clients = list(self.clients)
+        
+        for client in clients:
+            if not client.alive:
+                continue
+            if client.has_data() and not client.send_pending():
+                self._remove(client, "gönderim hatası")
+                continue
+            
+            events = selectors.EVENT_READ
+            if client.has_data():
+                events |= selectors.EVENT_WRITE
+            if events != client.events:
+                client.events = events
+                self._selector.modify(client.sock, events, client)
+    
+    def _service(self, client, mask):
+        if not client.alive:
+            return
+        
+        if mask & selectors.EVENT_READ:
+            # Bu akışta istemci veri göndermez; okunabilirlik kapanma demektir
+            try:
+                data = client.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError:
+                data = b''
+            if data == b'':
+                self._remove(client, "bağlantı kapandı")
+                return
+        
+        if mask & selectors.EVENT_WRITE and not client.send_pending():
+            self._remove(client, "gönderim hatası")
+    
+    def _drop_stalled(self):
+        """send_timeout boyunca hiç ilerleme olmayan istemcileri düşür"""
+        now = time.monotonic()
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            if client.alive and client.has_data() and now - client.last_progress > self.send_timeout:
+                self._remove(client, "gönderim zaman aşımı")
+    
+    def _remove(self, client, reason):
+        self.logger.warning(f"İstemci bağlantısı kesildi {client.address}: {reason}")
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.close()
+    
+    def close_all(self):
+        """I/O thread'ini durdur ve tüm istemci bağlantılarını kapat"""
+        self.running = False
+        self._wakeup()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        
+        with self._lock:
+            clients = self.clients
+            self.clients = []
+        for client in clients:
+            client.close()
+        
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
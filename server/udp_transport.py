@@ -0,0 +1,85 @@
+# UDP Transport
+# server/udp_transport.py - Frame mesajlarının MTU boyutlu UDP parçalarıyla gönderimi
+# =============================================================================
+
+import socket
+import struct
+import threading
+
+# Her datagram'ın başındaki parça header'ı:
+# mesaj no, mesajın toplam boyutu, parçanın mesaj içindeki ofseti,
+# parça sırası, parça sayısı
+FRAGMENT_HEADER = struct.Struct("!IIIHH")
+
+class UdpFrameSender:
+    """TCP ile aynı formattaki mesajı ([!I][JSON][!I][frame]) parçalayıp gönderir
+    
+    Her parça kendi ofsetini taşır; alıcı parçaları sıradan bağımsız olarak
+    yerine yazar ve eksik kalan mesajı süresi dolunca atar. Kayıp tek bir
+    datagram yalnızca kendi frame'ini götürür, sonraki frame'leri bekletmez.
+    Header ve frame buffer'ı kopyalanmadan sendmsg ile parçalanır.
+    
+    multicast_ttl verilirse socket grup adreslerine gönderim için ayarlanır;
+    her frame izleyici sayısından bağımsız olarak bir kez yayınlanır.
+    """
+    
+    def __init__(self, payload_size=1400, send_buffer=4 * 1024 * 1024,
+                 multicast_ttl=None, multicast_interface=None):
+        # payload_size: IP/UDP header'ları hariç datagram boyutu (MTU'nun altında)
+        self.fragment_size = payload_size - FRAGMENT_HEADER.size
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+        if multicast_ttl is not None:
+            # TTL 1 = yalnızca yerel ağ; loopback aynı makinedeki istemciler için açık
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            if multicast_interface:
+                self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                     socket.inet_aton(multicast_interface))
+        self.message_id = 0
+        self.packets_sent = 0
+        self._lock = threading.Lock()
+    
+    def _next_message_id(self):
+        with self._lock:
+            self.message_id = (self.message_id + 1) & 0xFFFFFFFF
+            return self.message_id
+    
+    def send(self, address, *parts):
+        """Mesaj parçalarını (header, frame, ...) address'e datagram'lar olarak gönder"""
+        views = [memoryview(part).cast('B') for part in parts if len(part)]
+        total = sum(len(view) for view in views)
+        count = max(1, -(-total // self.fragment_size))
+        if count > 0xFFFF:
+            raise ValueError(f"Mesaj UDP ile gönderilemeyecek kadar büyük: {total} byte")
+        
+        message_id = self._next_message_id()
+        part_index = 0
+        part_offset = 0
+        for index in range(count):
+            offset = index * self.fragment_size
+            buffers = [FRAGMENT_HEADER.pack(message_id, total, offset, index, count)]
+            
+            # Parça, mesaj parçalarının sınırına denk gelirse birden fazla view'dan oluşur
+            remaining = min(self.fragment_size, total - offset)
+            while remaining:
+                view = views[part_index]
+                chunk = view[part_offset:part_offset + remaining]
+                buffers.append(chunk)
+                remaining -= len(chunk)
+                part_offset += len(chunk)
+                if part_offset == len(view):
+                    part_index += 1
+                    part_offset = 0
+            
+            self.sock.sendmsg(buffers, [], 0, address)
+        
+        with self._lock:
+            self.packets_sent += count
+        return count
+    
+    def close(self):
+        try:
+            self.sock.close()
+        except:
+            pass
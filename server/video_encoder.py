@@ -0,0 +1,248 @@
+# Video Encoder
+# server/video_encoder.py - H.264 (inter-frame) encoder backend'leri
+# GStreamer yüklemesi burada yapılır, jpeg_encoder da buradan kullanır
+# =============================================================================
+
+import threading
+import logging
+from collections import namedtuple
+from fractions import Fraction
+try:
+    import av # type: ignore
+    try:
+        from av.video.frame import PictureType # type: ignore
+        KEYFRAME_PICT_TYPE = PictureType.I
+    except ImportError:
+        KEYFRAME_PICT_TYPE = 'I'
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+try:
+    import gi # type: ignore
+    gi.require_version('Gst', '1.0')
+    from gi.repository import Gst # type: ignore
+    Gst.init(None)
+    GSTREAMER_AVAILABLE = True
+except (ImportError, ValueError):
+    Gst = None
+    GSTREAMER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Bir frame'in encode çıktısı (Annex B byte-stream) ve IDR olup olmadığı
+VideoPacket = namedtuple('VideoPacket', ['data', 'keyframe'])
+
+class PyAVH264Encoder:
+    """PyAV (FFmpeg) CodecContext ile H.264 encode
+    
+    Donanım codec'leri (V4L2 M2M, Jetson nvmpi) varsa önce onlar denenir,
+    yoksa libx264 ultrafast/zerolatency kullanılır. B-frame yoktur; her
+    frame girdiği anda bir paket üretir.
+    """
+    
+    CODECS = ('h264_v4l2m2m', 'h264_nvmpi', 'libx264')
+    
+    def __init__(self, width, height, fps=30, bitrate=4000000, gop=60, codec=None):
+        self.context = None
+        self.pts = 0
+        
+        last_error = None
+        for codec_name in ([codec] if codec else self.CODECS):
+            try:
+                self.context = self._open(codec_name, width, height, fps, bitrate, gop)
+                self.name = f"pyav-{codec_name}"
+                break
+            except Exception as e:
+                last_error = e
+        if self.context is None:
+            raise RuntimeError(f"PyAV H.264 encoder açılamadı: {last_error}")
+    
+    @staticmethod
+    def _open(codec_name, width, height, fps, bitrate, gop):
+        context = av.CodecContext.create(codec_name, 'w')
+        context.width = width
+        context.height = height
+        context.pix_fmt = 'yuv420p'
+        context.time_base = Fraction(1, fps)
+        context.framerate = Fraction(fps, 1)
+        context.bit_rate = bitrate
+        context.gop_size = gop
+        context.max_b_frames = 0
+        if codec_name == 'libx264':
+            context.options = {'preset': 'ultrafast', 'tune': 'zerolatency'}
+        context.open()
+        return context
+    
+    def encode(self, frame, force_keyframe=False):
+        """BGR frame'i encode et; çıktı yoksa None"""
+        video_frame = av.VideoFrame.from_ndarray(frame, format='bgr24')
+        video_frame.pts = self.pts
+        self.pts += 1
+        if force_keyframe:
+            video_frame.pict_type = KEYFRAME_PICT_TYPE
+        
+        packets = self.context.encode(video_frame)
+        if not packets:
+            return None
+        return VideoPacket(
+            b''.join(bytes(packet) for packet in packets),
+            any(packet.is_keyframe for packet in packets)
+        )
+
+class GStreamerH264Encoder:
+    """appsrc ! <h264 encoder> ! h264parse ! appsink pipeline'ı
+    
+    Anahtar frame isteği GstForceKeyUnit event'i ile iletilir; h264parse
+    her IDR'nin önüne SPS/PPS ekler, böylece yeni katılan istemci ilk
+    anahtar frame'den decode'a başlayabilir.
+    """
+    
+    ELEMENTS = {
+        'nvv4l2h264enc': (
+            "videoconvert ! video/x-raw,format=BGRx ! nvvidconv ! video/x-raw(memory:NVMM),format=I420 ! "
+            "nvv4l2h264enc bitrate={bitrate} iframeinterval={gop} insert-sps-pps=true maxperf-enable=true"
+        ),
+        'v4l2h264enc': (
+            "videoconvert ! video/x-raw,format=I420 ! "
+            "v4l2h264enc extra-controls=\"controls,video_bitrate={bitrate},h264_i_frame_period={gop}\""
+        ),
+        'x264enc': (
+            "videoconvert ! video/x-raw,format=I420 ! "
+            "x264enc tune=zerolatency speed-preset=ultrafast bitrate={kbps} key-int-max={gop}"
+        )
+    }
+    HARDWARE_ELEMENTS = ('nvv4l2h264enc', 'v4l2h264enc')
+    PULL_TIMEOUT = 1.0
+    
+    def __init__(self, element, width, height, fps=30, bitrate=4000000, gop=60):
+        self.element = element
+        self.name = f"gstreamer-{element}"
+        self.fps = fps
+        self.frame_index = 0
+        
+        encoder = self.ELEMENTS[element].format(bitrate=bitrate, kbps=bitrate // 1000, gop=gop)
+        self.pipeline = Gst.parse_launch(
+            f"appsrc name=src format=time "
+            f"caps=video/x-raw,format=BGR,width={width},height={height},framerate={fps}/1 "
+            f"! {encoder} ! h264parse config-interval=-1 "
+            f"! video/x-h264,stream-format=byte-stream,alignment=au "
+            f"! appsink name=sink sync=false max-buffers=4"
+        )
+        self.src = self.pipeline.get_by_name('src')
+        self.sink = self.pipeline.get_by_name('sink')
+        if self.pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+            raise RuntimeError(f"GStreamer H.264 pipeline başlatılamadı: {element}")
+    
+    @staticmethod
+    def element_available(element):
+        return GSTREAMER_AVAILABLE and Gst.ElementFactory.find(element) is not None
+    
+    def encode(self, frame, force_keyframe=False):
+        """BGR frame'i pipeline'a it ve bir erişim birimi çek"""
+        if force_keyframe:
+            self.src.send_event(Gst.Event.new_custom(
+                Gst.EventType.CUSTOM_DOWNSTREAM,
+                Gst.Structure.new_from_string("GstForceKeyUnit, all-headers=(boolean)true")
+            ))
+        
+        buffer = Gst.Buffer.new_wrapped(frame.tobytes())
+        buffer.pts = self.frame_index * Gst.SECOND // self.fps
+        buffer.duration = Gst.SECOND // self.fps
+        self.frame_index += 1
+        self.src.emit('push-buffer', buffer)
+        
+        sample = self.sink.emit('try-pull-sample', int(self.PULL_TIMEOUT * Gst.SECOND))
+        if sample is None:
+            return None
+        
+        buffer = sample.get_buffer()
+        ok, info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return None
+        try:
+            return VideoPacket(bytes(info.data), not buffer.has_flags(Gst.BufferFlags.DELTA_UNIT))
+        finally:
+            buffer.unmap(info)
+    
+    def close(self):
+        self.pipeline.set_state(Gst.State.NULL)
+
+def create_h264_encoder(width, height, fps=30, bitrate=4000000, gop=60):
+    """Kullanılabilen en iyi H.264 encoder'ı oluştur; hiçbiri yoksa None
+    
+    Sıra: GStreamer donanım encoder'ı, PyAV (donanım codec'i veya
+    libx264), GStreamer x264enc.
+    """
+    candidates = []
+    for element in GStreamerH264Encoder.HARDWARE_ELEMENTS:
+        if GStreamerH264Encoder.element_available(element):
+            candidates.append(lambda element=element: GStreamerH264Encoder(
+                element, width, height, fps, bitrate, gop))
+    if PYAV_AVAILABLE:
+        candidates.append(lambda: PyAVH264Encoder(width, height, fps, bitrate, gop))
+    if GStreamerH264Encoder.element_available('x264enc'):
+        candidates.append(lambda: GStreamerH264Encoder('x264enc', width, height, fps, bitrate, gop))
+    
+    for create in candidates:
+        try:
+            encoder = create()
+            logger.info(f"H.264 encoder seçildi: {encoder.name} ({width}x{height}@{fps}fps)")
+            return encoder
+        except Exception as e:
+            logger.warning(f"H.264 encoder açılamadı: {e}")
+    
+    logger.error("H.264 encoder bulunamadı (PyAV veya GStreamer gerekli)")
+    return None
+
+class H264Stream:
+    """Yayın sunucularının H.264 encoder'ı ve anahtar frame isteği
+    
+    Encoder durumludur ve tek encode worker'ında kullanılır; anahtar frame
+    isteği yeni istemci bağlandığında broadcaster thread'inden gelir ve
+    bir sonraki encode'da karşılanır.
+    """
+    
+    def __init__(self):
+        self.encoder = None
+        self._keyframe_requested = threading.Event()
+    
+    def open(self, config, width, height, broadcaster):
+        """Encoder'ı aç ve yayını inter-frame moduna al; açılamazsa False"""
+        self.encoder = create_h264_encoder(
+            width, height,
+            fps=config.get('fps', 30),
+            bitrate=config.get('h264_bitrate', 4000000),
+            gop=config.get('gop', 60)
+        )
+        if self.encoder is None:
+            logger.warning("H.264 kullanılamıyor, JPEG moduna dönülüyor")
+            return False
+        
+        # Yeni istemciler anahtar frame'den başlar
+        broadcaster.inter_frame = True
+        return True
+    
+    @property
+    def name(self):
+        return self.encoder.name if self.encoder is not None else None
+    
+    @property
+    def keyframe_requested(self):
+        return self._keyframe_requested.is_set()
+    
+    def request_keyframe(self):
+        """Bir sonraki H.264 frame'inin anahtar frame olmasını iste"""
+        self._keyframe_requested.set()
+    
+    def encode(self, frame):
+        """Encode worker'ında H.264'e çevir (istek varsa anahtar frame)"""
+        force_keyframe = self._keyframe_requested.is_set()
+        if force_keyframe:
+            self._keyframe_requested.clear()
+        return self.encoder.encode(frame, force_keyframe)
+    
+    def close(self):
+        if hasattr(self.encoder, 'close'):
+            self.encoder.close()
+        self.encoder = None
@@ -8,13 +8,35 @@ import threading
 import time
 import logging
 import numpy as np
+from collections import namedtuple
 try:
     import pyzed.sl as sl # type: ignore
     ZED_AVAILABLE = True
 except ImportError:
     ZED_AVAILABLE = False
-    
+
 from config import ZED_CONFIG, SERVER_CONFIG
+from frame_protocol import FrameStamper, build_frame_header
+from stream_broadcaster import StreamBroadcaster
+from frame_pipeline import (LatestFrameSlot, DeadlineScheduler, EncodePipeline, FrameArrayPool,
+                            ChangeDetector, join_threads)
+from jpeg_encoder import select_encoder
+from video_encoder import VideoPacket, H264Stream
+from depth_encoder import depth_to_millimeters, downsample_point_cloud, encode_depth, encode_point_cloud
+
+# ZED çözünürlük modlarının tek göz (sol) frame boyutları
+ZED_FRAME_SIZES = {
+    'VGA': (672, 376),
+    'HD720': (1280, 720),
+    'HD1080': (1920, 1080),
+    'HD2K': (2208, 1242)
+}
+
+# Stereo modları: tek JPEG'e paketlenmiş veya aynı seq'i paylaşan iki frame
+STEREO_MODES = ('side_by_side', 'top_bottom', 'separate')
+
+# 'separate' modunda bir grab'in sol ve sağ encode çıktıları
+StereoPair = namedtuple('StereoPair', ['left', 'right'])
 
 class ZEDServer:
     def __init__(self, host='0.0.0.0', port=8889):
@@ -22,16 +44,106 @@ class ZEDServer:
         self.port = port
         self.server_socket = None
         self.running = False
-        self.clients = []
+        # Grab, streaming ve derinlik thread'leri (stop_server bitmelerini bekler)
+        self.threads = []
+        # H.264 encoder'ı; yeni istemcinin anahtar frame isteğini de taşır
+        self.video_stream = H264Stream()
+        
+        # Kabul ve gönderim tek bir non-blocking I/O thread'inde;
+        # her istemcinin sınırlı bir kuyruğu var
+        self.broadcaster = StreamBroadcaster(
+            max_queue=SERVER_CONFIG.get('client_queue_size', 3),
+            send_timeout=SERVER_CONFIG.get('send_timeout', 5.0),
+            on_keyframe_needed=self.video_stream.request_keyframe,
+            max_clients=SERVER_CONFIG.get('max_clients', 5),
+            send_buffer_limit=SERVER_CONFIG.get('client_send_buffer', 4 * 1024 * 1024),
+            handshake=self.camera_list_message
+        )
         self.zed = None
+        self.encoder = None
         self.logger = logging.getLogger(__name__)
         
         # ZED ayarları
         self.zed_config = ZED_CONFIG
         
+        # Her frame'e seq, capture_ts_ns ve encode_ms ekler
+        self.stamper = FrameStamper(0)
+        
+        # BGR dönüşüm dizileri havuzdan alınır; encode bitince veya frame hiç
+        # okunmadan ezilince havuza döner (sürekli durumda frame başına ayırma yok)
+        self.frame_pool = FrameArrayPool()
+        
+        # grab() kendi thread'inde en yeni frame'i yazar, encode havuzda yapılır
+        self.frame_slot = LatestFrameSlot(on_discard=self.frame_pool.release)
+        
+        # Sahne değişmediyse encode/gönderim atlanır (None = kapalı)
+        self.change_detector = ChangeDetector.from_config(self.zed_config)
+        
+        # Stereo: aynı grab()'in sol ve sağ görüntüsü birlikte gönderilir
+        self.stereo_mode = self.zed_config.get('stereo_mode')
+        if self.stereo_mode not in STEREO_MODES:
+            self.stereo_mode = None
+        
+        # Derinlik / nokta bulutu: grab thread'i ölçümleri yazar, ayrı thread sıkıştırır
+        self.depth_enabled = self.zed_config.get('depth_stream', False)
+        self.point_cloud_enabled = self.zed_config.get('point_cloud_stream', False)
+        self.depth_slot = LatestFrameSlot()
+        self.depth_seq = 0
+        
+        # H.264 modunda encoder durumludur, frame'ler tek worker'da sırayla encode edilir
+        self.codec = self.zed_config.get('codec', 'jpeg')
+        self.encode_pipeline = EncodePipeline(
+            self._encode_frame,
+            self._publish_frame,
+            workers=1 if self.codec == 'h264' else self.zed_config.get('encode_workers', 2),
+            release_fn=self.frame_pool.release
+        )
+        
         if not ZED_AVAILABLE:
             self.logger.error("ZED SDK bulunamadı!")
     
+    def _frame_size(self):
+        """Gönderilen görüntünün boyutu (stereo paketlemede iki göz birlikte)"""
+        width, height = ZED_FRAME_SIZES.get(
+            self.zed_config.get('resolution', 'HD720'), ZED_FRAME_SIZES['HD720']
+        )
+        if self.stereo_mode == 'side_by_side':
+            width *= 2
+        elif self.stereo_mode == 'top_bottom':
+            height *= 2
+        return width, height
+    
+    def camera_list_message(self):
+        """Handshake mesajı: CameraClient'ın beklediği kamera listesi ve yayın bilgileri
+        
+        Stereo 'separate' modunda sağ görüntü camera_id 1 olarak ilan edilir.
+        Derinlik ve nokta bulutu camera_id 0 ile kendi mesaj tiplerinde gelir.
+        """
+        width, height = self._frame_size()
+        if self.codec == 'h264' and self.video_stream.encoder is not None:
+            encoder = self.video_stream.name
+        else:
+            encoder = self.encoder.name if self.encoder else None
+        return {
+            'type': 'camera_list',
+            'cameras': [0, 1] if self.stereo_mode == 'separate' else [0],
+            'server_info': {
+                'fps': self.zed_config.get('fps', 30),
+                'resolution': f"{width}x{height}",
+                'quality': self.zed_config.get('quality', 80),
+                'push_supported': True,
+                'pull_supported': False,
+                'change_detection': self.change_detector is not None,
+                'udp_supported': False,
+                'multicast': None,
+                'codec': self.codec,
+                'encoder': encoder,
+                'stereo': self.stereo_mode,
+                'depth': self.depth_enabled,
+                'point_cloud': self.point_cloud_enabled
+            }
+        }
+    
     def start_server(self):
         """ZED sunucusunu başlat"""
         if not ZED_AVAILABLE:
@@ -42,6 +154,22 @@ class ZEDServer:
             # ZED kamerayı başlat
             self._init_zed_camera()
             
+            if self.codec == 'h264' and self.stereo_mode == 'separate':
+                # Tek H.264 akışı iki ayrı görüntü taşıyamaz; yan yana paketlenir
+                self.logger.warning("H.264 modunda stereo 'separate' desteklenmiyor, 'side_by_side' kullanılıyor")
+                self.stereo_mode = 'side_by_side'
+            
+            # ZED çözünürlüğünde en hızlı JPEG encoder'ı seç
+            width, height = self._frame_size()
+            self.encoder = select_encoder(
+                self.zed_config.get('encoder', 'auto'), width, height,
+                self.zed_config.get('quality', 80)
+            )
+            
+            if self.codec == 'h264' and not self.video_stream.open(
+                    self.zed_config, width, height, self.broadcaster):
+                self.codec = 'jpeg'
+            
             # Socket sunucusunu başlat
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -51,18 +179,30 @@ class ZEDServer:
             self.running = True
             self.logger.info(f"ZED sunucusu başlatıldı: {self.host}:{self.port}")
             
-            # İstemci kabul thread'i
-            accept_thread = threading.Thread(target=self._accept_clients)
-            accept_thread.daemon = True
-            accept_thread.start()
+            # İstemci kabul ve gönderim döngüsü
+            self.broadcaster.start(self.server_socket)
+            
+            # ZED grab thread'i
+            capture_thread = threading.Thread(target=self._capture_zed_frames)
+            capture_thread.daemon = True
+            capture_thread.start()
+            self.threads.append(capture_thread)
             
             # Video streaming thread'i
             stream_thread = threading.Thread(target=self._stream_zed_video)
             stream_thread.daemon = True
             stream_thread.start()
+            self.threads.append(stream_thread)
             
-            return True
+            # Derinlik streaming thread'i
+            if self.depth_enabled or self.point_cloud_enabled:
+                depth_thread = threading.Thread(target=self._stream_depth)
+                depth_thread.daemon = True
+                depth_thread.start()
+                self.threads.append(depth_thread)
             
+            return True
+        
         except Exception as e:
             self.logger.error(f"ZED sunucusu başlatma hatası: {e}")
             return False
@@ -101,84 +241,233 @@ class ZEDServer:
                 sl.DEPTH_MODE.PERFORMANCE
             )
             
+            # Derinlik milimetre olarak alınır (uint16 mm kodlaması için)
+            init_params.coordinate_units = sl.UNIT.MILLIMETER
+            
             # Kamerayı aç
             err = self.zed.open(init_params)
             if err != sl.ERROR_CODE.SUCCESS:
                 raise Exception(f"ZED kamera açılamadı: {err}")
             
             self.logger.info("ZED kamera başlatıldı")
-            
+        
         except Exception as e:
             self.logger.error(f"ZED kamera başlatma hatası: {e}")
             raise
     
-    def _accept_clients(self):
-        """İstemci bağlantılarını kabul et"""
+    def _capture_zed_frames(self):
+        """ZED'den sürekli grab et, en yeni frame'i yuvaya yaz"""
+        if not self.zed:
+            return
+        
+        # ZED image buffer'ları
+        left_image = sl.Mat()
+        right_image = sl.Mat()
+        depth_map = sl.Mat()
+        point_cloud = sl.Mat()
+        runtime_params = sl.RuntimeParameters()
+        
+        depth_period = 1.0 / max(1, self.zed_config.get('depth_fps', 10))
+        next_depth = time.monotonic()
+        
+        while self.running:
+            try:
+                # ZED'den frame al (kamera fps'inde bloklar)
+                if self.zed.grab(runtime_params) != sl.ERROR_CODE.SUCCESS:
+                    time.sleep(0.005)
+                    continue
+                
+                # Görüntünün sensörde yakalandığı an (ns)
+                capture_ts_ns = self.zed.get_timestamp(sl.TIME_REFERENCE.IMAGE).get_nanoseconds()
+                
+                # Sol (stereo modunda sol ve sağ) görüntüyü al
+                frame = self._retrieve_frame(left_image, right_image)
+                
+                self.frame_slot.put(frame, capture_ts_ns)
+                
+                # Derinlik daha düşük hızda ve yalnızca izleyen varken alınır
+                now = time.monotonic()
+                if (self.depth_enabled or self.point_cloud_enabled) and now >= next_depth:
+                    next_depth = now + depth_period
+                    if self.broadcaster.client_count() > 0:
+                        self._capture_depth(depth_map, point_cloud, capture_ts_ns)
+            
+            except Exception as e:
+                self.logger.error(f"ZED yakalama hatası: {e}")
+                time.sleep(0.1)
+    
+    def _retrieve_frame(self, left_image, right_image):
+        """Bu grab'in görüntüsünü BGR olarak döndür
+        
+        sl.Mat'ler her grab'de yeniden kullanılır ve bir sonraki grab'de
+        ezilir; bu yüzden görüntü havuzdan alınan diziye dst= ile dönüştürülür.
+        'separate' modunda (sol, sağ) tuple'ı döner.
+        """
+        if self.stereo_mode == 'side_by_side':
+            # SDK iki görüntüyü tek Mat'te yan yana verir
+            self.zed.retrieve_image(left_image, sl.VIEW.SIDE_BY_SIDE)
+            return self._to_bgr(left_image.get_data())
+        
+        self.zed.retrieve_image(left_image, sl.VIEW.LEFT)
+        if self.stereo_mode is None:
+            return self._to_bgr(left_image.get_data())
+        
+        self.zed.retrieve_image(right_image, sl.VIEW.RIGHT)
+        left = left_image.get_data()
+        right = right_image.get_data()
+        if self.stereo_mode == 'top_bottom':
+            # İki görüntü tek dizinin üst ve alt yarısına doğrudan yazılır
+            height, width = left.shape[:2]
+            frame = self.frame_pool.acquire((height * 2, width, 3))
+            cv2.cvtColor(left, cv2.COLOR_RGBA2BGR, dst=frame[:height])
+            cv2.cvtColor(right, cv2.COLOR_RGBA2BGR, dst=frame[height:])
+            return frame
+        return self._to_bgr(left), self._to_bgr(right)
+    
+    def _to_bgr(self, image):
+        """RGBA görüntüyü havuzdan alınan BGR diziye dönüştür"""
+        frame = self.frame_pool.acquire((image.shape[0], image.shape[1], 3))
+        cv2.cvtColor(image, cv2.COLOR_RGBA2BGR, dst=frame)
+        return frame
+    
+    def _capture_depth(self, depth_map, point_cloud, capture_ts_ns):
+        """Aynı grab'in derinlik ölçümlerini kompakt dizilere çevirip yuvaya yaz"""
+        depth_mm = None
+        points = None
+        
+        # Dönüşümler yeni dizi üretir; sl.Mat bir sonraki grab'de ezilebilir
+        if self.depth_enabled:
+            self.zed.retrieve_measure(depth_map, sl.MEASURE.DEPTH)
+            depth_mm = depth_to_millimeters(depth_map.get_data())
+        
+        if self.point_cloud_enabled:
+            self.zed.retrieve_measure(point_cloud, sl.MEASURE.XYZ)
+            points = downsample_point_cloud(
+                point_cloud.get_data(), self.zed_config.get('point_cloud_step', 8)
+            )
+        
+        self.depth_slot.put((depth_mm, points), capture_ts_ns)
+    
+    def _stream_depth(self):
+        """Derinlik ve nokta bulutunu sıkıştırıp kendi mesaj tipleriyle gönder"""
+        last_seq = 0
+        level = self.zed_config.get('depth_compression', 1)
+        
         while self.running:
             try:
-                client_socket, client_address = self.server_socket.accept()
-                self.clients.append(client_socket)
-                self.logger.info(f"ZED istemcisi bağlandı: {client_address}")
+                seq, measures, capture_ts_ns = self.depth_slot.get_newer(last_seq, timeout=0.5)
+                if measures is None:
+                    continue
+                last_seq = seq
+                self.depth_seq += 1
+                depth_mm, points = measures
+                
+                if depth_mm is not None:
+                    encoding, payload = encode_depth(
+                        depth_mm, self.zed_config.get('depth_encoding', 'png'), level
+                    )
+                    if payload is not None:
+                        self._publish_measure('depth', capture_ts_ns, encoding, payload, {
+                            'width': depth_mm.shape[1],
+                            'height': depth_mm.shape[0],
+                            'dtype': 'uint16',
+                            'units': 'mm'
+                        })
                 
+                if points is not None:
+                    encoding, payload = encode_point_cloud(points, level)
+                    self._publish_measure('point_cloud', capture_ts_ns, encoding, payload, {
+                        'shape': list(points.shape),
+                        'dtype': 'float16',
+                        'units': 'm',
+                        'step': self.zed_config.get('point_cloud_step', 8)
+                    })
+            
             except Exception as e:
-                if self.running:
-                    self.logger.error(f"ZED istemci kabul hatası: {e}")
+                self.logger.error(f"Derinlik streaming hatası: {e}")
+                time.sleep(0.1)
     
-    def _stream_zed_video(self):
-        """ZED video akışını gönder"""
-        if not self.zed:
+    def _publish_measure(self, message_type, capture_ts_ns, encoding, payload, fields):
+        """depth / point_cloud mesajını frame ile aynı çerçeveleme ile dağıt"""
+        header = {
+            'type': message_type,
+            'camera_id': 0,
+            'seq': self.depth_seq,
+            'capture_ts_ns': capture_ts_ns,
+            'encoding': encoding
+        }
+        header.update(fields)
+        self.broadcaster.broadcast(build_frame_header(header, len(payload)), payload)
+    
+    def _encode_frame(self, frame):
+        """Encode worker'ında JPEG'e (veya H.264 modunda H.264'e) çevir"""
+        if self.codec == 'h264':
+            return self.video_stream.encode(frame)
+        
+        quality = self.zed_config.get('quality', 80)
+        if isinstance(frame, tuple):
+            # Sol ve sağ aynı işte encode edilir; çift ya birlikte gider ya hiç
+            left = self.encoder.encode(frame[0], quality)
+            right = self.encoder.encode(frame[1], quality)
+            return StereoPair(left, right) if left and right else None
+        return self.encoder.encode(frame, quality)
+    
+    def _publish_frame(self, capture_ts_ns, frame_data, encode_ms):
+        """Encode sırasıyla header ekle ve istemcilere dağıt"""
+        stereo = {'stereo': self.stereo_mode} if self.stereo_mode else {}
+        
+        if isinstance(frame_data, VideoPacket):
+            header = self.stamper.stamp(capture_ts_ns, encode_ms, codec='h264',
+                                        keyframe=frame_data.keyframe, **stereo)
+            header_data = build_frame_header(header, len(frame_data.data))
+            self.broadcaster.broadcast(header_data, frame_data.data, keyframe=frame_data.keyframe)
             return
         
-        # ZED image buffer'ları
-        left_image = sl.Mat()
-        runtime_params = sl.RuntimeParameters()
+        if isinstance(frame_data, StereoPair):
+            # Sağ görüntü camera_id 1 olarak, sol ile aynı seq'te gönderilir;
+            # iki frame tek paket olarak kuyruğa girer ve birlikte atılır
+            left_header = self.stamper.stamp(capture_ts_ns, encode_ms, view='left', **stereo)
+            right_header = self.stamper.stamp(capture_ts_ns, encode_ms, seq=left_header['seq'],
+                                              tx_seq=left_header['tx_seq'], view='right', **stereo)
+            right_header['camera_id'] = 1
+            self.broadcaster.broadcast(
+                build_frame_header(left_header, len(frame_data.left)), frame_data.left,
+                build_frame_header(right_header, len(frame_data.right)), frame_data.right
+            )
+            return
+        
+        # Header: seq, yakalama zamanı ve encode süresi
+        header = self.stamper.stamp(capture_ts_ns, encode_ms, **stereo)
+        header_data = build_frame_header(header, len(frame_data))
+        
+        # Paylaşılan buffer'ı tüm istemci kuyruklarına ekle (bloklamaz)
+        self.broadcaster.broadcast(header_data, frame_data)
+    
+    def _stream_zed_video(self):
+        """Monoton zamanlayıcı ile en yeni frame'i encode havuzuna ver"""
+        scheduler = DeadlineScheduler(self.zed_config.get('fps', 30))
+        last_seq = 0
         
         while self.running:
             try:
-                # ZED'den frame al
-                if self.zed.grab(runtime_params) == sl.ERROR_CODE.SUCCESS:
-                    # Sol kamera görüntüsünü al
-                    self.zed.retrieve_image(left_image, sl.VIEW.LEFT)
-                    
-                    # OpenCV formatına çevir
-                    frame = left_image.get_data()
-                    frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-                    
-                    # Frame'i encode et
-                    _, buffer = cv2.imencode('.jpg', frame, 
-                                           [cv2.IMWRITE_JPEG_QUALITY, 
-                                            self.zed_config.get('quality', 80)])
-                    
-                    frame_data = buffer.tobytes()
-                    frame_size = len(frame_data)
-                    
-                    # Bağlı tüm istemcilere gönder
-                    disconnected_clients = []
-                    
-                    for client in self.clients[:]:
-                        try:
-                            # Frame boyutunu gönder
-                            client.send(frame_size.to_bytes(4, 'big'))
-                            
-                            # Frame verisini gönder
-                            client.sendall(frame_data)
-                            
-                        except Exception as e:
-                            disconnected_clients.append(client)
-                            self.logger.warning(f"ZED istemci bağlantısı kesildi: {e}")
-                    
-                    # Bağlantısı kesilen istemcileri temizle
-                    for client in disconnected_clients:
-                        if client in self.clients:
-                            self.clients.remove(client)
-                            try:
-                                client.close()
-                            except:
-                                pass
+                # FPS kontrolü - sabit sleep yerine bir sonraki tick'e kadar bekle
+                scheduler.wait()
+                
+                seq, frame, capture_ts_ns = self.frame_slot.get_newer(last_seq, timeout=0.5)
+                if frame is None:
+                    continue
+                last_seq = seq
                 
-                # FPS kontrolü
-                time.sleep(1.0 / self.zed_config.get('fps', 30))
+                # Durağan sahnede frame atlanır ve havuza döner; stereo
+                # 'separate' modunda sol görüntü karşılaştırılır
+                if self.change_detector is not None and not self.change_detector.should_send(
+                        frame[0] if isinstance(frame, tuple) else frame,
+                        force=self.video_stream.keyframe_requested):
+                    self.frame_pool.release(frame)
+                    continue
                 
+                self.encode_pipeline.submit(frame, capture_ts_ns)
+            
             except Exception as e:
                 self.logger.error(f"ZED video streaming hatası: {e}")
                 time.sleep(0.1)
@@ -187,12 +476,16 @@ class ZEDServer:
         """ZED sunucusunu durdur"""
         self.running = False
         
-        # İstemci bağlantılarını kapat
-        for client in self.clients:
-            try:
-                client.close()
-            except:
-                pass
+        # Havuza iş gönderen thread'ler bitmeden havuz kapatılmaz
+        join_threads(self.threads)
+        self.threads = []
+        
+        # Encode havuzunu (süren encode'lar bitince) ve istemci bağlantılarını kapat
+        self.encode_pipeline.shutdown(wait=True)
+        self.broadcaster.close_all()
+        self.video_stream.close()
+        if self.encoder is not None:
+            self.encoder.close()
         
         # ZED kamerayı kapat
         if self.zed:
@@ -218,7 +511,7 @@ if __name__ == "__main__":
                 time.sleep(1)
         else:
             print("ZED sunucusu başlatılamadı!")
-            
+    
     except KeyboardInterrupt:
         print("ZED sunucusu durduruluyor...")
     finally:
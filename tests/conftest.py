@@ -0,0 +1,17 @@
+# Test ayarları
+# tests/conftest.py - server modülleri düz import kullanır, yolu ekle
+# =============================================================================
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+# pytest, tests paketindeki modülleri import ederken kök dizini yeniden
+# sys.path'in başına koyar; kökteki config/ paketi server/config.py'yi
+# gölgelemesin diye server ayarları burada önceden yüklenir
+import config  # noqa: E402,F401
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
@@ -0,0 +1,99 @@
+# AsyncCameraClient testleri
+# tests/test_async_camera_client.py
+# =============================================================================
+
+import logging
+import socket
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt
+
+from core.async_camera_client import AsyncCameraClient
+from frame_protocol import FrameStamper, build_frame_header
+from stream_broadcaster import StreamBroadcaster
+
+HANDSHAKE = {
+    'type': 'camera_list',
+    'cameras': [0],
+    'server_info': {'fps': 30, 'resolution': '32x24', 'quality': 80,
+                    'push_supported': True, 'pull_supported': False}
+}
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_disconnect_is_not_logged_as_connection_loss(caplog):
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+    broadcaster = StreamBroadcaster(handshake=lambda: HANDSHAKE)
+    broadcaster.start(listener)
+    stamper = FrameStamper(0)
+    _, jpeg = cv2.imencode('.jpg', np.zeros((24, 32, 3), dtype=np.uint8))
+    
+    client = AsyncCameraClient()
+    try:
+        client.connect('127.0.0.1', listener.getsockname()[1])
+        assert wait_until(lambda: broadcaster.client_count() == 1)
+        
+        def frame_arrived():
+            header = stamper.stamp(time.time_ns(), 0.0)
+            broadcaster.broadcast(build_frame_header(header, len(jpeg)), jpeg.tobytes())
+            return client.get_latest_frame(0)[1] is not None
+        assert wait_until(frame_arrived)
+        
+        with caplog.at_level(logging.ERROR, logger='core.async_camera_client'):
+            client.disconnect()
+            assert wait_until(lambda: client._writer is None and not client.connected)
+        assert not [record for record in caplog.records if 'bağlantı koptu' in record.getMessage()]
+    finally:
+        broadcaster.close_all()
+        listener.close()
+
+def test_client_decodes_h264_broadcast(monkeypatch):
+    pytest.importorskip('av')
+    from tests.test_camera_server import HEIGHT, WIDTH, start_camera_server
+    server = start_camera_server(monkeypatch, codec='h264')
+    client = AsyncCameraClient()
+    try:
+        client.connect('127.0.0.1', server.port)
+        assert wait_until(lambda: client.get_latest_frame(0)[1] is not None)
+        assert client.server_info['codec'] == 'h264'
+        assert client.get_latest_frame(0)[1].shape[:2] == (HEIGHT, WIDTH)
+    finally:
+        client.disconnect()
+        assert wait_until(lambda: client._writer is None)
+        server.stop_server()
+
+def test_h264_server_is_rejected_without_pyav(monkeypatch):
+    import core.async_camera_client as async_camera_client
+    monkeypatch.setattr(async_camera_client, 'PYAV_AVAILABLE', False)
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+    handshake = dict(HANDSHAKE, server_info=dict(HANDSHAKE['server_info'], codec='h264'))
+    broadcaster = StreamBroadcaster(handshake=lambda: handshake)
+    broadcaster.start(listener)
+    
+    client = AsyncCameraClient()
+    statuses = []
+    client.connection_status.connect(lambda connected, message: statuses.append(message),
+                                     Qt.DirectConnection)
+    try:
+        client.connect('127.0.0.1', listener.getsockname()[1])
+        assert wait_until(lambda: any('PyAV' in message for message in statuses))
+        assert wait_until(lambda: not client.connected and client._writer is None)
+    finally:
+        broadcaster.close_all()
+        listener.close()
@@ -0,0 +1,42 @@
+# CameraClient testleri
+# tests/test_camera_client.py
+# =============================================================================
+
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('cv2')
+
+from core.camera_client import CameraClient
+
+def test_adaptive_client_construction():
+    client = CameraClient(adaptive=True, decode_workers=2)
+    assert client.decode_workers == 2
+    assert client.stream_controller is not None
+
+def test_default_client_construction():
+    client = CameraClient()
+    assert client.stream_controller is None
+    assert client.decode_workers == 3
+
+def test_capture_seq_gaps_are_not_loss():
+    from core.camera_client import create_camera_stats, record_arrival_stats
+    stats = create_camera_stats()
+    for seq, tx_seq in ((3, 1), (7, 2), (12, 3)):
+        record_arrival_stats(stats, {'seq': seq, 'tx_seq': tx_seq}, 0)
+    assert stats['frames_lost'] == 0
+    assert stats['loss_rate'] == 0.0
+    assert stats['last_seq'] == 12
+
+def test_transmit_seq_gap_is_loss_and_resets():
+    from core.camera_client import (create_camera_stats, record_arrival_stats,
+                                    reset_sequence_stats)
+    stats = create_camera_stats()
+    for tx_seq in (5, 6, 9, 10):
+        record_arrival_stats(stats, {'seq': tx_seq, 'tx_seq': tx_seq}, 0)
+    assert stats['frames_lost'] == 2
+    assert stats['loss_rate'] == 2 / 6
+    
+    reset_sequence_stats(stats)
+    record_arrival_stats(stats, {'seq': 1, 'tx_seq': 1}, 0)
+    assert (stats['last_seq'], stats['frames_lost'], stats['loss_rate']) == (1, 0, 0.0)
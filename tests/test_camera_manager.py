@@ -0,0 +1,231 @@
+# CameraManager testleri
+# tests/test_camera_manager.py
+# =============================================================================
+
+import json
+import socket
+import struct
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from camera_manager import ManagedCamera, parse_roi
+
+CONFIG = {'width': 64, 'height': 48, 'fps': 30, 'quality': 80, 'profiles': {}}
+
+def make_frame():
+    return np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize('request_json', [
+    '{"roi": [NaN, 0, 0.5, 0.5]}',
+    '{"roi": [0, 0, Infinity, 0.5]}',
+    '{"roi": [0, 0, 0.5, 0.5], "output_size": [NaN, 10]}',
+    '{"output_size": [Infinity, 10]}'
+])
+def test_parse_roi_rejects_non_finite(request_json):
+    with pytest.raises(ValueError):
+        parse_roi(json.loads(request_json))
+
+def test_parse_roi_full_frame_is_plain_profile():
+    assert parse_roi({}) == (None, None)
+    assert parse_roi({'roi': [0.25, 0.25, 0.5, 0.5], 'output_size': [32, 24]}) == \
+        ((0.25, 0.25, 0.5, 0.5), (32, 24))
+
+def test_failing_key_does_not_block_other_profiles():
+    camera = ManagedCamera(0, 0, CONFIG)
+    bad_key = (ManagedCamera.DEFAULT_PROFILE, (float('nan'), 0.0, 0.5, 0.5), None, None)
+    camera.acquire_profile(bad_key)
+    camera.acquire_profile(ManagedCamera.DEFAULT_PROFILE)
+    
+    camera._encode_and_cache(make_frame(), 0)
+    
+    assert ManagedCamera.DEFAULT_PROFILE in camera.encoded
+    assert bad_key not in camera.encoded
+    assert camera.raw_frame is not None
+
+class FakeCapture:
+    """cv2.VideoCapture yerine: her read() yeni bir frame üretir"""
+    
+    frame_interval = 0.2
+    
+    def __init__(self, device):
+        self.opened = True
+    
+    def isOpened(self):
+        return self.opened
+    
+    def set(self, prop, value):
+        return True
+    
+    def get(self, prop):
+        return 0
+    
+    def read(self):
+        time.sleep(self.frame_interval)
+        return True, make_frame()
+    
+    def release(self):
+        self.opened = False
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def manager(monkeypatch):
+    import camera_manager
+    monkeypatch.setattr(camera_manager.cv2, 'VideoCapture', FakeCapture)
+    server = camera_manager.CameraManager(host='127.0.0.1', port=free_port(), devices=[0])
+    assert server.start_server()
+    yield server
+    server.stop_server()
+
+class ProtocolClient:
+    """CameraManager protokolünü doğrudan konuşan küçük test istemcisi"""
+    
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=5.0)
+        self.handshake = self.receive()[0]
+    
+    def _recv_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            assert chunk, "bağlantı kapandı"
+            data += chunk
+        return data
+    
+    def request(self, message):
+        data = json.dumps(message).encode('utf-8')
+        self.sock.sendall(struct.pack("!I", len(data)) + data)
+    
+    def receive(self):
+        size = struct.unpack("!I", self._recv_exact(4))[0]
+        header = json.loads(self._recv_exact(size))
+        payload = None
+        if header['type'] == 'frame':
+            payload = self._recv_exact(struct.unpack("!I", self._recv_exact(4))[0])
+        return header, payload
+    
+    def get_frame(self, camera_id=0, **fields):
+        self.request(dict({'type': 'get_frame', 'camera_id': camera_id}, **fields))
+        return self.receive()
+    
+    def wait_frame(self, camera_id=0, timeout=3.0, **fields):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            header, payload = self.get_frame(camera_id, **fields)
+            if header['type'] == 'frame':
+                return header, payload
+            time.sleep(0.02)
+        raise AssertionError("frame gelmedi")
+    
+    def close(self):
+        self.sock.close()
+
+def test_get_frame_does_not_resend_same_seq(manager):
+    client = ProtocolClient(manager.port)
+    try:
+        header, _ = client.wait_frame()
+        repeat, _ = client.get_frame()
+        assert repeat['type'] == 'no_frame'
+        
+        newer, _ = client.wait_frame()
+        assert newer['seq'] > header['seq']
+    finally:
+        client.close()
+
+def test_session_settings_do_not_change_shared_camera(manager):
+    tuned = ProtocolClient(manager.port)
+    other = ProtocolClient(manager.port)
+    try:
+        tuned.request({'type': 'set_quality', 'camera_id': 0, 'quality': 10})
+        tuned.request({'type': 'set_resolution', 'camera_id': 0, 'width': 32, 'height': 24})
+        _, tuned_payload = tuned.wait_frame()
+        _, other_payload = other.wait_frame()
+        
+        tuned_image = cv2.imdecode(np.frombuffer(tuned_payload, np.uint8), cv2.IMREAD_COLOR)
+        other_image = cv2.imdecode(np.frombuffer(other_payload, np.uint8), cv2.IMREAD_COLOR)
+        assert tuned_image.shape[:2] == (24, 32)
+        assert other_image.shape[:2] == (48, 64)
+        
+        camera = manager.cameras[0]
+        config = manager.config
+        assert (camera.width, camera.height, camera.quality) == \
+            (config['width'], config['height'], config['quality'])
+        assert ManagedCamera.DEFAULT_PROFILE in camera.profile_users
+        assert len(camera.profile_users) == 2
+    finally:
+        tuned.close()
+        other.close()
+
+def test_stream_key_quality_shares_profile_encode():
+    camera = ManagedCamera(0, 0, CONFIG)
+    assert camera.stream_key(ManagedCamera.DEFAULT_PROFILE, quality=80) == ManagedCamera.DEFAULT_PROFILE
+    assert camera.stream_key(ManagedCamera.DEFAULT_PROFILE, quality=30) == \
+        (ManagedCamera.DEFAULT_PROFILE, None, None, 30)
+
+def test_subscribe_quality_uses_own_encode_key(manager):
+    client = ProtocolClient(manager.port)
+    try:
+        client.request({'type': 'subscribe', 'camera_ids': [0], 'fps': 10, 'quality': 15})
+        header, payload = client.receive()
+        assert header['type'] == 'frame'
+        
+        camera = manager.cameras[0]
+        assert list(camera.profile_users) == [(ManagedCamera.DEFAULT_PROFILE, None, None, 15)]
+        assert cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR) is not None
+    finally:
+        client.close()
+
+def test_pull_tx_seq_counts_only_sent_frames(manager):
+    client = ProtocolClient(manager.port)
+    try:
+        headers = []
+        for _ in range(3):
+            headers.append(client.wait_frame()[0])
+            # Yavaş istemci: arada yakalanan frame'ler hiç gönderilmez
+            time.sleep(0.5)
+        assert [header['tx_seq'] for header in headers] == [1, 2, 3]
+        assert headers[-1]['seq'] - headers[0]['seq'] > 2
+    finally:
+        client.close()
+
+class FlakyUdpSender:
+    """İlk gönderimi başarısız olan, sonrakileri kaydeden UDP gönderici"""
+    
+    def __init__(self):
+        self.headers = []
+    
+    def send(self, address, header_data, frame_data):
+        if not self.headers:
+            self.headers.append(None)
+            raise OSError("Network is unreachable")
+        size = struct.unpack_from("!I", header_data)[0]
+        self.headers.append(json.loads(header_data[4:4 + size]))
+    
+    def close(self):
+        pass
+
+def test_udp_send_error_drops_frame_not_session(manager):
+    sender = FlakyUdpSender()
+    manager.udp_sender.close()
+    manager.udp_sender = sender
+    client = ProtocolClient(manager.port)
+    try:
+        client.request({'type': 'subscribe', 'camera_ids': [0], 'fps': 30,
+                        'transport': 'udp', 'udp_port': 9})
+        deadline = time.monotonic() + 3.0
+        while len(sender.headers) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        
+        # Atılan frame tx_seq 1'i tüketir; istemci bunu kayıp sayar
+        assert [header['tx_seq'] for header in sender.headers[1:3]] == [2, 3]
+        header, _ = client.wait_frame()
+        assert header['type'] == 'frame'
+    finally:
+        client.close()
@@ -0,0 +1,111 @@
+# CameraServer testleri
+# tests/test_camera_server.py
+# =============================================================================
+
+import logging
+import socket
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('PyQt5')
+
+WIDTH, HEIGHT = 64, 48
+
+class FakeCapture:
+    """cv2.VideoCapture yerine: sabit boyutta, yavaşça değişen frame'ler"""
+    
+    def __init__(self, *args):
+        self.opened = True
+        self.count = 0
+    
+    def isOpened(self):
+        return self.opened
+    
+    def set(self, prop, value):
+        return True
+    
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return WIDTH
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return HEIGHT
+        return 0
+    
+    def read(self):
+        time.sleep(1.0 / 30)
+        self.count += 1
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        frame[:, :, 1] = self.count % 256
+        return True, frame
+    
+    def release(self):
+        self.opened = False
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_camera_server(monkeypatch, **config):
+    import camera_server
+    monkeypatch.setattr(camera_server.cv2, 'VideoCapture', FakeCapture)
+    monkeypatch.setattr(camera_server, 'CAMERA_CONFIG', dict(
+        camera_server.CAMERA_CONFIG, width=WIDTH, height=HEIGHT, **config
+    ))
+    server = camera_server.CameraServer(host='127.0.0.1', port=free_port())
+    assert server.start_server()
+    return server
+
+def wait_latest_frame(client, camera_id=0, timeout=5.0):
+    # Sinyaller event loop olmadan işlenmez; mailbox doğrudan okunur
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        seq, frame = client.get_latest_frame(camera_id)
+        if frame is not None:
+            return seq, frame
+        time.sleep(0.02)
+    raise AssertionError("frame gelmedi")
+
+def test_client_receives_jpeg_broadcast(monkeypatch):
+    from core.camera_client import CameraClient
+    server = start_camera_server(monkeypatch)
+    client = CameraClient(stream_mode='pull')
+    try:
+        assert client.connect('127.0.0.1', server.port)
+        assert client.server_info['pull_supported'] is False
+        assert client.push_active
+        
+        seq, frame = wait_latest_frame(client)
+        assert frame.shape[:2] == (HEIGHT, WIDTH)
+    finally:
+        client.disconnect()
+        server.stop_server()
+
+def test_client_decodes_h264_broadcast(monkeypatch):
+    pytest.importorskip('av')
+    from core.camera_client import CameraClient
+    server = start_camera_server(monkeypatch, codec='h264')
+    assert server.codec == 'h264'
+    client = CameraClient()
+    try:
+        assert client.connect('127.0.0.1', server.port)
+        assert client.server_info['codec'] == 'h264'
+        
+        seq, frame = wait_latest_frame(client)
+        assert frame.shape[:2] == (HEIGHT, WIDTH)
+    finally:
+        client.disconnect()
+        server.stop_server()
+
+def test_stop_server_waits_for_stream_threads(monkeypatch, caplog):
+    for _ in range(3):
+        server = start_camera_server(monkeypatch)
+        time.sleep(0.2)
+        threads = list(server.threads)
+        with caplog.at_level(logging.ERROR, logger='camera_server'):
+            server.stop_server()
+        assert threads and not any(thread.is_alive() for thread in threads)
+    assert not [record for record in caplog.records if 'streaming hatası' in record.getMessage()]
@@ -0,0 +1,89 @@
+# ConnectionManager testleri
+# tests/test_connection_manager.py
+# =============================================================================
+
+import json
+import socket
+import struct
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('PyQt5')
+
+from core.connection_manager import ConnectionManager
+from frame_protocol import FrameStamper, build_frame_header, build_message
+
+HANDSHAKE = {
+    'type': 'camera_list',
+    'cameras': [0],
+    'server_info': {'fps': 30, 'resolution': '32x24', 'quality': 80,
+                    'push_supported': True, 'pull_supported': False}
+}
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def read_request(sock):
+    size = struct.unpack("!I", sock.recv(4, socket.MSG_WAITALL))[0]
+    return json.loads(sock.recv(size, socket.MSG_WAITALL).decode('utf-8'))
+
+@pytest.fixture
+def listener():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    listener.settimeout(5.0)
+    yield listener
+    listener.close()
+
+def test_push_only_server_is_subscribed_not_polled(listener):
+    pool = ConnectionManager()
+    pool.start()
+    try:
+        server_key = pool.add_server('127.0.0.1', listener.getsockname()[1])
+        server, _ = listener.accept()
+        server.settimeout(5.0)
+        server.sendall(build_message(HANDSHAKE))
+        
+        request = read_request(server)
+        assert request['type'] == 'subscribe'
+        assert request['camera_ids'] == [0]
+        
+        # tx_seq 2 hiç gönderilmez: havuz bunu kayıp saymalı
+        stamper = FrameStamper(0)
+        _, jpeg = cv2.imencode('.jpg', np.zeros((24, 32, 3), dtype=np.uint8))
+        for tx_seq in (1, 3):
+            header = stamper.stamp(time.time_ns(), 0.0)
+            header['tx_seq'] = tx_seq
+            server.sendall(build_frame_header(header, len(jpeg)) + jpeg.tobytes())
+        
+        assert wait_until(lambda: pool.get_latest_frame(server_key, 0)[1] is not None)
+        stats = pool.connections[server_key].camera_stats[0]
+        assert wait_until(lambda: stats['frames_lost'] == 1)
+        
+        # Abonelikten sonra get_frame gönderilmemeli
+        server.settimeout(0.3)
+        with pytest.raises(socket.timeout):
+            server.recv(4)
+        server.close()
+    finally:
+        pool.stop()
+
+def test_stop_closes_selector_and_wakeup_sockets():
+    pool = ConnectionManager()
+    pool.start()
+    pool.add_server('127.0.0.1', 1)
+    pool.stop()
+    
+    assert not pool.io_thread.is_alive()
+    assert pool._wakeup_r.fileno() == -1 and pool._wakeup_w.fileno() == -1
+    with pytest.raises(RuntimeError):
+        pool.selector.get_key(pool._wakeup_r)
@@ -0,0 +1,73 @@
+# JPEG encoder testleri
+# tests/test_jpeg_encoder.py - GStreamer pipeline havuzu (sahte Gst ile)
+# =============================================================================
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import jpeg_encoder
+from jpeg_encoder import GStreamerJpegEncoder
+
+class FakePipeline:
+    def __init__(self, size):
+        self.size = size
+        self.state = 'PLAYING'
+    
+    def set_state(self, state):
+        self.state = state
+
+@pytest.fixture
+def encoder(monkeypatch):
+    monkeypatch.setattr(jpeg_encoder, 'Gst', SimpleNamespace(State=SimpleNamespace(NULL='NULL')),
+                        raising=False)
+    encoder = GStreamerJpegEncoder(element='fakejpegenc', max_pipelines=2)
+    encoder.built = []
+    
+    def build(width, height):
+        pipeline = FakePipeline((width, height))
+        encoder.built.append(pipeline)
+        return (pipeline, None, None, None)
+    
+    monkeypatch.setattr(encoder, '_build', build)
+    monkeypatch.setattr(encoder, '_encode_with', lambda elements, frame, quality: b'jpeg')
+    return encoder
+
+def frame(width, height):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+def test_alternating_sizes_reuse_cached_pipelines(encoder):
+    for _ in range(5):
+        encoder.encode(frame(64, 48), 80)
+        encoder.encode(frame(32, 24), 80)
+    
+    assert [pipeline.size for pipeline in encoder.built] == [(64, 48), (32, 24)]
+    assert all(pipeline.state == 'PLAYING' for pipeline in encoder.built)
+
+def test_pipeline_outlives_encoding_thread(encoder):
+    thread = threading.Thread(target=encoder.encode, args=(frame(64, 48), 80))
+    thread.start()
+    thread.join()
+    encoder.encode(frame(64, 48), 80)
+    
+    assert len(encoder.built) == 1
+
+def test_least_recently_used_size_is_evicted(encoder):
+    for size in ((64, 48), (32, 24), (16, 12)):
+        encoder.encode(frame(*size), 80)
+    
+    states = {pipeline.size: pipeline.state for pipeline in encoder.built}
+    assert states == {(64, 48): 'NULL', (32, 24): 'PLAYING', (16, 12): 'PLAYING'}
+    assert encoder._pipeline_count == 2
+
+def test_close_stops_all_pipelines(encoder):
+    encoder.encode(frame(64, 48), 80)
+    encoder.encode(frame(32, 24), 80)
+    encoder.close()
+    
+    assert all(pipeline.state == 'NULL' for pipeline in encoder.built)
+    assert encoder._pipeline_count == 0
@@ -0,0 +1,46 @@
+# AdaptiveStreamController testleri
+# tests/test_stream_controller.py
+# =============================================================================
+
+from core.stream_controller import AdaptiveStreamController
+
+SERVER_INFO = {'fps': 30, 'quality': 80, 'resolution': '640x480'}
+
+def run_windows(controller, windows, frames_per_window, lost_per_window=0):
+    """Her pencerede verilen sayıda frame alındıktan sonra değerlendir"""
+    requests = []
+    now = controller.last_evaluation
+    for _ in range(windows):
+        for _ in range(frames_per_window):
+            controller.record_frame(0, 1000)
+        if lost_per_window:
+            controller.record_loss(0, lost_per_window)
+        now += controller.interval + 0.1
+        requests.extend(controller.evaluate(now))
+    return requests
+
+def test_keepalive_rate_does_not_degrade_gated_stream():
+    controller = AdaptiveStreamController()
+    controller.reset([0], dict(SERVER_INFO, change_detection=True))
+    
+    requests = run_windows(controller, 10, frames_per_window=1)
+    
+    assert not [request for request in requests if request['type'] != 'set_quality']
+    assert controller.cameras[0].fps == 30
+    assert controller.cameras[0].quality >= 80
+
+def test_loss_degrades_gated_stream():
+    controller = AdaptiveStreamController()
+    controller.reset([0], dict(SERVER_INFO, change_detection=True))
+    
+    requests = run_windows(controller, 1, frames_per_window=1, lost_per_window=2)
+    
+    assert requests == [{'type': 'set_quality', 'camera_id': 0, 'quality': 64}]
+
+def test_low_rate_degrades_ungated_stream():
+    controller = AdaptiveStreamController()
+    controller.reset([0], SERVER_INFO)
+    
+    requests = run_windows(controller, 1, frames_per_window=1)
+    
+    assert requests == [{'type': 'set_quality', 'camera_id': 0, 'quality': 64}]
@@ -0,0 +1,99 @@
+# UdpFrameReceiver testleri
+# tests/test_udp_receiver.py
+# =============================================================================
+
+import json
+import socket
+import struct
+import time
+
+import pytest
+
+from core.udp_receiver import FRAGMENT_HEADER, UdpFrameReceiver
+from udp_transport import UdpFrameSender
+
+class RecordingPool:
+    """Ayrılan buffer boyutlarını kaydeden basit havuz"""
+    
+    def __init__(self):
+        self.acquired = []
+    
+    def acquire(self, size):
+        self.acquired.append(size)
+        return bytearray(size)
+    
+    def release(self, buffer):
+        pass
+
+def frame_message(payload):
+    header = json.dumps({'type': 'frame', 'camera_id': 0, 'seq': 1}).encode('utf-8')
+    return [struct.pack("!I", len(header)) + header + struct.pack("!I", len(payload)), payload]
+
+def receive_all(receiver, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    responses = []
+    while not responses and time.monotonic() < deadline:
+        responses = receiver.receive()
+        time.sleep(0.01)
+    return responses
+
+@pytest.fixture
+def receiver():
+    pool = RecordingPool()
+    receiver = UdpFrameReceiver(pool, deadline_ms=500)
+    receiver.pool = pool
+    yield receiver
+    receiver.close()
+
+@pytest.fixture
+def raw_sender():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    yield sock
+    sock.close()
+
+def test_fragmented_message_is_reassembled(receiver):
+    sender = UdpFrameSender(payload_size=200)
+    try:
+        payload = bytes(range(256)) * 4
+        sender.send(('127.0.0.1', receiver.port), *frame_message(payload))
+        responses = receive_all(receiver)
+    finally:
+        sender.close()
+    
+    assert len(responses) == 1
+    assert bytes(responses[0]['frame_data']) == payload
+
+@pytest.mark.parametrize('total', [0x7fffffff, 0xffffffff])
+def test_oversized_stray_datagram_allocates_nothing(receiver, raw_sender, total):
+    raw_sender.sendto(FRAGMENT_HEADER.pack(1, total, 0, 0, 1) + b'x' * 10, ('127.0.0.1', receiver.port))
+    time.sleep(0.05)
+    
+    assert receiver.receive() == []
+    assert receiver.pool.acquired == []
+    assert receiver.fragments_rejected == 1
+
+@pytest.mark.parametrize('fields', [
+    (100, 0, 2, 2),     # index >= count
+    (100, 0, 0, 5),     # count != ceil(total / 10)
+    (100, 15, 1, 10),   # ofset parça sırasına uymuyor
+])
+def test_inconsistent_fragment_layout_is_rejected(receiver, raw_sender, fields):
+    total, offset, index, count = fields
+    raw_sender.sendto(FRAGMENT_HEADER.pack(1, total, offset, index, count) + b'x' * 10,
+                      ('127.0.0.1', receiver.port))
+    time.sleep(0.05)
+    
+    assert receiver.receive() == []
+    assert receiver.pool.acquired == []
+
+def test_mismatched_fragment_does_not_join_pending_message(receiver, raw_sender):
+    address = ('127.0.0.1', receiver.port)
+    raw_sender.sendto(FRAGMENT_HEADER.pack(7, 100, 0, 0, 10) + b'a' * 10, address)
+    # Aynı mesaj no, farklı toplam boyut: bekleyen mesaja yazılmamalı
+    raw_sender.sendto(FRAGMENT_HEADER.pack(7, 40, 10, 1, 4) + b'b' * 10, address)
+    time.sleep(0.05)
+    receiver.receive()
+    
+    assert receiver.pool.acquired == [100]
+    assert receiver.fragments_rejected == 1
+    assert receiver._pending[7].received == {0}
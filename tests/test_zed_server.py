@@ -0,0 +1,67 @@
+# ZEDServer testleri (ZED SDK olmadan: yayın ve handshake katmanı)
+# tests/test_zed_server.py
+# =============================================================================
+
+import socket
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt
+
+def test_handshake_advertises_stereo_and_measures(monkeypatch):
+    import zed_server
+    monkeypatch.setattr(zed_server, 'ZED_CONFIG', dict(
+        zed_server.ZED_CONFIG, resolution='VGA', stereo_mode='separate', depth_stream=True
+    ))
+    message = zed_server.ZEDServer().camera_list_message()
+    
+    assert message['type'] == 'camera_list'
+    assert message['cameras'] == [0, 1]
+    assert message['server_info']['resolution'] == '672x376'
+    assert message['server_info']['pull_supported'] is False
+    assert message['server_info']['depth'] is True
+
+def test_client_receives_depth_after_handshake(monkeypatch):
+    import zed_server
+    from core.camera_client import CameraClient
+    monkeypatch.setattr(zed_server, 'ZED_CONFIG', dict(zed_server.ZED_CONFIG, depth_stream=True))
+    server = zed_server.ZEDServer(host='127.0.0.1')
+    
+    # grab/encode thread'leri ZED SDK ister; yalnızca yayın katmanı başlatılır
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+    server.broadcaster.start(listener)
+    
+    client = CameraClient()
+    received = []
+    # Sinyal worker thread'inden gelir; event loop olmadan doğrudan bağlanır
+    client.depth_received.connect(lambda camera_id, depth: received.append((camera_id, depth)),
+                                  Qt.DirectConnection)
+    try:
+        assert client.connect('127.0.0.1', listener.getsockname()[1])
+        assert client.cameras == [0]
+        
+        depth_mm = np.arange(12 * 16, dtype=np.uint16).reshape(12, 16)
+        encoding, payload = zed_server.encode_depth(depth_mm)
+        deadline = time.monotonic() + 5.0
+        while not received and time.monotonic() < deadline:
+            server.depth_seq += 1
+            server._publish_measure('depth', time.time_ns(), encoding, payload, {
+                'width': 16, 'height': 12, 'dtype': 'uint16', 'units': 'mm'
+            })
+            time.sleep(0.05)
+        
+        assert received, "depth gelmedi"
+        camera_id, depth = received[0]
+        assert camera_id == 0
+        assert np.array_equal(np.asarray(depth), depth_mm)
+    finally:
+        client.disconnect()
+        server.broadcaster.close_all()
+        listener.close()